@@ -0,0 +1,85 @@
+"""
+Compares the available page compression codecs on pages read back from real stores.
+
+    python benchmarks/bench_codecs.py [level] [file_base [storage]]
+
+By default a Dict, an OrderedDict and a List are filled the way benchmarks/suite.py
+fills them, and a sample of the pages each wrote to disk is used. Pass the
+file_base (location and basename) of an existing store to sample its pages instead.
+"""
+import sys
+from itertools import islice
+from os.path import basename
+from shutil import rmtree
+from tempfile import mkdtemp
+from timeit import repeat
+
+from drivelink import Dict, List, OrderedDict
+from drivelink._pagestore import make_store
+from drivelink.compression import codecs, unpack
+
+from suite import make_keys, make_value
+
+# How many pages of each store to compress.
+sample = 8
+
+
+def stored_pages(store):
+    """
+    The serialized pages in a store, as they were before any compression.
+    """
+    return [unpack(store.read(k)) for k in islice(sorted(store.pages()), sample)]
+
+
+def built_pages():
+    """
+    Fills a store of each kind, leaving its pages uncompressed, and returns a
+    sample of the pages each one wrote.
+    """
+    kinds = [("dict-int", Dict, "int", "int"), ("dict-str", Dict, "str", "str"),
+             ("ordered", OrderedDict, "str", "str"), ("list", List, None, "str")]
+    pages = {}
+    location = mkdtemp()
+    try:
+        for name, cls, keys, values in kinds:
+            link = cls(name, 1024, 4, location)
+            if cls is List:
+                link.extend(make_value(values, i) for i in range(20000))
+            else:
+                for k in make_keys(keys, 20000, 1234):
+                    link[k] = make_value(values, k)
+            link.flush()
+            pages[name] = stored_pages(link._store)
+            link.close()
+    finally:
+        rmtree(location)
+    return pages
+
+
+def main(level=6, file_base=None, storage="files"):
+    if file_base is None:
+        pages = built_pages()
+    else:
+        pages = {basename(file_base): stored_pages(make_store(storage, file_base))}
+    print("%-10s %-6s %8s %14s %14s" % ("store", "codec", "ratio", "pack (MB/s)", "unpack (MB/s)"))
+    for store_name, sampled in sorted(pages.items()):
+        size = sum(len(data) for data in sampled)
+        for name, codec in sorted(codecs.items()):
+            codec = codec(level)
+            compressed = [codec.compress(data) for data in sampled]
+
+            def packing():
+                for data in sampled:
+                    codec.compress(data)
+
+            def unpacking():
+                for data, packed in zip(sampled, compressed):
+                    codec.decompress(packed, len(data))
+            packed = min(repeat(packing, number=5, repeat=5)) / 5
+            unpacked = min(repeat(unpacking, number=5, repeat=5)) / 5
+            print("%-10s %-6s %8.2f %14.1f %14.1f" % (store_name, name, size / float(sum(len(c) for c in compressed)),
+                                                      size / packed / 1e6, size / unpacked / 1e6))
+
+
+if __name__ == "__main__":
+    main(*[int(a) if i == 0 else a for i, a in enumerate(sys.argv[1:])])
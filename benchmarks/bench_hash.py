@@ -0,0 +1,35 @@
+"""
+Compares the original sha256 based hash with fast_hash over the usual key types.
+
+    python benchmarks/bench_hash.py
+"""
+from timeit import repeat
+
+from drivelink.hash import hash, fast_hash
+
+keys = {
+    "int": list(range(1000)),
+    "float": [i + 0.5 for i in range(1000)],
+    "str": ["key" + str(i) for i in range(1000)],
+    "bytes": [("key" + str(i)).encode('ascii') for i in range(1000)],
+    "tuple": [(i, "key" + str(i)) for i in range(1000)],
+}
+
+
+def run(function, values):
+    for v in values:
+        function(v)
+
+
+def main():
+    print("%-8s %12s %12s %8s" % ("keys", "hash (us)", "fast (us)", "speedup"))
+    for name, values in sorted(keys.items()):
+        times = []
+        for function in (hash, fast_hash):
+            best = min(repeat(lambda: run(function, values), number=10, repeat=5))
+            times.append(best / (10 * len(values)) * 1e6)
+        print("%-8s %12.3f %12.3f %7.1fx" % (name, times[0], times[1], times[0] / times[1]))
+
+
+if __name__ == "__main__":
+    main()
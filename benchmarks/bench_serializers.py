@@ -0,0 +1,55 @@
+"""
+Compares the page serializers by writing and reading a Dict of large binary values
+and one of small builtin values.
+
+    python benchmarks/bench_serializers.py
+"""
+from shutil import rmtree
+from tempfile import mkdtemp
+from timeit import default_timer
+
+from drivelink import Dict
+from drivelink._serializers import serializers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Each kind of value, with how many to store, the size_limit and the max_pages.
+values = {"small": (lambda i: (i, "value" + str(i), [i, i / 2.0]), 50000, 1024, 128)}
+if numpy is not None:
+    values["arrays"] = (lambda i: numpy.arange(1 << 18) + i, 128, 8, 2)
+else:
+    values["blobs"] = (lambda i: bytearray(1 << 20), 128, 8, 2)
+
+
+def run(serializer, make, count, size_limit, max_pages, location):
+    start = default_timer()
+    with Dict("bench", size_limit, max_pages, location, serializer=serializer) as d:
+        for i in range(count):
+            d[i] = make(i)
+    written = default_timer()
+    with Dict("bench", size_limit, max_pages, location, serializer=serializer) as d:
+        for i in range(count):
+            d[i]
+    return written - start, default_timer() - written
+
+
+def main():
+    print("%-7s %-8s %10s %10s" % ("values", "format", "write (s)", "read (s)"))
+    for name, (make, count, size_limit, max_pages) in sorted(values.items()):
+        for serializer in sorted(serializers):
+            if serializer == "marshal" and name != "small":
+                # marshal only keeps builtin types.
+                continue
+            location = mkdtemp()
+            try:
+                times = run(serializer, make, count, size_limit, max_pages, location)
+                print("%-7s %-8s %10.3f %10.3f" % ((name, serializer) + times))
+            finally:
+                rmtree(location)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Times the common operations of Dict, List, OrderedDict and cached over a grid of
+settings, optionally writes the results as JSON, and compares them against a saved
+baseline.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --tolerance 0.25
+
+Every case runs in a fresh temporary directory with seeded random keys, and the
+best of --repeat runs is kept, so runs on the same machine are comparable. With a
+baseline, cases that got slower by more than the tolerance are listed and the exit
+status is 1.
+
+The drivelink in the checkout the script sits in is the one timed, whether or not
+it is installed.
+"""
+from __future__ import print_function
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+from os.path import abspath, dirname
+from shutil import rmtree
+from tempfile import mkdtemp
+from timeit import default_timer
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from drivelink import Dict, List, OrderedDict, cached
+
+
+def make_keys(kind, n, seed):
+    numbers = list(range(n))
+    random.Random(seed).shuffle(numbers)
+    if kind == "str":
+        return ["key%08d" % i for i in numbers]
+    if kind == "tuple":
+        return [(i, "key") for i in numbers]
+    return numbers
+
+
+def make_indices(n, count, seed):
+    """
+    Seeded random positions in a list of n values, the same on every run.
+    """
+    rand = random.Random(seed)
+    return [rand.randrange(n) for _ in range(count)]
+
+
+def make_value(kind, i):
+    if kind == "str":
+        return "value" * 4 + str(i)
+    if kind == "bytes":
+        return b"\x00" * 256
+    return i
+
+
+class Case(object):
+    """
+    One timed operation. setup is run untimed and returns what run needs.
+    """
+
+    def __init__(self, name, setup, run):
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+
+def _filled_dict(cls, n, options, location):
+    d = cls("bench", file_location=location, **options["link"])
+    for k in options["keys"]:
+        d[k] = make_value(options["values"], k)
+    d.flush()
+    return d
+
+
+def _dict_cases(cls, prefix):
+    def empty(n, options, location):
+        return cls("bench", file_location=location, **options["link"])
+
+    def filled(n, options, location):
+        return _filled_dict(cls, n, options, location)
+
+    def set_random(d, options):
+        for k in options["keys"]:
+            d[k] = make_value(options["values"], k)
+
+    def get_random(d, options):
+        for k in options["keys"]:
+            d[k]
+
+    def get_sequential(d, options):
+        for k in sorted(options["keys"], key=repr):
+            d[k]
+
+    def delete(d, options):
+        for k in options["keys"]:
+            del d[k]
+
+    def iterate(d, options):
+        for _ in d.items():
+            pass
+
+    return [Case(prefix + "_set_random", empty, set_random),
+            Case(prefix + "_get_random", filled, get_random),
+            Case(prefix + "_get_sequential", filled, get_sequential),
+            Case(prefix + "_delete", filled, delete),
+            Case(prefix + "_iterate", filled, iterate)]
+
+
+def _list_cases():
+    def empty(n, options, location):
+        return List("bench", file_location=location, **options["link"])
+
+    def filled(n, options, location):
+        l = empty(n, options, location)
+        l.extend(make_value(options["values"], i) for i in range(n))
+        l.flush()
+        return l
+
+    def append(l, options):
+        for i in range(len(options["keys"])):
+            l.append(make_value(options["values"], i))
+
+    def insert_front(l, options):
+        for i in range(len(options["keys"]) // 10):
+            l.insert(0, make_value(options["values"], i))
+
+    def get_random(l, options):
+        for i in options["indices"]:
+            l[i]
+
+    def set_random(l, options):
+        for i in options["indices"]:
+            l[i] = make_value(options["values"], i)
+
+    def set_sequential(l, options):
+        for i in range(len(options["keys"])):
+            l[i] = make_value(options["values"], i)
+
+    def delete(l, options):
+        for i in options["indices"][:len(options["keys"]) // 10]:
+            del l[i % len(l)]
+
+    def iterate(l, options):
+        for _ in l:
+            pass
+
+    return [Case("list_append", empty, append),
+            Case("list_insert_front", filled, insert_front),
+            Case("list_get_random", filled, get_random),
+            Case("list_set_random", filled, set_random),
+            Case("list_set_sequential", filled, set_sequential),
+            Case("list_delete", filled, delete),
+            Case("list_iterate", filled, iterate)]
+
+
+def _other_cases():
+    def memoized(n, options, location):
+        @cached("bench", file_location=location, hot_size=0, **options["link"])
+        def fib(a):
+            if a < 2:
+                return a
+            return fib(a - 1) + fib(a - 2)
+        return fib
+
+    def recursion(fib, options):
+        for a in range(0, len(options["keys"]), 50):
+            fib(a)
+
+    def written(n, options, location):
+        _filled_dict(Dict, n, options, location).close()
+        return location
+
+    def reopen(location, options):
+        with Dict("bench", file_location=location, **options["link"]) as d:
+            d[options["keys"][0]]
+
+    return [Case("cached_recursion", memoized, recursion),
+            Case("dict_reopen", written, reopen)]
+
+
+def all_cases():
+    return _dict_cases(Dict, "dict") + _dict_cases(OrderedDict, "ordereddict") + _list_cases() + _other_cases()
+
+
+def time_case(case, n, options, repeat):
+    best = None
+    for _ in range(repeat):
+        location = mkdtemp()
+        try:
+            target = case.setup(n, options, location)
+            start = default_timer()
+            case.run(target, options)
+            if hasattr(target, "flush"):
+                target.flush()
+            elapsed = default_timer() - start
+            if hasattr(target, "close"):
+                target.close()
+            elif hasattr(target, "c"):
+                target.c.close()
+        finally:
+            rmtree(location)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def grid(args):
+    for size_limit, max_pages, ratio, keys, values in itertools.product(
+            args.size_limit, args.max_pages, args.compression_ratio, args.keys, args.values):
+        params = {"size_limit": size_limit, "max_pages": max_pages, "compression_ratio": ratio,
+                  "keys": keys, "values": values}
+        yield params
+
+
+def case_id(name, params):
+    return name + "[" + ",".join("%s=%s" % item for item in sorted(params.items())) + "]"
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns (case, baseline seconds, new seconds) for every case that slowed down.
+    """
+    slower = []
+    for case, seconds in sorted(results.items()):
+        before = baseline.get(case)
+        if before and seconds > before * (1 + tolerance):
+            slower.append((case, before, seconds))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-n", "--items", type=int, default=5000, help="items per case")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--size-limit", type=int, nargs="+", default=[64, 1024])
+    parser.add_argument("--max-pages", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--compression-ratio", type=int, nargs="+", default=[0])
+    parser.add_argument("--keys", nargs="+", default=["int"], choices=["int", "str", "tuple"])
+    parser.add_argument("--values", nargs="+", default=["int"], choices=["int", "str", "bytes"])
+    parser.add_argument("--cases", nargs="+", help="only run the cases starting with these")
+    parser.add_argument("--output", help="where to write the JSON results, if anywhere")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slow down, 0.2 being 20%%")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in all_cases() if not args.cases or any(c.name.startswith(p) for p in args.cases)]
+    results = {}
+    for params in grid(args):
+        options = {"keys": make_keys(params["keys"], args.items, args.seed), "values": params["values"],
+                   "indices": make_indices(args.items, args.items, args.seed),
+                   "link": {"size_limit": params["size_limit"], "max_pages": params["max_pages"],
+                            "compression_ratio": params["compression_ratio"]}}
+        for case in cases:
+            key = case_id(case.name, params)
+            results[key] = time_case(case, args.items, options, args.repeat)
+            print("%-90s %10.4f s" % (key, results[key]))
+            sys.stdout.flush()
+
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "items": args.items, "repeat": args.repeat, "seed": args.seed, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print("Results written to " + args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("items") != args.items:
+            print("Warning: the baseline was run with %s items per case." % baseline.get("items"))
+        slower = compare(results, baseline["results"], args.tolerance)
+        for case, before, after in slower:
+            print("SLOWER %-83s %8.4f s -> %8.4f s (%+.0f%%)" % (case, before, after, (after / before - 1) * 100))
+        if slower:
+            return 1
+        print("No case is more than %d%% slower than the baseline." % (args.tolerance * 100))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
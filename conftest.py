@@ -0,0 +1,17 @@
+import sys
+
+# Async syntax only parses from Python 3.5, and the async tests use asyncio.run,
+# which came in 3.7.
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append("drivelink/_asyncmemoize.py")
+if sys.version_info < (3, 7):
+    collect_ignore.append("tests/test_cache_async.py")
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+# Without memoryview.cast, the Array doctest needs NumPy.
+if sys.version_info < (3,) and numpy is None:
+    collect_ignore.append("drivelink/_diskarray.py")
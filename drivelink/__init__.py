@@ -15,5 +15,7 @@ prototyping, while enabling larger data access.
 from drivelink._disklink import Link
 from drivelink._diskdict import Dict
 from drivelink._disklist import List
+from drivelink._diskarray import Array
 from drivelink._diskmemoize import cached
 from drivelink._ordereddiskdict import OrderedDict
+from drivelink._sorteddiskdict import SortedDict
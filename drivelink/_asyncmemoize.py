@@ -0,0 +1,49 @@
+"""
+The cached wrapper for coroutine functions, kept apart as it needs async syntax.
+"""
+import asyncio
+import weakref
+
+from drivelink._diskmemoize import _Cached
+
+
+class _AsyncCached(_Cached):
+    "Awaits the function on a miss, and does the disk work in the loop's executor so the loop never waits on it."
+
+    def __init__(self, *args, **kwargs):
+        super(_AsyncCached, self).__init__(*args, **kwargs)
+        # The calls in progress, for each event loop.
+        self._tasks = weakref.WeakKeyDictionary()
+
+    async def __call__(self, *args, **kwargs):
+        i = self._key(args, kwargs)
+        if i is None:
+            return await self.f(*args, **kwargs)
+        found, t = self._lookup_hot(i)
+        if found:
+            return self._out(t)
+        loop = asyncio.get_event_loop()
+        flights = self._tasks.setdefault(loop, {})
+        flight = flights.get(i)
+        if flight is not None:
+            self._counts.add(waits=1)
+            return self._out(await asyncio.shield(flight))
+        flight = flights[i] = loop.create_future()
+        try:
+            found, t = await loop.run_in_executor(None, self._lookup, i, self._old_key(args, kwargs))
+            if found:
+                flight.set_result(t)
+                return self._out(t)
+            t = await self.f(*args, **kwargs)
+            flight.set_result(await loop.run_in_executor(None, self._store, i, t))
+            return t
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Nobody may be waiting, which is fine.
+            flight.exception()
+            raise
+        finally:
+            del flights[i]
@@ -0,0 +1,313 @@
+from collections import MutableSequence
+from os.path import expanduser, join
+import array
+import mmap
+
+from drivelink import Link
+from drivelink._disklist import _count
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Python 2 has neither, so there the pages can only be viewed through NumPy.
+_typecodes = getattr(array, "typecodes", "cbBuhHiIlLfd")
+_can_cast = hasattr(memoryview, "cast")
+
+
+class _mapped_page(object):
+    """
+    One page worth of the data file mapped into memory, and a typed view over it.
+    """
+
+    def __init__(self, mapping, view):
+        self.mapping = mapping
+        self.view = view
+
+    def close(self, dirty):
+        if dirty:
+            self.mapping.flush()
+        if isinstance(self.view, memoryview):
+            self.view.release()
+        self.view = None
+        try:
+            self.mapping.close()
+        except BufferError:
+            # Someone still holds a view into this page. The mapping will be
+            # closed once they let go of it.
+            pass
+
+
+class Array(Link, MutableSequence):
+    """
+    A list class for fixed width numbers that maintains O(1) look up and append while
+    keeping RAM usage O(1) as well.
+
+    Unlike a List, nothing is ever pickled. All the values live in one file as raw
+    machine numbers, and each page is a memory mapped window of size_limit of them,
+    so reading one value never decodes any others. The typecode is any of those
+    used by Python's `array module <https://docs.python.org/library/array.html>`_,
+    or anything NumPy accepts as a dtype when it is installed. On Python 2, NumPy is
+    needed for any typecode.
+
+    With NumPy available, reading a slice that falls within one page gives back a
+    NumPy view of the mapped memory without copying it, and longer slices come back
+    as a single NumPy array. Without it, slices are array.array copies.
+
+        >>> with Array("samplearray", typecode="d") as a:
+        ...     a.extend([0.5, 1.5, 2.5])
+        ...     a.append(3.5)
+        ...     print(a[1])
+        ...     print(len(a))
+        1.5
+        4
+
+    As with the other classes, values are written straight back to the same files
+    and reloaded when the same file_basename and file_location are used again.
+    Because views share memory with the file, a view taken from a page is only
+    safe to use until that page is evicted, so copy it if you need it to last.
+    """
+
+    _legacy_settings = {}
+
+    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), typecode="d", eviction_policy="lru"):
+        self.pages = dict()
+        self._dtype = None
+        if isinstance(typecode, str) and typecode in _typecodes:
+            self.typecode = typecode
+            self.itemsize = array.array(typecode).itemsize
+            if numpy is not None and numpy.dtype(typecode).itemsize == self.itemsize:
+                self._dtype = numpy.dtype(typecode)
+        elif numpy is not None:
+            self._dtype = numpy.dtype(typecode)
+            self.typecode = self._dtype.str
+            self.itemsize = self._dtype.itemsize
+        else:
+            raise ValueError("Unknown typecode " + repr(typecode) + " (is NumPy installed?)")
+        if self._dtype is None and not _can_cast:
+            raise ValueError("Array needs NumPy on this version of Python.")
+        self._data = None
+        super(Array, self).__init__(file_basename, size_limit, max_pages, file_location, 0, eviction_policy)
+
+    def _settings(self):
+        return {"size_limit": self.size_limit, "typecode": self.typecode}
+
+    def _data_file(self):
+        if self._data is None:
+            try:
+                self._data = open(self._file_base + 'Arr', 'r+b')
+            except IOError:
+                self._data = open(self._file_base + 'Arr', 'w+b')
+        return self._data
+
+    def copy_from(self, other):
+        for k in other.page_indices():
+            other._guarantee_page(k)
+            self.extend(other._page_values(k))
+
+    def open_page(self, k):
+        page_bytes = self.size_limit * self.itemsize
+        start = k * page_bytes
+        offset = start - start % mmap.ALLOCATIONGRANULARITY
+        f = self._data_file()
+        f.seek(0, 2)
+        if f.tell() < start + page_bytes:
+            f.truncate(start + page_bytes)
+        mapping = mmap.mmap(f.fileno(), start - offset + page_bytes, access=mmap.ACCESS_WRITE, offset=offset)
+        if self._dtype is None:
+            view = memoryview(mapping)[start - offset:].cast(self.typecode)
+        else:
+            view = numpy.frombuffer(mapping, self._dtype, self.size_limit, start - offset)
+        self.pages[k] = _mapped_page(mapping, view)
+        self._policy.add(k)
+
+    def _save_page_to_disk(self, number):
+        self.store_index()
+        if number in self.pages:
+            self.pages.pop(number).close(number in self._dirty)
+        self._dirty.discard(number)
+        self._policy.remove(number)
+
+    def flush(self):
+        for number in list(self._dirty):
+            if number in self.pages:
+                self.pages[number].mapping.flush()
+        self._dirty.clear()
+        self.store_index()
+        self._store.flush()
+
+    def close(self):
+        super(Array, self).close()
+        if getattr(self, "_data", None) is not None:
+            self._data.close()
+            self._data = None
+
+    def determine_index(self, key):
+        """
+        Figures out where the key in question should be.
+        """
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("Array index out of range")
+        return divmod(key, self.size_limit)
+
+    def page_indices(self):
+        for k in range(-(-self._length // self.size_limit)):
+            yield k
+
+    def _page_values(self, k):
+        """
+        The view over the values actually stored in a resident page.
+        """
+        return self.pages[k].view[:min(self.size_limit, self._length - k * self.size_limit)]
+
+    def _iterpages(self):
+        for k in self.page_indices():
+            self._guarantee_page(k)
+            yield self._page_values(k)
+
+    def __contains__(self, item):
+        for values in self._iterpages():
+            if self._dtype is not None:
+                if (values == item).any():
+                    return True
+            elif item in values:
+                return True
+        return False
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._getslice(key)
+        k, i = self._finditem(key)
+        return self.pages[k].view[i]
+
+    def _getslice(self, key):
+        start, stop, step = key.indices(self._length)
+        count = _count(start, stop, step)
+        if not count:
+            return self._join([])
+        last = start + (count - 1) * step
+        lo, hi = min(start, last), max(start, last) + 1
+        values = self._join(list(self._chunks(lo, hi)))
+        if step == 1:
+            return values
+        return values[start - lo::step]
+
+    def _chunks(self, start, stop):
+        """
+        Yields the views covering [start, stop), one per page.
+        """
+        while start < stop:
+            k, i = divmod(start, self.size_limit)
+            j = min(self.size_limit, i + stop - start)
+            self._guarantee_page(k)
+            yield self.pages[k].view[i:j]
+            start += j - i
+
+    def _join(self, chunks):
+        if self._dtype is not None:
+            if len(chunks) == 1:
+                return chunks[0]
+            if not chunks:
+                return numpy.empty(0, self._dtype)
+            return numpy.concatenate(chunks)
+        joined = array.array(self.typecode)
+        for chunk in chunks:
+            joined.frombytes(chunk.tobytes())
+        return joined
+
+    def __setitem__(self, key, value):
+        k, i = self._finditem(key)
+        self.pages[k].view[i] = value
+        self._dirty.add(k)
+
+    def __delitem__(self, key):
+        k, i = self._finditem(key)
+        last = (self._length - 1) // self.size_limit
+        while True:
+            view = self.pages[k].view
+            stop = self.size_limit if k < last else (self._length - 1) % self.size_limit + 1
+            view[i:stop - 1] = view[i + 1:stop]
+            self._dirty.add(k)
+            if k == last:
+                break
+            self._guarantee_page(k + 1)
+            carry = self.pages[k + 1].view[0]
+            self._guarantee_page(k)
+            self.pages[k].view[stop - 1] = carry
+            k, i = k + 1, 0
+            self._guarantee_page(k)
+        self._length -= 1
+
+    def insert(self, index, value):
+        n = self._length
+        if index < 0:
+            index = max(0, index + n)
+        if index >= n:
+            self.append(value)
+            return
+        self.append(self[n - 1])
+        k, i = divmod(index, self.size_limit)
+        last = (n - 1) // self.size_limit
+        for p in range(last, k - 1, -1):
+            start = i if p == k else 0
+            stop = (n - 1) % self.size_limit + 1 if p == last else self.size_limit
+            self._guarantee_page(p)
+            if p < last:
+                carry = self.pages[p].view[self.size_limit - 1]
+                self._guarantee_page(p + 1)
+                self.pages[p + 1].view[0] = carry
+                self._dirty.add(p + 1)
+                self._guarantee_page(p)
+            view = self.pages[p].view
+            view[start + 1:stop] = view[start:stop - 1]
+            self._dirty.add(p)
+        self._guarantee_page(k)
+        self.pages[k].view[i] = value
+
+    def append(self, v):
+        k, i = divmod(self._length, self.size_limit)
+        self._guarantee_page(k)
+        self.pages[k].view[i] = v
+        self._dirty.add(k)
+        self._length += 1
+
+    def extend(self, values):
+        """
+        Copies values into the pages a whole page at a time.
+        """
+        if not hasattr(values, '__len__'):
+            values = list(values)
+        if self._dtype is not None:
+            values = numpy.asarray(values, self._dtype).ravel()
+        elif not (isinstance(values, array.array) and values.typecode == self.typecode):
+            values = array.array(self.typecode, values)
+        done = 0
+        while done < len(values):
+            k, i = divmod(self._length, self.size_limit)
+            n = min(self.size_limit - i, len(values) - done)
+            self._guarantee_page(k)
+            self.pages[k].view[i:i + n] = values[done:done + n]
+            self._dirty.add(k)
+            self._length += n
+            done += n
+
+    def __iter__(self):
+        for values in self._iterpages():
+            for v in values:
+                yield v
+
+    def __reversed__(self):
+        for k in reversed(list(self.page_indices())):
+            self._guarantee_page(k)
+            for v in reversed(self._page_values(k)):
+                yield v
+
+    def __repr__(self):
+        return (self.__class__.__name__ + "('" + self._file_basename + "', " + str(self.size_limit) + ', ' +
+                str(self.max_pages) + ", '" + self._file_loc + "', typecode='" + self.typecode + "')")
+
+    def __str__(self):
+        return "Array with values stored to " + self._file_base
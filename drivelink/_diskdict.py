@@ -1,21 +1,30 @@
 from collections import MutableMapping
-from os.path import expanduser, join
-from glob import glob
+from contextlib import contextmanager
+from itertools import chain
+from os.path import exists, expanduser, join
 
 from drivelink import Link
-from drivelink.hash import hash
+from drivelink._locking import reading, writing
+from drivelink.hash import hashes, default_hash
 
 
 class _page(dict):
+    # Pages used to be saved as these, so it's kept around to load them.
     currentDepth = 0
 
 
+_missing = object()
+
+
 class Dict(Link, MutableMapping):
     """
     A dictionary class that maintains O(1) look up and write while keeping RAM usage O(1) as well.
 
-    This is accomplished through a rudimentary (for now) hashing scheme to page the
-    dictionary into parts.
+    This is accomplished through extendible hashing: a directory indexed by the low
+    bits of each key's hash says which page the key is on, and a page that gets too
+    full is split in two, doubling the directory if it has to. The directory stops
+    growing at 2**16 slots, and a page whose keys can't be told apart within those
+    bits is left to hold more than size_limit keys rather than be split for nothing.
 
     The object created can be used any way a normal dict would be used, and will
     clean itself up on python closing. This means saving all the remaining pages
@@ -46,100 +55,400 @@ class Dict(Link, MutableMapping):
         ...     print(d[3])
         d
 
+    To read, write or delete many keys at once, getmany, setmany (or update) and
+    delmany sort the keys by the page they're on first, so every page is loaded
+    only once no matter what order the keys come in.
+
+    When the files were made with other settings, their values are copied over
+    page by page when the Dict is opened. With lazy_migration the Dict opens right
+    away instead, and each old page is moved over the first time a key on it is
+    used, or all at once when iterating or calling migrate(). A migration that
+    hasn't finished carries on the next time the files are opened.
+
+    Keys are hashed with drivelink.hash.fast_hash for new files, or whatever
+    hash_algorithm names from drivelink.hash.hashes. Existing files keep the
+    algorithm they were made with unless another is asked for, in which case
+    their values are copied over to match.
+
     If there is a way to break dict like behavior and you can reproduce it, please
     report it to `the GitHub issues <https://github.com/cdusold/DriveLink/issues/>`_.
     """
 
-    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0):
-        self.pages = _page()
+    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, eviction_policy="lru", storage="files", write_back=0, read_ahead=0, concurrent=False, hash_algorithm=None, compression="zlib", serializer=None, max_memory_bytes=None, auto_tune=False, lazy_migration=False, sync_interval=None):
+        if hash_algorithm is not None and hash_algorithm not in hashes:
+            raise ValueError("Unknown hash algorithm: " + repr(hash_algorithm))
+        if lazy_migration and concurrent:
+            raise ValueError("Concurrent dictionaries can't migrate lazily.")
+        self.pages = dict()
         self._total = set()
-        super(Dict, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio)
+        self._hash_algorithm = hash_algorithm
+        self._lazy_migration = lazy_migration
+        self._old = None
+        super(Dict, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio, eviction_policy, storage, write_back, read_ahead, concurrent, compression, serializer, max_memory_bytes, auto_tune, sync_interval)
+        self._resume_migration()
+
+    _legacy_settings = {"storage": "files", "serializer": "pickle", "hash_algorithm": "sha256"}
+
+    def _settings(self):
+        settings = super(Dict, self)._settings()
+        settings["hash_algorithm"] = self._hash_algorithm
+        return settings
+
+    def _adopt_settings(self, old_settings):
+        super(Dict, self)._adopt_settings(old_settings)
+        if self._hash_algorithm is None:
+            self._hash_algorithm = old_settings.get("hash_algorithm", default_hash)
+        self._hash = hashes[self._hash_algorithm]
 
     def copy_from(self, other):
-        for key in other:
-            self[key] = other[key]
+        for page in other._iterpages():
+            self.setmany(page.items())
+
+    def _make_old_values_available(self, old_settings):
+        """
+        Copies the values over, or with lazy_migration, opens the old files next
+        to the new ones so their pages can be moved over as they're needed.
+        """
+        if exists(join(self._file_loc, "~" + self._file_basename + "Set")):
+            # An earlier lazy migration is still going, so finish it first.
+            with type(self)(self._file_basename, max_pages=1, file_location=self._file_loc, **old_settings):
+                pass
+        if not self._lazy_migration:
+            return super(Dict, self)._make_old_values_available(old_settings)
+        self._set_aside()
+        self._open_old(old_settings)
+
+    def _open_old(self, old_settings):
+        self._old = type(self)("~" + self._file_basename, max_pages=1, file_location=self._file_loc, **old_settings)
+        if not self._old._total:
+            # There is nothing to move over.
+            self._finish_migration()
+
+    def _finish_migration(self):
+        old, self._old = self._old, None
+        old.close()
+        self._remove_set_aside()
+
+    def _resume_migration(self):
+        """
+        Picks up a lazy migration left unfinished when the files were last closed.
+        """
+        if self._old is not None or not exists(join(self._file_loc, "~" + self._file_basename + "Set")):
+            return
+        old_settings = self._read_settings(join(self._file_loc, "~" + self._file_basename))
+        self._open_old(old_settings)
+        if not self._lazy_migration:
+            self.migrate()
+
+    def _migrate(self, key):
+        """
+        Moves over the old page the key would have been on, if it hasn't been yet.
+        """
+        k, _ = self._old.determine_index(key)
+        if k in self._old._total:
+            self._migrate_page(k)
+
+    def _migrate_page(self, k):
+        old = self._old
+        old._guarantee_page(k)
+        items = list(old.pages[k].items())
+        old.pages[k].clear()
+        old._length -= len(items)
+        old._save_page_to_disk(k)
+        # These were counted when the migration started.
+        self._length -= len(items)
+        self.setmany(items)
+        if not old._total:
+            self._finish_migration()
+
+    @writing
+    def migrate(self):
+        """
+        Finishes moving the values over from the old files left by lazy_migration,
+        if there are any.
+        """
+        while self._old is not None:
+            if not self._old._total:
+                self._finish_migration()
+            else:
+                self._migrate_page(min(self._old._total))
+
+    @contextmanager
+    def batch(self, rollback=True):
+        if rollback:
+            # Values moved out of the old files couldn't be put back.
+            self.migrate()
+        with super(Dict, self).batch(rollback):
+            yield self
+
+    def _iterpages(self, reverse=False):
+        self.migrate()
+        return super(Dict, self)._iterpages(reverse)
+
+    @writing
+    def retune(self, size_limit=None):
+        self.migrate()
+        return super(Dict, self).retune(size_limit)
+
+    @writing
+    def flush(self):
+        super(Dict, self).flush()
+        if self._old is not None:
+            self._old.flush()
+
+    def _unload(self):
+        super(Dict, self)._unload()
+        if self._old is not None:
+            old, self._old = self._old, None
+            old.close()
 
     def load_index(self):
+        # The directory maps the low bits of a key's hash to the page it's on.
+        # Pages listed in _depths are the usual extendible hashing buckets: every
+        # slot sharing the page's lowest depth bits points at it. Pages carried
+        # over from the older scheme may not line up that neatly, so their slots
+        # are looked up when they split.
+        self._directory = [0]
+        self._depths = {0: 0}
+        self._next_page = 1
         other_values = super(Dict, self).load_index()
+        self._total = set(self._store.pages())
         if other_values is None:
+            if self._old is not None:
+                # A lazy migration just started, and the old values still count.
+                self._length = len(self._old)
             return
-        self.pages.currentDepth = other_values[0]
-        for f in glob(self._file_base + '*'):
-            try:
-                self._total.add(int(f[len(self._file_base):]))
-            except ValueError:
-                pass
+        if len(other_values) == 1:
+            self._convert_index(other_values[0])
+        else:
+            self._directory, self._depths, self._next_page = other_values
+
+    def _convert_index(self, depth):
+        """
+        Builds a directory for files written before there was one.
+
+        Each slot goes to the page numbered with the most of its low bits, which
+        is where the old lookup would have branched it to. Keys that were never
+        branched that far are moved there now, reading every page once.
+        """
+        total = self._total | set([0])
+        self._directory = []
+        for slot in range(depth + 1):
+            i = 0
+            while slot & (depth >> i) not in total:
+                i += 1
+            self._directory.append(slot & (depth >> i))
+        self._depths = {}
+        self._next_page = max(total) + 1
+        mask = len(self._directory) - 1
+        for k in sorted(self._total):
+            self._guarantee_page(k)
+            moving = [(self._directory[self._hash(key) & mask], key) for key in self.pages[k]]
+            moving = sorted((page, key) for page, key in moving if page != k)
+            values = [self.pages[k].pop(key) for _, key in moving]
+            if moving:
+                self._dirty.add(k)
+            for (page, key), value in zip(moving, values):
+                self._guarantee_page(page)
+                self.pages[page][key] = value
+                self._dirty.add(page)
+        self.store_index()
 
     def store_index(self):
-        super(Dict, self).store_index(self.pages.currentDepth)
+        super(Dict, self).store_index(self._directory, self._depths, self._next_page)
 
     def open_page(self, k):
         if k in self._total:
             self._load_page_from_disk(k)
         if k not in self.pages:
-            self.pages[k] = _page()
+            self.pages[k] = {}
             self._total.add(k)
-            self.pages[k].currentDepth = self.pages.currentDepth
-            self._queue.append(k)
+            self._policy.add(k)
 
     def determine_index(self, key):
         """
         Figures out where the key in question should be.
 
-        Most frequently O(1), when a page becomes too large, there's
-        a O(ln(n)) search that refactors O(k ln(n)) elements
-        once every O(k) insertions. A full refactor usually
-        happens in strides, moving a total of O(n) elements
-        split up over O(ln(n)) calls. This makes the worst
-        time refactor O(n) and usual refactor approximately
-        O(n/ ln(n)). Average case lookup O(n/k).
-        """
-        k = hash(key) & self.pages.currentDepth
-        i = 0
-        while (k & (self.pages.currentDepth >> i)) not in self._total | set([0]):
-            i += 1
-        self._branchpage(k & (self.pages.currentDepth >> i))
-        return k, key
+        This is one hash and one look up in the directory, however many pages
+        there are.
+        """
+        if self._old is not None:
+            self._migrate(key)
+        return self._directory[self._hash(key) & (len(self._directory) - 1)], key
 
     def page_indices(self):
         for k in list(self._total):
             yield k
 
+    @writing
     def __setitem__(self, key, value):
         '''
          Sets a value that a key maps to.
         '''
-        super(Dict, self).__setitem__(key, value)
-        i, _ = self.determine_index(key)
-        if len(self.pages[i]) > self.size_limit:
-            if self.pages[i].currentDepth == self.pages.currentDepth:
-                self.pages.currentDepth <<= 1
-                self.pages.currentDepth |= 1
-            self._branchpage(i)
+        if self._old is not None:
+            self._migrate(key)
+        slot = self._hash(key) & (len(self._directory) - 1)
+        i = self._directory[slot]
+        self._guarantee_page(i)
+        page = self.pages[i]
+        if key not in page:
+            self._length += 1
+        page[key] = value
+        self._dirty.add(i)
+        # A page that couldn't be split is only tried again every size_limit keys.
+        if len(page) > self.size_limit and (len(page) - 1) % self.size_limit == 0:
+            self._split(i, slot)
 
-    def __contains__(self, item):
-        try:
-            i, k = self._finditem(item)
-        except:
+    # How many bits of the hash the directory may use, which keeps it small enough
+    # to save with the index.
+    _max_depth = 16
+
+    def _split(self, number, slot):
+        """
+        Splits a page with too many keys, doubling the directory as many times as
+        it takes to tell them apart. Returns False, leaving the page to overflow,
+        if their hashes agree on every bit the directory may use.
+        """
+        self._guarantee_page(number)
+        hashes = [self._hash(key) for key in self.pages[number]]
+        differ = 0
+        for h in hashes:
+            differ |= h ^ hashes[0]
+        if not differ & ((1 << self._max_depth) - 1):
             return False
+        for _ in range(self._max_depth):
+            split = self._split_once(number, slot)
+            if split is None:
+                return False
+            new, moved = split
+            if 0 < moved < len(hashes):
+                return True
+            # They all went the same way, so carry on with whichever page has them.
+            slot = hashes[0] & (len(self._directory) - 1)
+            number = self._directory[slot]
+        return False
+
+    def _split_once(self, number, slot):
+        """
+        Moves the keys on one half of a page's slots to a new page, doubling the
+        directory first if the page has only one slot in it. Returns the new page
+        and how many keys moved, or None if the directory can't grow any more.
+        """
+        self._guarantee_page(number)
+        page = self.pages[number]
+        depth = self._depths.get(number)
+        if depth is not None:
+            bit = 1 << depth
+            grow = bit == len(self._directory)
+        else:
+            slots = [s for s, k in enumerate(self._directory) if k == number]
+            grow = len(slots) == 1
+            if grow:
+                slots.append(slots[0] + len(self._directory))
+            differ = 0
+            for s in slots:
+                differ |= s ^ slots[0]
+            bit = differ & -differ
+        if grow and len(self._directory) >= 1 << self._max_depth:
+            return None
+        if grow:
+            self._directory.extend(self._directory)
+        if depth is not None:
+            moved = range((slot & (bit - 1)) | bit, len(self._directory), bit << 1)
+        else:
+            moved = [s for s in slots if s & bit]
+            if len(moved) * 2 != len(slots) or len(slots) * bit != len(self._directory):
+                bit = None
+        new = self._next_page
+        self._next_page += 1
+        for s in moved:
+            self._directory[s] = new
+        if bit is None:
+            self._depths.pop(number, None)
+        else:
+            self._depths[number] = self._depths[new] = bit.bit_length()
+        mask = len(self._directory) - 1
+        moving = [key for key in page if self._directory[self._hash(key) & mask] == new]
+        values = [page.pop(key) for key in moving]
+        self._dirty.add(number)
+        self._guarantee_page(new)
+        self.pages[new].update(zip(moving, values))
+        self._dirty.add(new)
+        return new, len(moving)
+
+    @reading
+    def __contains__(self, item):
+        i, k = self.determine_index(item)
+        self._guarantee_page(i)
         return k in self.pages[i]
 
+    def _in_page_order(self, keys):
+        """
+        Sorts keys so that the ones sharing a page come one after another.
+        """
+        mask = len(self._directory) - 1
+        return sorted(keys, key=lambda key: self._directory[self._hash(key) & mask])
+
+    @reading
+    def getmany(self, keys, default=_missing):
+        """
+        Looks up many keys at once, loading each page they are on only once.
+
+        Returns the values in the same order as the keys. A missing key raises
+        KeyError, unless a default is given to use in its place.
+        """
+        keys = list(keys)
+        found = {}
+        for key in self._in_page_order(set(keys)):
+            try:
+                found[key] = self[key]
+            except KeyError:
+                if default is _missing:
+                    raise
+                found[key] = default
+        return [found[key] for key in keys]
+
+    @writing
+    def setmany(self, items):
+        """
+        Sets many (key, value) pairs at once, loading each page they are on only once.
+
+        When a key appears more than once, the last value given for it is kept.
+        """
+        values = {}
+        for key, value in items:
+            values[key] = value
+        for key in self._in_page_order(list(values)):
+            self[key] = values[key]
+
+    def update(self, other=(), **kwargs):
+        """
+        Like dict.update, but grouping the new values by page as setmany does.
+        """
+        items = other
+        if hasattr(other, "keys"):
+            items = ((key, other[key]) for key in other.keys())
+        self.setmany(chain(items, kwargs.items()))
+
+    @writing
+    def delmany(self, keys):
+        """
+        Deletes many keys at once, loading each page they are on only once.
+
+        Raises KeyError if any of them is missing, though only after every key
+        that is there has been deleted.
+        """
+        missing = _missing
+        for key in self._in_page_order(set(keys)):
+            try:
+                del self[key]
+            except KeyError:
+                missing = key
+        if missing is not _missing:
+            raise KeyError(missing)
+
     def page_removed(self, number):
         self._total.remove(number)
 
     def __str__(self):
         return "Dictionary with values stored to " + self._file_base
-
-    def _branchpage(self, pagenumber):
-        self._guarantee_page(pagenumber)
-        if self.pages[pagenumber].currentDepth == self.pages.currentDepth:
-            return
-        self.pages[pagenumber].currentDepth = self.pages.currentDepth
-        for key in set(self.pages[pagenumber].keys()):
-            k = hash(key) & self.pages.currentDepth
-            if k != pagenumber:
-                self._guarantee_page(pagenumber)
-                v = self.pages[pagenumber][key]
-                del self.pages[pagenumber][key]
-                self._guarantee_page(k)
-                self.pages[k][key] = v
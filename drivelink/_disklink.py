@@ -2,13 +2,47 @@ try:
     import cPickle as pickle
 except:
     import pickle
+from contextlib import contextmanager
+from copy import copy
 from os.path import expanduser, join, split
 from os import remove, makedirs, rename
 from glob import glob
+from timeit import default_timer
 import atexit
-import zlib
+import threading
 
-from drivelink.hash import hash
+from drivelink.eviction import make_policy
+from drivelink.compression import make_codec, pack, unpack
+from drivelink._pagestore import BufferedStore, make_store, stores
+from drivelink._serializers import make_serializer, serializers
+from drivelink._wal import LoggedStore, recover
+from drivelink._writeback import WriteBack
+from drivelink._readahead import ReadAhead
+from drivelink._locking import StoreLock, ThreadLock, reading, writing
+from drivelink._stats import Counters
+
+
+def _size(data):
+    return sum(len(chunk) for chunk in data) if isinstance(data, list) else len(data)
+
+
+class _DirtyPages(set):
+    """
+    The dirty page numbers, also noting every page marked since they were last
+    taken, as only those can have changed size.
+    """
+
+    def __init__(self):
+        super(_DirtyPages, self).__init__()
+        self.marked = set()
+
+    def add(self, number):
+        self.marked.add(number)
+        set.add(self, number)
+
+    def take_marked(self):
+        marked, self.marked = self.marked, set()
+        return marked
 
 
 class Link(object):
@@ -30,8 +64,18 @@ class Link(object):
     implementing classes directly (direct use of Class.close() reccommended) or
     through a context manager.
 
-    .. note:: This abstract class is not thread safe, nor is it process safe. Any multithreaded
-              or multiprocessed uses of implemented classes hold no guarantees of accuracy.
+    .. note:: By default this abstract class is not thread safe, nor is it process safe. Any
+              multithreaded or multiprocessed uses of implemented classes hold no guarantees
+              of accuracy, unless they are created with concurrent=True.
+
+    With concurrent=True, every instance using the same files, in any thread or any
+    process on the host, can read and write at the same time. Each operation holds a
+    lock: shared for reads and exclusive for writes across processes (through fcntl
+    on a lock file next to the pages), and one at a time within a process. Changes
+    are written through to disk as soon as each write finishes, and pages another
+    process may have changed are dropped and reloaded. Use `with link.locked():` to
+    make several operations one atomic step. Iterating only holds the lock for one
+    page at a time.
 
     You can configure how this class stores things in a few ways.
 
@@ -53,17 +97,111 @@ class Link(object):
     Even with the somewhat low defaults, this will beat out relying on python to
     use swap space.
 
+    When the values vary a lot in size, max_memory_bytes gives the pages in RAM a
+    byte budget instead, and pages are evicted whenever a page is loaded while the
+    rest take up more than that. A page is reckoned to take as many bytes per item
+    as it did serialized the last time it was read or written, so the budget is
+    approximate and best kept well under the real limit. max_pages still caps the
+    number of pages, so raise it to let the budget decide.
+
+    With auto_tune set, max_pages is instead worked out from the budget (128 MB unless
+    max_memory_bytes says otherwise) and the size of the pages seen so far, and kept
+    up to date as they change. How big items are, how often pages are already in RAM
+    and how often one access lands on the same page as the last are tracked too, and
+    recommend_size_limit turns those into a page size. Changing the page size means
+    rewriting every page, so it is only done when retune is called, ideally when
+    nothing else is using the link.
+
+    Which page goes back to disk when there are too many in memory is decided by the
+    eviction_policy, one of "lru" (the default), "fifo", "clock", "lfu" or "arc", or
+    any policy from :mod:`drivelink.eviction`. LRU suits most access patterns, while
+    ARC and LFU keep frequently used pages around through long one-off scans.
+
+    Only pages that were changed are written back when they leave RAM. Assignment,
+    deletion and the other container methods track this for you, but mutating a
+    stored value in place (like appending to a list held in a Dict) can't be seen,
+    so call mark_dirty with that value's key afterwards.
+
+    By default every page is kept in its own file. With storage="segment" the pages
+    are instead appended to a single segment file with an offset table, which is much
+    kinder to the file system for stores with many pages, and is compacted in the
+    background as old copies of pages pile up. The storage a link was created with is
+    remembered, and opening it with a different one copies the values over.
+
     In order to speed up disk access, you can specify a compression_ratio. compression
-    is performed using Python's built in `ZLib library <https://docs.python.org/library/zlib.html>`_.
+    is performed using Python's built in `ZLib library <https://docs.python.org/library/zlib.html>`_,
+    or any other codec from drivelink.compression named by compression, at the level
+    given by compression_ratio. Pages that don't get any smaller are stored as they are.
+
+    Pages are pickled at the highest protocol by default. The serializer can instead
+    be "marshal", which is quicker for pages of plain builtin values, or "pickle5",
+    which writes the buffers of large binary values like NumPy arrays to disk and
+    reads them back without copying them. Like storage, the serializer a link was
+    created with is remembered, and is used again when serializer is left as None.
+
+    Setting write_back to a number of threads moves the pickling, compression and
+    writing of evicted pages onto that many background writers, so an assignment
+    that causes an eviction doesn't wait on the disk. At most max_pages evicted pages
+    wait for a writer at a time, and a page that is needed again before it has been
+    written is simply taken back. Call flush() (or close()) when everything written
+    so far has to be on disk.
+
+    Scans over every page, like iterating, can read ahead. With read_ahead set, the
+    next that many pages (capped at max_pages) are read and unpickled on a background
+    thread while the current one is in use. They are held aside until the scan gets
+    to them, so they never push the page in use out of RAM.
+
+    Pages and the index are replaced by renaming a new file over the old one, so a
+    crash never leaves a page cut short, but the pages and the index left behind by
+    a crash can still disagree. With sync_interval set, every change goes through a
+    write-ahead log instead, which is fsynced and applied to the pages on each flush,
+    and a background thread flushes every sync_interval seconds, in between the
+    link's operations. After a crash, opening the link again brings it back to how
+    it was at the last flush, losing at most sync_interval seconds of changes (or
+    more, if one operation runs longer). A flush also happens after any operation
+    that leaves a lot of evicted pages waiting in the log. A sync_interval of 0
+    flushes after every operation that changes anything, which is safest but
+    slowest. It can't be combined with concurrent.
+
+    To see how well the settings suit a workload, stats() counts page hits and misses,
+    loads, evictions and writes, and the time spent on each step of moving pages to
+    and from disk. The on_load, on_evict and on_write attributes can also be set to
+    functions to be called as each of those happens.
     """
 
-    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0):
+    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, eviction_policy="lru", storage="files", write_back=0, read_ahead=0, concurrent=False, compression="zlib", serializer=None, max_memory_bytes=None, auto_tune=False, sync_interval=None):
         if max_pages < 1:
             raise ValueError("There must be allowed at least one page in RAM.")
         self.max_pages = max_pages
+        if auto_tune and max_memory_bytes is None:
+            max_memory_bytes = self._default_budget
+        self.max_memory_bytes = max_memory_bytes
+        self.auto_tune = auto_tune
+        self._until_tune = self._tune_every
+        self._last_page = None
+        self._accesses = self._same_page = 0
+        # The serialized size and length of resident pages when they were last
+        # read or written, to estimate their size from under max_memory_bytes.
+        self._measured = {}
+        # What page_size came to for each resident page when it was last counted,
+        # and their total, so the budget can be checked without summing every page.
+        self._estimated = {}
+        self._resident_bytes = 0
         if size_limit < 1:
             raise ValueError("There must be allowed at least one item per page.")
         self.size_limit = size_limit
+        if storage not in stores:
+            raise ValueError("Unknown storage: " + repr(storage))
+        self._storage = storage
+        if sync_interval is not None:
+            if sync_interval < 0:
+                raise ValueError("sync_interval can't be negative.")
+            if concurrent:
+                raise ValueError("Concurrent links can't use a write-ahead log.")
+        self._sync_interval = sync_interval
+        if serializer is not None and serializer not in serializers:
+            raise ValueError("Unknown serializer: " + repr(serializer))
+        self._serializer_name = serializer
         if file_location:
             try:
                 makedirs(file_location)
@@ -75,15 +213,109 @@ class Link(object):
         self._file_loc = file_location
         self._file_basename = file_basename
         self._compression = compression_ratio
+        self._codec = make_codec(compression, compression_ratio)
         self._length = 0
-        self._queue = []
-        self.page_hashes = {}
+        self._policy = make_policy(eviction_policy, max_pages)
+        self._dirty = _DirtyPages() if max_memory_bytes is not None else set()
+        self._write_back = write_back
+        self._writer = None
+        self._read_ahead = min(read_ahead, max_pages)
+        self._reader = None
+        self._hits = self._misses = 0
+        self._counters = Counters(["loads", "evictions", "writes", "bytes_read", "bytes_written",
+                                   "read_seconds", "write_seconds", "decompress_seconds", "compress_seconds",
+                                   "deserialize_seconds", "serialize_seconds"])
         # Just in case, cache pickle.
         self._pickle = pickle
         self._check_old_settings()
-        self.load_index()
+        if concurrent:
+            self._lock = StoreLock(self._file_base + 'Lck', self._reload, self._commit)
+            with self._lock.hold():
+                self._store = self._open_store()
+                # Another process may be reading the segment being swapped out.
+                self._store.compact_min_bytes = None
+                self.load_index()
+        else:
+            if sync_interval is not None:
+                # The log is only committed in between operations, which the
+                # syncing thread has to wait for.
+                self._lock = ThreadLock(self._sync_if_due)
+            self._store = self._open_store()
+            self.load_index()
+            if sync_interval:
+                self._start_syncing(sync_interval)
         atexit.register(Link.close, self)
 
+    def _open_store(self):
+        """
+        Makes the store, first finishing any writes a crash left in its log.
+        """
+        store = make_store(self._storage, self._file_base)
+        recover(store, self._file_base + 'Wal')
+        if self._sync_interval is not None:
+            store = LoggedStore(store, self._file_base + 'Wal')
+        return store
+
+    _stop_syncing = None
+    _sync_error = None
+
+    def _start_syncing(self, interval):
+        """
+        Flushes every interval seconds on a thread of its own, holding the lock so
+        that the pages and the index committed together always agree.
+        """
+        stopped = self._stop_syncing = threading.Event()
+        lock = self._lock
+
+        def run():
+            while not stopped.wait(interval):
+                try:
+                    with lock.hold(True):
+                        if stopped.is_set():
+                            return
+                        self.flush()
+                except Exception as e:
+                    self._sync_error = self._sync_error or e
+        syncer = threading.Thread(target=run)
+        syncer.daemon = True
+        syncer.start()
+
+    def _sync_if_due(self):
+        """
+        Runs as each change to a link with a write-ahead log ends. Flushes if
+        sync_interval is 0 or too much is waiting in the log, and raises the first
+        error the syncing thread ran into.
+        """
+        if self._lock is None:
+            return  # Closed.
+        if self._sync_error is not None:
+            error, self._sync_error = self._sync_error, None
+            raise error
+        if self._sync_interval == 0 or self._store.full():
+            self.flush()
+
+    _lock = None
+    # Whether this link changed its files since the last exclusive hold ended.
+    _files_changed = False
+
+    # Hooks called with the page number when a page is brought into RAM, when one
+    # is evicted (along with whether it was dirty), and when one is written (along
+    # with how many bytes were stored). on_write runs on the writer threads when
+    # write_back is on.
+    on_load = None
+    on_evict = None
+    on_write = None
+
+    # Settings that stores created before they were recorded implicitly used.
+    _legacy_settings = {"storage": "files", "serializer": "pickle"}
+
+    def _settings(self):
+        """
+        The settings that decide how values are laid out on disk, keyed by the
+        constructor arguments that set them.
+        """
+        return {"size_limit": self.size_limit, "storage": self._storage, "serializer": self._serializer_name}
+
     def _check_old_settings(self):
         """
         This loads and saves the settings used to create the drivelink. If different
@@ -91,30 +323,62 @@ class Link(object):
         link, so the values will be copied out into the new structure.
         """
         try:
-            with open(self._file_base + 'Set', 'rb') as f:
-                old_settings = f.read()
-            size_limit = self._pickle.loads(old_settings)
-            if size_limit == self.size_limit:
+            old_settings = self._read_settings(self._file_base)
+            self._adopt_settings(old_settings)
+            if old_settings == self._settings():
                 return
-            self._make_old_values_available(size_limit)
+            self._make_old_values_available(old_settings)
         except IOError:
-            pass
+            self._adopt_settings({})
         with open(self._file_base + 'Set', 'wb') as f:
-            self._pickle.dump(self.size_limit, f)
+            self._pickle.dump(self._settings(), f)
+
+    def _read_settings(self, file_base):
+        """
+        Loads the settings the files at file_base were made with. Raises IOError
+        if there aren't any.
+        """
+        with open(file_base + 'Set', 'rb') as f:
+            old_settings = f.read()
+        old_settings = self._pickle.loads(old_settings)
+        if not isinstance(old_settings, dict):
+            # Only the size_limit used to be saved.
+            old_settings = {"size_limit": old_settings}
+        return dict(self._legacy_settings, **old_settings)
+
+    def _adopt_settings(self, old_settings):
+        """
+        Called with the settings the files were made with (empty for new files)
+        before they are compared, so that settings left as None can take on the
+        value already in use instead of forcing the values to be copied over.
+        """
+        if self._serializer_name is None:
+            self._serializer_name = old_settings.get("serializer", "pickle")
+        self._serializer = make_serializer(self._serializer_name)
 
-    def _make_old_values_available(self, size_limit):
+    def _make_old_values_available(self, old_settings):
         """
         In order to take advantage of lazy loading, it may be worth your time to
         overload this function when you inherit and implement a recovery method yourself.
 
         You have to implement the copy_from function to be able to use this anyway.
+        The old pages are handed to it one after another, each read only once.
+        """
+        self._set_aside()
+        with type(self)(self._file_base, max_pages=min(4, self.max_pages), file_location=self._file_loc, **self._settings()) as new:
+            with type(self)("~" + self._file_basename, max_pages=1, file_location=self._file_loc, **old_settings) as old:
+                new.copy_from(old)
+        self._remove_set_aside()
+
+    def _set_aside(self):
+        """
+        Moves the files out of the way, to file_basename prefixed with a "~".
         """
         for file_name in glob(self._file_base + "*"):
             path, name = split(file_name)
             rename(file_name, join(path, "~" + name))
-        with type(self)(self._file_base, self.size_limit, min(4, self.max_pages), self._file_loc) as new:
-            with type(self)("~" + self._file_basename, size_limit, 1, self._file_loc, -1) as old:
-                new.copy_from(old)
+
+    def _remove_set_aside(self):
         for file_name in glob(join(self._file_loc, "~" + self._file_basename + "*")):
             remove(file_name)
 
@@ -122,6 +386,9 @@ class Link(object):
         """
         Depending on the type of container this link is wrapping, this will transfer
         values from a container of the same time to the new one.
+
+        This is used to fill an empty link, so going through other._iterpages() and
+        filling whole pages at a time is much quicker than copying item by item.
         """
         raise NotImplementedError
 
@@ -135,12 +402,11 @@ class Link(object):
         to override this method and store_index, so that loading is automatic.
         """
         try:
-            with open(self._file_base + 'Len', 'rb') as f:
-                self._stored_index = f.read()
-                other_values = self._pickle.loads(self._stored_index)
-                other_values, self._length = other_values[:-1], other_values[-1]
+            self._stored_index = self._store.read_index()
         except IOError:
             return None
+        other_values = self._pickle.loads(self._stored_index)
+        other_values, self._length = other_values[:-1], other_values[-1]
         return other_values
 
     def store_index(self, *other_values):
@@ -152,13 +418,16 @@ class Link(object):
 
         To save additional items, just pass them as arguments to a super call.
         """
+        if self._batching:
+            return
         to_save = self._pickle.dumps(tuple(other_values) + (self._length,))
         if to_save == self._stored_index:
             return
-        with open(self._file_base + 'Len', 'wb') as f:
-            f.write(to_save)
+        self._store.write_index(to_save)
         self._stored_index = to_save
+        self._files_changed = True
 
+    @reading
     def __len__(self):
         '''
         Returns the number of entries stored.
@@ -176,28 +445,322 @@ class Link(object):
         self.close()
         del self
 
+    @contextmanager
+    def locked(self):
+        '''
+        Holds the store exclusively for the whole block, so a read followed by a
+        write (like `d[k] = d[k] + 1`) can't be interleaved with another thread or
+        process. Without concurrent=True (or a sync_interval, whose thread flushes
+        in between) this does nothing.
+        '''
+        if self._lock is None:
+            yield self
+        else:
+            with self._lock.hold(True):
+                yield self
+
+    _batching = False
+
+    @contextmanager
+    def batch(self, rollback=True):
+        '''
+        Groups a run of changes, like a bulk load, into one step.
+
+        Inside the block the index is saved once at the end, rather than every time
+        a page is evicted. Changed pages that are evicted are held in RAM, already
+        pickled and compressed, and written when the block ends, so a page evicted
+        several times is written only once. If the block raises, they are thrown
+        away and the link goes back to how it was when the block began.
+
+        Holding evicted pages takes RAM, so with rollback=False they are written out
+        as usual and only saving the index is put off, and changes made before an
+        exception are kept. A batch inside another is part of the outer one. With
+        concurrent=True the link is held exclusively for the whole block.
+        '''
+        if self._batching:
+            yield self
+            return
+        with self.locked():
+            buffered = None
+            if rollback:
+                self.flush()
+                buffered = self._store = BufferedStore(self._store)
+            self._batching = True
+            completed = False
+            try:
+                yield self
+                completed = True
+            finally:
+                self._batching = False
+                if completed or buffered is None:
+                    self.store_index()
+                if self._writer is not None:
+                    # Pages still on the writer threads go into the buffer too.
+                    self._writer.flush()
+                if buffered is not None:
+                    self._store = buffered._store
+                    if completed:
+                        buffered.apply()
+                    else:
+                        buffered.discard()
+                        self._reload()
+
+    def _reload(self):
+        """
+        Forgets every page and index value in RAM, after another process changed
+        the files under them.
+        """
+        if self._reader is not None:
+            self._reader.cancel()
+        for number in list(self.pages):
+            self._policy.remove(number)
+        self.pages.clear()
+        self._dirty.clear()
+        self._measured.clear()
+        self._estimated.clear()
+        self._resident_bytes = 0
+        self._stored_index = None
+        self._length = 0
+        self._store.reload()
+        self.load_index()
+
+    def _commit(self):
+        """
+        Puts every change on disk as an exclusive hold ends, and returns whether
+        the files changed, so that other processes only reload when they did.
+        """
+        if self._lock is not None:
+            self.flush()
+        changed, self._files_changed = self._files_changed, False
+        return changed
+
+    @writing
+    def flush(self):
+        '''
+        Writes every changed page and the index to disk, keeping the pages in RAM.
+
+        Once this returns, nothing written so far is waiting in RAM or on a writer
+        thread.
+        '''
+        for number in list(self._dirty):
+            if number in self.pages:
+                # Emptied pages are written too, so that their old values don't
+                # come back if they are read before being evicted and removed.
+                self._write_now(number, self.pages[number])
+                self._dirty.discard(number)
+        if self._writer is not None:
+            self._writer.flush()
+        self.store_index()
+        self._store.flush()
+
+    @writing
     def close(self):
         '''
         Save all the values to disk before closing.
         '''
         if (self is None or not hasattr(self, "_save_page_to_disk")
-                or not hasattr(self, "_file_base") or self._file_base is None):
+                or not hasattr(self, "_store") or self._file_base is None):
             return
+        if self._stop_syncing is not None:
+            # It gets the lock once this is done, and stops.
+            self._stop_syncing.set()
+        self._unload()
+        if self._lock is not None:
+            lock, self._lock = self._lock, None
+            lock.close()
+
+    def _unload(self):
+        """
+        Writes out everything held in RAM and closes the store.
+        """
         while len(self.pages) > 0:
             for key in set(self.pages.keys()):
                 self._save_page_to_disk(key)
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            writer.close()
+        if self._reader is not None:
+            reader, self._reader = self._reader, None
+            reader.close()
+        self.store_index()
+        self._store.close()
 
     def _guarantee_page(self, k):
         """
         Ensures the page is available.
         """
-        if k not in self.pages:
+        if self.auto_tune:
+            self._accesses += 1
+            if k == self._last_page:
+                self._same_page += 1
+            self._last_page = k
+        if k in self.pages:
+            self._hits += 1
+            self._policy.touch(k)
+        else:
+            self._misses += 1
             self.open_page(k)
-        while len(self._queue) > self.max_pages:
-            if self._queue[0] == k:
-                self._queue.append(self._queue[0])
-                del self._queue[0]
-            self._save_page_to_disk(self._queue[0])
+            if self.auto_tune:
+                self._until_tune -= 1
+                if self._until_tune <= 0:
+                    self._tune()
+            if self.max_memory_bytes is not None:
+                # Only pages changed since they were counted can have grown.
+                for number in self._dirty.take_marked() | set([k]):
+                    self._estimate(number)
+                ahead = self._read_ahead_bytes()
+                while len(self.pages) > 1 and self._resident_bytes + ahead > self.max_memory_bytes:
+                    self._evict(self._policy.victim(k))
+        while len(self.pages) > self.max_pages:
+            self._evict(self._policy.victim(k))
+
+    _default_budget = 1 << 27
+    # How many page misses go by between fitting max_pages to the budget.
+    _tune_every = 64
+
+    def _item_size(self):
+        """
+        The average serialized size of an item, over the pages measured so far.
+        """
+        size = length = 0
+        for page_size, page_length in list(self._measured.values()):
+            size += page_size
+            length += page_length
+        return size / float(length) if length else None
+
+    def _tune(self):
+        """
+        Fits max_pages to the memory budget, going by the size of pages so far.
+        """
+        self._until_tune = self._tune_every
+        item = self._item_size()
+        if item is None:
+            return
+        self.max_pages = self._policy.max_pages = max(2, int(self.max_memory_bytes // max(1, item * self.size_limit)))
+
+    def recommend_size_limit(self):
+        '''
+        Suggests a size_limit from what auto_tune has seen, or returns None if it
+        hasn't seen enough yet.
+
+        Pages are aimed at 16 KB when consecutive accesses land on different pages
+        (so little is read that isn't needed), growing towards 1 MB as more of them
+        land on the same page (so scans make fewer, larger reads), while still
+        leaving room for 8 pages in the budget. If nearly every access is already
+        a hit the current size_limit is kept.
+        '''
+        item = self._item_size()
+        if item is None or self._accesses < self._tune_every:
+            return None
+        if self._hits >= 0.99 * (self._hits + self._misses):
+            return self.size_limit
+        locality = self._same_page / float(self._accesses)
+        target = (16 << 10) * 64 ** locality
+        if self.max_memory_bytes is not None:
+            target = min(target, self.max_memory_bytes / 8.0)
+        size_limit = 16
+        while size_limit < 1 << 16 and size_limit * 2 * item <= target:
+            size_limit *= 2
+        return size_limit
+
+    @writing
+    def retune(self, size_limit=None):
+        '''
+        Rewrites the pages with the given size_limit, or the recommended one if
+        none is given, and returns the size_limit now in use. Every value is
+        copied over, so this can take a while on a large link. It can't be used
+        with concurrent links, as other processes would keep the old page size.
+        '''
+        if size_limit is None:
+            size_limit = self.recommend_size_limit()
+        if size_limit is None or size_limit == self.size_limit:
+            return self.size_limit
+        if isinstance(self._lock, StoreLock):
+            raise ValueError("Concurrent links can't be retuned.")
+        self._unload()
+        old_settings = self._settings()
+        self.size_limit = size_limit
+        self._make_old_values_available(old_settings)
+        self._measured.clear()
+        self._estimated.clear()
+        self._resident_bytes = 0
+        self._accesses = self._same_page = self._hits = self._misses = 0
+        self._stored_index = None
+        self._length = 0
+        self._store = self._open_store()
+        self.load_index()
+        return self.size_limit
+
+    def _evict(self, number):
+        dirty = number in self._dirty
+        self._save_page_to_disk(number)
+        self._counters.add(evictions=1)
+        if self.on_evict is not None:
+            self.on_evict(number, dirty)
+
+    @reading
+    def stats(self, reset=False):
+        '''
+        Returns a dict of counters for tuning size_limit and max_pages: page hits
+        and misses, pages loaded from disk, evicted and written, the bytes read and
+        written, and the seconds spent on I/O, (de)compressing and (de)serializing,
+        along with how many pages (and dirty pages) are in RAM now. A high share of
+        misses means the link is thrashing.
+
+        The counts run from when the link was opened, or from the last call with
+        reset set.
+        '''
+        stats = self._counters.snapshot(reset)
+        stats.update(hits=self._hits, misses=self._misses, resident_pages=len(self.pages), dirty_pages=len(self._dirty))
+        if reset:
+            self._hits = self._misses = 0
+        return stats
+
+    def memory_usage(self):
+        '''
+        Roughly how many bytes the pages in RAM take up, going by page_size, and
+        counting pages that were read ahead and are waiting to be used.
+        '''
+        return sum(self.page_size(number) for number in list(self.pages)) + self._read_ahead_bytes()
+
+    def _read_ahead_bytes(self):
+        if self._reader is None:
+            return 0
+        # Pages read ahead take up RAM too while they wait to be used.
+        return sum(size for _, size in self._reader.ready())
+
+    def _estimate(self, number):
+        """
+        Brings what a page counts for in the running total of page sizes up to date.
+        """
+        size = self.page_size(number) if number in self.pages else 0
+        self._resident_bytes += size - self._estimated.pop(number, 0)
+        if number in self.pages:
+            self._estimated[number] = size
+
+    def page_size(self, number):
+        '''
+        Roughly how many bytes the page in RAM takes up. This is its serialized
+        size when it was last read or written, scaled by how many items it has
+        gained or lost since. Pages that know their size better can override this.
+        '''
+        page = self.pages[number]
+        if not len(page):
+            return 0
+        measured = self._measured.get(number)
+        if measured is None:
+            measured = self._measure(number, _size(self._serializer.dumps(page)), page, True)
+        size, length = measured
+        return size * len(page) // max(length, 1)
+
+    def _measure(self, number, size, page, keep=False):
+        if keep or self.max_memory_bytes is not None:
+            self._measured[number] = (size, len(page))
+            if number in self._estimated:
+                estimate = size if len(page) else 0
+                self._resident_bytes += estimate - self._estimated[number]
+                self._estimated[number] = estimate
+        return size, len(page)
 
     def open_page(self, k):
         """
@@ -221,6 +784,19 @@ class Link(object):
         """
         raise NotImplementedError
 
+    @writing
+    def mark_dirty(self, key):
+        '''
+         Flags the page holding key as changed, so it gets written on eviction.
+
+         Assignment and deletion do this automatically. Call it after mutating a
+         stored value in place (e.g. `d[k].append(v)`), otherwise the change may
+         be dropped along with the page.
+        '''
+        i, _ = self._finditem(key)
+        self._dirty.add(i)
+
+    @writing
     def __setitem__(self, key, value):
         '''
          Sets a value that a key maps to.
@@ -232,7 +808,9 @@ class Link(object):
             self._length += 1
         else:
             self.pages[i][k] = value
+        self._dirty.add(i)
 
+    @reading
     def __getitem__(self, key):
         '''
          Retrieves the value the key maps to.
@@ -240,27 +818,66 @@ class Link(object):
         i, k = self._finditem(key)
         return self.pages[i][k]
 
+    @writing
     def __delitem__(self, key):
         '''
          Deletes the entry in question from the pages.
         '''
         i, k = self._finditem(key)
         del self.pages[i][k]
+        self._dirty.add(i)
         self._length -= 1
 
+    @reading
     def __contains__(self, item):
         for page in self._iterpages():
             if item in page:
                 return True
         return False
 
-    def _iterpages(self):
+    def _iterpages(self, reverse=False):
         """
         Pulls up page after page and cycles through all of them.
         """
-        for k in self.page_indices():
-            self._guarantee_page(k)
-            yield self.pages[k]
+        indices = list(self.page_indices())
+        if reverse:
+            indices.reverse()
+        try:
+            for i, k in enumerate(indices):
+                if isinstance(self._lock, StoreLock):
+                    # Only hold the lock for one page at a time, and hand out a
+                    # copy, as others may change the store between pages.
+                    with self._lock.hold():
+                        try:
+                            self._guarantee_page(k)
+                        except IndexError:
+                            return  # Shrunk by someone else in the meantime.
+                        page = copy(self.pages[k])
+                    yield page
+                    continue
+                if self._read_ahead:
+                    self._prefetch(indices[i + 1:i + 1 + self._read_ahead])
+                if self._lock is None:
+                    self._guarantee_page(k)
+                else:
+                    # Pages are only moved while the syncing thread isn't flushing.
+                    with self._lock.hold():
+                        self._guarantee_page(k)
+                yield self.pages[k]
+        finally:
+            if self._reader is not None:
+                self._reader.cancel()
+
+    def _prefetch(self, numbers):
+        """
+        Starts loading the given pages in the background, unless they are already
+        in RAM or still on their way to disk.
+        """
+        if self._reader is None:
+            self._reader = ReadAhead(self._read_page, self._read_ahead)
+        writer = self._writer
+        self._reader.schedule([k for k in numbers if k not in self.pages
+                               and (writer is None or k not in writer)])
 
     def __iter__(self):
         '''
@@ -283,39 +900,82 @@ class Link(object):
         NotImplementedError
 
     def _save_page_to_disk(self, number):
+        """
+        Drops a page from RAM, writing it out first only if it was changed.
+        """
         self.store_index()
         if self._file_base:
             if number in self.pages:
                 if len(self.pages[number]) > 0:
-                    to_save = self._pickle.dumps(self.pages[number])
-                    if self.page_hashes.get(number) != hash(to_save):
-                        if self._compression:
-                            to_save = zlib.compress(to_save, self._compression)
-                        with open(self._file_base + str(number), 'wb') as f:
-                            f.write(to_save)
+                    if number in self._dirty:
+                        self._write_page(number, self.pages[number])
                 else:
-                    try:
-                        remove(self._file_base + str(number))
-                    except OSError as e:
-                        if e.errno != 2:
-                            raise
-                        pass
+                    self._store.remove(number)
+                    self._files_changed = True
                     self.page_removed(number)
                 del self.pages[number]
-            for i in range(len(self._queue)):
-                if self._queue[i] == number:
-                    del self._queue[i]
-                    break
+            self._dirty.discard(number)
+            self._policy.remove(number)
+            self._measured.pop(number, None)
+            self._resident_bytes -= self._estimated.pop(number, 0)
+
+    def _write_page(self, number, page):
+        """
+        Writes a page that is leaving RAM, handing it to the writer threads when
+        write_back is on.
+        """
+        if self._write_back:
+            if self._writer is None:
+                self._writer = WriteBack(self._write_now, self._write_back, self.max_pages)
+            self._writer.submit(number, page)
+        else:
+            self._write_now(number, page)
+
+    def _write_now(self, number, page):
+        start = default_timer()
+        data = self._serializer.dumps(page)
+        serialized = default_timer()
+        if number in self.pages:
+            self._measure(number, _size(data), page)
+        data = pack(data, self._codec)
+        size = _size(data)
+        compressed = default_timer()
+        self._store.write(number, data)
+        self._files_changed = True
+        self._counters.add(writes=1, bytes_written=size, serialize_seconds=serialized - start,
+                           compress_seconds=compressed - serialized, write_seconds=default_timer() - compressed)
+        if self.on_write is not None:
+            self.on_write(number, size)
+
+    def _read_page(self, number):
+        """
+        Returns the page along with its serialized size. The read ahead thread
+        calls this too, so it leaves the link's own state alone.
+        """
+        start = default_timer()
+        stored = self._store.read(number)
+        read = default_timer()
+        data = unpack(stored)
+        decompressed = default_timer()
+        page = self._serializer.loads(data)
+        self._counters.add(loads=1, bytes_read=len(stored), read_seconds=read - start,
+                           decompress_seconds=decompressed - read, deserialize_seconds=default_timer() - decompressed)
+        return page, len(data)
 
     def _load_page_from_disk(self, number):
         if self._file_base:
-            with open(self._file_base + str(number), 'rb') as f:
-                to_load = f.read()
-            try:
-                to_load = zlib.decompress(to_load)
-            except zlib.error:
-                pass
-            self.pages[number] = self._pickle.loads(to_load)
-            on_disk = self._pickle.dumps(self.pages[number])
-            self.page_hashes[number] = hash(on_disk)
-            self._queue.append(number)
+            reclaimed = self._writer.reclaim(number) if self._writer is not None else None
+            if reclaimed is None:
+                loaded = self._reader.take(number) if self._reader is not None else None
+                if loaded is None:
+                    loaded = self._read_page(number)
+                page, size = loaded
+                self.pages[number] = page
+                self._measure(number, size, page)
+            else:
+                self.pages[number], dirty = reclaimed
+                if dirty:
+                    self._dirty.add(number)
+            self._policy.add(number)
+            if self.on_load is not None:
+                self.on_load(number)
@@ -1,16 +1,76 @@
-from collections import MutableSequence
+from collections import MutableSequence, deque
+from itertools import islice
 from os.path import expanduser, join
 
 from drivelink import Link
+from drivelink._locking import reading, writing
+
+
+class _prefix_counts(object):
+    """
+    A Fenwick tree over the number of values on each page, in page order.
+    """
+
+    def __init__(self, counts):
+        tree = [0] * (len(counts) + 1)
+        for i, count in enumerate(counts, 1):
+            tree[i] += count
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, position, delta):
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def before(self, position):
+        """
+        The number of values on the pages before position.
+        """
+        total = 0
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+    def find(self, index):
+        """
+        Returns the position of the page holding index, and where it is on that page.
+        """
+        position = 0
+        step = 1
+        while step * 2 < len(self._tree):
+            step *= 2
+        while step:
+            if position + step < len(self._tree) and self._tree[position + step] <= index:
+                position += step
+                index -= self._tree[position]
+            step //= 2
+        return position, index
+
+
+def _count(start, stop, step):
+    """
+    len(range(start, stop, step)), without building the list Python 2 would.
+    """
+    if step > 0:
+        return max(0, (stop - start + step - 1) // step)
+    return max(0, (start - stop - step - 1) // -step)
 
 
 class List(Link, MutableSequence):
     """
-    A list class that maintains O(k) look up and O(1) append while keeping RAM usage O(1) as well.
-    Unfortunately, insert is O(n/k).
+    A list class that maintains O(k) look up, append, insert and delete while keeping RAM
+    usage O(1) as well.
 
-    This is accomplished through paging every size_limit consecutive values together
-    behind the scenes.
+    This is accomplished through paging consecutive values together behind the scenes.
+    Pages hold between half of size_limit and size_limit values, so an insert or delete
+    only has to split, merge or even out the page it lands on and a neighbour. The
+    number of values on each page is kept with the index, in a prefix count tree that
+    finds the page holding any position in O(log(n/k)).
 
     The object created can be used any way a normal list would be used, and will
     clean itself up on python closing. This means saving all the remaining pages
@@ -39,105 +99,352 @@ class List(Link, MutableSequence):
         ...     print(d[3])
         3
 
+    Slices (with any step) can be read, assigned and deleted. Reading one only
+    loads the pages it covers, and assigning or deleting one repacks just those
+    pages in a single pass.
+
     If there is a way to break list like behavior and you can reproduce it, please
     report it to `the GitHub issues <https://github.com/cdusold/DriveLink/issues/>`_.
     """
 
-    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0):
+    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, eviction_policy="lru", storage="files", write_back=0, read_ahead=0, concurrent=False, compression="zlib", serializer=None, max_memory_bytes=None, auto_tune=False, sync_interval=None):
         self.pages = dict()
-        self._number_of_pages = 0
-        super(List, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio)
+        super(List, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio, eviction_policy, storage, write_back, read_ahead, concurrent, compression, serializer, max_memory_bytes, auto_tune, sync_interval)
 
     def copy_from(self, other):
-        for value in other:
-            self.append(value)
+        self.extend(other)
 
     def load_index(self):
+        # Page numbers in list order, and how many values each holds.
+        self._order = []
+        self._counts = []
+        self._next_page = 0
         other_values = super(List, self).load_index()
-        if other_values is None:
-            return
-        self._number_of_pages = other_values[0]
+        if other_values is not None:
+            if len(other_values) == 1:
+                # Every page used to be full, bar the last.
+                self._order = list(range(other_values[0]))
+                self._counts = [self.size_limit] * other_values[0]
+                if self._counts:
+                    self._counts[-1] = self._length - self.size_limit * (other_values[0] - 1)
+                self._next_page = other_values[0]
+            else:
+                self._order, self._counts, self._next_page = other_values
+        self._recount()
+
+    _tree = None
+    _dropping = None
+
+    @property
+    def _prefix(self):
+        # Rebuilt on first use, so a run of pages dropped or added costs one rebuild.
+        if self._tree is None:
+            self._tree = _prefix_counts(self._counts)
+        return self._tree
+
+    def _recount(self):
+        self._tree = None
 
     def store_index(self):
-        super(List, self).store_index(self._number_of_pages)
+        super(List, self).store_index(self._order, self._counts, self._next_page)
 
     def open_page(self, k):
-        if 0 <= k < self._number_of_pages:
-            self._load_page_from_disk(k)
-        else:
-            raise IndexError
+        self._load_page_from_disk(k)
+
+    def _locate(self, index):
+        """
+        Returns the position of the page holding index, and where it is on that page.
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("list index out of range")
+        return self._prefix.find(index)
 
     def determine_index(self, key):
         """
         Figures out where the key in question should be.
         """
-        if key < 0:
-            key += self._length
-        return divmod(key, self.size_limit)
+        position, i = self._locate(key)
+        return self._order[position], i
 
     def page_indices(self):
-        for k in range(self._number_of_pages):
+        for k in list(self._order):
             yield k
 
+    def _page_at(self, position):
+        k = self._order[position]
+        self._guarantee_page(k)
+        return self.pages[k]
+
+    def _changed(self, position, delta):
+        self._dirty.add(self._order[position])
+        if delta:
+            self._counts[position] += delta
+            if self._tree is not None:
+                self._tree.add(position, delta)
+
+    def _newpage(self, position, values):
+        """
+        Puts a new page holding values at position in the order. The prefix counts
+        have to be rebuilt after.
+        """
+        k = self._next_page
+        self._next_page += 1
+        self._order.insert(position, k)
+        self._counts.insert(position, len(values))
+        self.pages[k] = values
+        self._dirty.add(k)
+        self._policy.add(k)
+        self._guarantee_page(k)
+
+    def _split(self, position):
+        """
+        Moves the top half of an overfull page to a new page after it.
+        """
+        page = self._page_at(position)
+        half = len(page) // 2
+        upper = page[half:]
+        del page[half:]
+        self._changed(position, -len(upper))
+        self._newpage(position + 1, upper)
+        self._recount()
+
+    def _fix(self, position):
+        """
+        Merges an underfull page with a neighbour, or evens the two out if they
+        don't fit on one page. Empty pages are dropped.
+        """
+        if not self._counts[position]:
+            # Dropped straight away, rather than whenever it happens to be evicted.
+            self._drop(position)
+            return
+        if self._counts[position] >= self.size_limit // 2:
+            return
+        if len(self._order) > 1:
+            left = position if position + 1 < len(self._order) else position - 1
+            values = list(self._page_at(left + 1))
+            page = self._page_at(left)
+            if len(page) + len(values) <= self.size_limit:
+                page.extend(values)
+                self._changed(left, len(values))
+                values = []
+            else:
+                half = (len(page) + len(values)) // 2
+                if len(page) < half:
+                    moved = half - len(page)
+                    page.extend(values[:moved])
+                    values = values[moved:]
+                else:
+                    values = page[half:] + values
+                    del page[half:]
+                self._changed(left, len(page) - self._counts[left])
+            page = self._page_at(left + 1)
+            page[:] = values
+            self._changed(left + 1, len(values) - self._counts[left + 1])
+            position = left + 1
+        if not self._counts[position]:
+            self._drop(position)
+
+    def _drop(self, position):
+        """
+        Removes the empty page at position from RAM and disk.
+        """
+        k = self._order[position]
+        self._guarantee_page(k)
+        self._dropping = position
+        try:
+            self._save_page_to_disk(k)
+        finally:
+            self._dropping = None
+
+    def page_removed(self, number):
+        position = self._dropping
+        if position is None or self._order[position] != number:
+            position = self._order.index(number)
+        del self._order[position]
+        del self._counts[position]
+        self._recount()
+
+    def _slice_range(self, key):
+        """
+        The start, stop and step of the indices a slice covers, in ascending order,
+        along with how many there are.
+        """
+        start, stop, step = key.indices(self._length)
+        count = _count(start, stop, step)
+        if step < 0 and count:
+            start, stop, step = start + (count - 1) * step, start + 1, -step
+        return start, stop, step, count
+
+    @reading
+    def __getitem__(self, key):
+        '''
+         Retrieves the value at an index, or a list of those a slice covers,
+         loading each page the slice covers once.
+        '''
+        if not isinstance(key, slice):
+            position, i = self._locate(key)
+            return self._page_at(position)[i]
+        values = []
+        for position, i in self._slice_positions(range(*key.indices(self._length))):
+            values.append(self.pages[self._order[position]][i])
+        return values
+
+    def _slice_positions(self, indices):
+        """
+        Yields (page position, offset) for each index, with that page in RAM.
+        """
+        position = None
+        for index in indices:
+            if position is None or not start <= index < start + self._counts[position]:
+                position, i = self._prefix.find(index)
+                start = index - i
+                self._page_at(position)
+            yield position, index - start
+
+    @writing
+    def __setitem__(self, key, value):
+        '''
+         Sets the value at an index, or replaces the values a slice covers.
+        '''
+        if not isinstance(key, slice):
+            position, i = self._locate(key)
+            self._page_at(position)[i] = value
+            self._changed(position, 0)
+            return
+        value = list(value)
+        start, stop, step = key.indices(self._length)
+        if step == 1:
+            self._rewrite(start, max(start, stop), value)
+            return
+        count = _count(start, stop, step)
+        if len(value) != count:
+            raise ValueError("attempt to assign sequence of size " + str(len(value)) +
+                             " to extended slice of size " + str(count))
+        # Not zip, which would load every page before the first is written on Python 2.
+        for n, (position, i) in enumerate(self._slice_positions(range(start, stop, step))):
+            self.pages[self._order[position]][i] = value[n]
+            self._changed(position, 0)
+
+    def _rewrite(self, start, stop, values, step=1):
+        """
+        Drops every step-th value from start up to stop and puts values in place of
+        the first of them. Only the pages from start to stop are repacked, in a
+        single pass, along with new pages for any extra values.
+        """
+        if not self._order:
+            self._newpage(0, [])
+            self._recount()
+        if start < self._length:
+            first, offset = self._prefix.find(start)
+        else:
+            first = len(self._order) - 1
+            offset = self._counts[first]
+        last = self._prefix.find(stop - 1)[0] if stop > start else first
+        index = start - offset
+        region = self._order[first:last + 1]
+        pending = deque()
+        inserted = False
+        read = written = 0
+        while read < len(region) or pending:
+            # A page is read before it is written over, and then only once it is
+            # clear it won't be the last one.
+            while read < len(region) and (read <= written or len(pending) < self.size_limit):
+                self._guarantee_page(region[read])
+                for v in list(self.pages[region[read]]):
+                    if index == start and not inserted:
+                        pending.extend(values)
+                        inserted = True
+                    if not (start <= index < stop and (index - start) % step == 0):
+                        pending.append(v)
+                    index += 1
+                read += 1
+            if read == len(region) and not inserted:
+                pending.extend(values)
+                inserted = True
+            chunk = [pending.popleft() for _ in range(min(self.size_limit, len(pending)))]
+            if not chunk:
+                break
+            if written < len(region):
+                self._guarantee_page(region[written])
+                self.pages[region[written]][:] = chunk
+                self._dirty.add(region[written])
+                self._counts[first + written] = len(chunk)
+            else:
+                self._newpage(first + written, chunk)
+            written += 1
+        self._length += len(values) - _count(start, stop, step)
+        self._recount()
+        for position in range(first + len(region) - 1, first + written - 1, -1):
+            self._guarantee_page(self._order[position])
+            del self.pages[self._order[position]][:]
+            self._drop(position)
+        if written:
+            # Only the last page written can have been left short.
+            self._fix(first + written - 1)
+
+    @writing
     def __delitem__(self, key):
         '''
-         Deletes the key value in question from the pages.
+         Deletes the value at an index, or all of those a slice covers.
         '''
-        super(List, self).__delitem__(key)
-        i, _ = self.determine_index(key)
-        for i in range(i, self._number_of_pages - 1):
-            self.open_page(i + 1)
-            if self.pages[i + 1]:
-                v = self.pages[i + 1][0]
-                del self.pages[i + 1][0]
-                self.pages[i].append(v)
-                self._guarantee_page(i + 1)
-        self._guarantee_page(self._number_of_pages - 1)
-        if not self.pages[self._number_of_pages - 1]:
-            del self.pages[self._number_of_pages - 1]
-            self._number_of_pages -= 1
+        if isinstance(key, slice):
+            start, stop, step, count = self._slice_range(key)
+            if count:
+                self._rewrite(start, stop, [], step)
+            return
+        position, i = self._locate(key)
+        del self._page_at(position)[i]
+        self._changed(position, -1)
+        self._length -= 1
+        self._fix(position)
 
     def __reversed__(self):
-        for p in reversed(range(self._number_of_pages)):
-            self._guarantee_page(p)
-            for i in reversed(self.pages[p]):
+        for page in self._iterpages(reverse=True):
+            for i in reversed(page):
                 yield i
 
-    def page_removed(self, number):
-        self._number_of_pages -= 1
-
     def __str__(self):
         return "List with values stored to " + self._file_base
 
+    @writing
     def append(self, v):
-        k = self._length // self.size_limit
-        if k == self._number_of_pages:
-            self._newpage()
-        self._guarantee_page(k)
-        self.pages[k].append(v)
-        self._length += 1
+        self.extend([v])
 
+    @writing
+    def extend(self, values):
+        '''
+         Appends the values a whole page at a time.
+        '''
+        if values is self:
+            values = list(values)
+        values = iter(values)
+        pages = len(self._order)
+        while True:
+            room = self.size_limit - self._counts[-1] if self._order else 0
+            chunk = list(islice(values, room or self.size_limit))
+            if not chunk:
+                break
+            if room:
+                self._page_at(len(self._order) - 1).extend(chunk)
+                self._changed(len(self._order) - 1, len(chunk))
+            else:
+                self._newpage(len(self._order), chunk)
+            self._length += len(chunk)
+        if len(self._order) != pages:
+            self._recount()
+
+    @writing
     def insert(self, i, v):
-        k, i = divmod(i, self.size_limit)
-        if k == self._number_of_pages:
-            self._newpage()
-        self._guarantee_page(k)
-        self.pages[k].insert(i, v)
-        if len(self.pages[k]) > self.size_limit:
-            for k in range(k, self._number_of_pages - 1):
-                self._guarantee_page(k)
-                v = self.pages[k][-1]
-                del self.pages[k][-1]
-                self._guarantee_page(k + 1)
-                self.pages[k + 1].insert(0, v)
-            if len(self.pages[self._number_of_pages - 1]) > self.size_limit:
-                self._newpage()
-                self.pages[self._number_of_pages -
-                           1].append(self.pages[self._number_of_pages - 2][-1])
-                del self.pages[self._number_of_pages - 2][-1]
+        if i < 0:
+            i = max(0, i + self._length)
+        if i >= self._length:
+            self.append(v)
+            return
+        position, i = self._prefix.find(i)
+        self._page_at(position).insert(i, v)
+        self._changed(position, 1)
         self._length += 1
-
-    def _newpage(self):
-        self.pages[self._number_of_pages] = []
-        self._queue.append(self._number_of_pages)
-        self._number_of_pages += 1
+        if self._counts[position] > self.size_limit:
+            self._split(position)
@@ -1,7 +1,45 @@
+from collections import OrderedDict as _ordered
 import copy
+import sys
+import threading
 from os.path import join, expanduser
 
 from drivelink import Dict
+from drivelink._ordereddiskdict import OrderedDict
+from drivelink._stats import Counters
+from drivelink.hash import frozen_hash
+
+try:
+    from inspect import signature
+except ImportError:
+    signature = None
+    from inspect import getcallargs, isfunction, ismethod
+
+if sys.version_info >= (3, 5, 2):
+    from inspect import iscoroutinefunction
+else:
+    # The async wrapper needs async syntax and loop.create_future, so it is never
+    # imported before then.
+    def iscoroutinefunction(function):
+        return False
+
+
+class _Flight(object):
+    """
+    One call working out a result, which other calls for the same arguments wait on.
+    """
+
+    def __init__(self):
+        self.owner = threading.current_thread()
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
 
 
 class _Cached:
@@ -9,31 +47,193 @@ class _Cached:
     f = None
     c = None
 
-    def __init__(self, function, file_basename=None, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0):
+    def __init__(self, function, file_basename=None, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, maxsize=None, hot_size=128, copy=True):
         for n in list(n for n in set(dir(function)) - set(dir(self)) if n != '__class__'):
             setattr(self, n, getattr(function, n))
         if file_basename is None:
             file_basename = function.__name__
         self.f = function
-        self.c = Dict(file_basename, size_limit, max_pages, file_location, compression_ratio)
+        self.maxsize = maxsize
+        self.hot_size = hot_size
+        self.copy = copy
+        self._hot = _ordered()
+        self._hot_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._counts = Counters(["hot_hits", "disk_hits", "misses", "waits"])
+        self._signature = None
+        if signature is not None:
+            try:
+                self._signature = signature(function)
+            except (TypeError, ValueError):
+                pass
+        if maxsize is None:
+            self.c = Dict(file_basename, size_limit, max_pages, file_location, compression_ratio)
+        else:
+            # Kept apart from unbounded caches, whose files are laid out differently.
+            self.c = OrderedDict(file_basename + "Bounded", size_limit, max_pages, file_location, compression_ratio)
+        # Caches written before calls were keyed on a hash are keyed on their str()
+        # instead, and those results are moved over as they are asked for again.
+        self._legacy = maxsize is None and isinstance(next(iter(self.c), None), str)
+
+    def _key(self, args, kwargs):
+        """
+        A stable hash of the arguments as the function sees them, so f(1) and
+        f(a=1) share a result.
+        """
+        if self._signature is not None:
+            try:
+                bound = self._signature.bind(*args, **kwargs)
+            except TypeError:
+                return None
+            bound.apply_defaults()
+            args, kwargs = bound.args, bound.kwargs
+        elif signature is None and (isfunction(self.f) or ismethod(self.f)):
+            # Python 2 has no signatures, but binds the same way.
+            try:
+                return frozen_hash(sorted(getcallargs(self.f, *args, **kwargs).items()))
+            except TypeError:
+                return None
+        return frozen_hash((args, sorted(kwargs.items())))
+
+    def _old_key(self, args, kwargs):
+        if self._legacy:
+            return str(args) + str(kwargs)
+
+    def _lookup_hot(self, key):
+        """
+        Returns (True, result) if the result is in RAM, otherwise (False, None).
+        """
+        with self._hot_lock:
+            try:
+                t = self._hot.pop(key)
+            except KeyError:
+                return False, None
+            self._hot[key] = t
+            self._counts.add(hot_hits=1)
+        return True, t
+
+    def _lookup(self, key, old=None):
+        """
+        Returns (True, result) if the result is cached at all, otherwise (False, None).
+        A result still under its old style key is moved to the new one.
+        """
+        found, t = self._lookup_hot(key)
+        if found:
+            return found, t
+        with self._lock:
+            try:
+                t = self.c[key]
+            except KeyError:
+                if old is None or old not in self.c:
+                    return False, None
+                t = self.c[key] = self.c.pop(old)
+            if self.maxsize is not None:
+                self.c.move_to_end(key)
+            self._counts.add(disk_hits=1)
+        self._remember(key, t)
+        return True, t
+
+    def _store(self, key, t):
+        """
+        Caches a new result, returning the copy that was kept.
+        """
+        stored = copy.deepcopy(t) if self.copy else t
+        with self._lock:
+            self._counts.add(misses=1)
+            self.c[key] = stored
+            if self.maxsize is not None and len(self.c) > self.maxsize:
+                self.c.popitem(last=False)
+        self._remember(key, stored)
+        return stored
+
+    def _remember(self, key, value):
+        with self._hot_lock:
+            self._hot[key] = value
+            if len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def stats(self, reset=False):
+        '''
+        Returns a dict counting the calls answered from RAM (hot_hits) and from
+        disk (disk_hits), the ones that ran the function (misses) and the ones that
+        waited on another call for the same arguments (waits). The disk Dict's own
+        stats are under "store".
+        '''
+        stats = self._counts.snapshot(reset)
+        with self._lock:
+            stats["store"] = self.c.stats(reset)
+        return stats
+
+    def _out(self, t):
+        return copy.deepcopy(t) if self.copy else t
 
     def __call__(self, *args, **kwargs):
-        i = str(args) + str(kwargs)
-        if i in self.c:
-            return copy.deepcopy(self.c[i])
-        else:
+        i = self._key(args, kwargs)
+        if i is None:
+            # The arguments don't fit the function, so let it say so.
+            return self.f(*args, **kwargs)
+        found, t = self._lookup(i, self._old_key(args, kwargs))
+        if found:
+            return self._out(t)
+        with self._hot_lock:
+            flight = self._flights.get(i)
+            leading = flight is None
+            if leading:
+                flight = self._flights[i] = _Flight()
+            else:
+                self._counts.add(waits=1)
+        if not leading:
+            if flight.owner is threading.current_thread():
+                # The function is calling itself with the same arguments.
+                return self.f(*args, **kwargs)
+            return self._out(flight.wait())
+        try:
+            # Another thread may have finished it just before.
+            found, t = self._lookup(i, self._old_key(args, kwargs))
+            if found:
+                flight.value = t
+                return self._out(t)
             t = self.f(*args, **kwargs)
-            self.c[i] = copy.deepcopy(t)
+            flight.value = self._store(i, t)
             return t
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._hot_lock:
+                del self._flights[i]
+            flight.done.set()
 
 
-def cached(file_basename=None, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink")):
+def cached(file_basename=None, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, maxsize=None, hot_size=128, copy=True):
     '''
     A decorator that creates a simplistic cached function with minimal overhead.
 
     This provides very simplistic and quick cache. The values are saved to a drivelink.Dict
     and will be reloaded on program restarting.
+
+    Calls are keyed on a stable hash of their arguments, bound to the function's
+    signature. The last hot_size results are also kept in RAM as they are, in front
+    of the Dict. Results are deep copied going in and out so that changing one can't
+    change the cache; pass copy=False to skip that for results that are never changed.
+
+    With maxsize set, only that many results are kept on disk, dropping the least
+    recently used ones first.
+
+    Caches written by versions that keyed calls on str(args) + str(kwargs) are still
+    read: a result found under such a key is moved to its new key the first time it
+    is asked for. This is only looked for when the cache's first key is a str, and
+    results nobody asks for again stay under their old keys until the files go.
+
+    Calls for the same arguments made while the first is still running wait for
+    its result instead of working it out again. Coroutine functions get an async
+    wrapper that does the same across tasks, and does its disk reads and writes
+    in the event loop's executor.
     '''
     def decorator(f):
-        return _Cached(f, file_basename, size_limit, max_pages, file_location)
+        if iscoroutinefunction(f):
+            from drivelink._asyncmemoize import _AsyncCached
+            return _AsyncCached(f, file_basename, size_limit, max_pages, file_location, compression_ratio, maxsize, hot_size, copy)
+        return _Cached(f, file_basename, size_limit, max_pages, file_location, compression_ratio, maxsize, hot_size, copy)
     return decorator
@@ -0,0 +1,165 @@
+"""
+Locking for Links that are shared between threads and processes.
+"""
+from contextlib import contextmanager
+from functools import wraps
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class StoreLock(object):
+    """
+    Guards one store for the threads of this process and, through an advisory
+    fcntl lock on a lock file next to the pages, for every process on the host.
+
+    Readers share the file lock and writers hold it exclusively, while threads in
+    one process take turns, since even a read can load and evict pages. The lock
+    file also holds a generation number that a writer bumps when it lets go, if
+    it changed the files. Whoever takes the lock next and sees a different number
+    knows the pages and index it has in RAM may be stale, and on_change is called
+    to drop them. When an exclusive hold ends, on_commit is called first to put
+    every change on disk, and returns whether the files changed during the hold.
+
+    Holds are reentrant, and a shared hold is upgraded if an exclusive one is
+    taken inside it. flock can't upgrade in place, so the shared lock is let go
+    before the exclusive one is granted and another writer may get in between.
+    The generation is read again once it is granted, so on_change drops whatever
+    that writer changed, but anything the caller read under the shared hold has to
+    be read again after the upgrade. Without fcntl (e.g. on Windows) only threads
+    are kept apart.
+    """
+    _generation = struct.Struct(">Q")
+
+    def __init__(self, path, on_change, on_commit):
+        self._path = path
+        self._on_change = on_change
+        self._on_commit = on_commit
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._exclusive = False
+        self._fd = None
+        self._seen = None
+        self._closing = False
+
+    def _handle(self):
+        if self._fd is None:
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT)
+        return self._fd
+
+    def _read_generation(self):
+        fd = self._handle()
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, self._generation.size)
+        if len(data) < self._generation.size:
+            return 0
+        return self._generation.unpack(data)[0]
+
+    def _write_generation(self, generation):
+        fd = self._handle()
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, self._generation.pack(generation))
+
+    def _acquire(self, exclusive):
+        if fcntl is not None:
+            fcntl.flock(self._handle(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        generation = self._read_generation()
+        if self._seen is not None and generation != self._seen:
+            self._on_change()
+        self._seen = generation
+
+    def _release(self, changed):
+        try:
+            if self._exclusive and changed:
+                self._seen = (self._seen + 1) % (1 << 64)
+                self._write_generation(self._seen)
+        finally:
+            self._exclusive = False
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            if self._closing:
+                os.close(self._fd)
+                self._fd = None
+                self._closing = False
+
+    @contextmanager
+    def hold(self, exclusive=False):
+        with self._mutex:
+            if self._depth == 0 or (exclusive and not self._exclusive):
+                self._acquire(exclusive)
+                self._exclusive = self._exclusive or exclusive
+            self._depth += 1
+            # If the hold is cut short, the files may have changed part way.
+            changed = True
+            try:
+                yield
+                if self._depth == 1 and self._exclusive:
+                    # Still held, so on_commit can take the lock again itself.
+                    changed = self._on_commit()
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release(changed)
+
+    def close(self):
+        """
+        Lets go of the lock file once the current hold, if any, ends.
+        """
+        with self._mutex:
+            if self._depth:
+                self._closing = True
+            elif self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class ThreadLock(object):
+    """
+    Keeps the threads of one process apart, for a link that is only shared with
+    a background thread of its own. As with StoreLock, holds are reentrant and
+    on_commit is called as an exclusive hold ends, unless it ended in an error.
+    """
+
+    def __init__(self, on_commit):
+        self._on_commit = on_commit
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._exclusive = False
+
+    @contextmanager
+    def hold(self, exclusive=False):
+        with self._mutex:
+            self._depth += 1
+            self._exclusive = self._exclusive or exclusive
+            try:
+                yield
+                if self._depth == 1 and self._exclusive:
+                    self._on_commit()
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._exclusive = False
+
+    def close(self):
+        pass
+
+
+def _synchronized(exclusive):
+    def decorate(method):
+        @wraps(method)
+        def locked(self, *args, **kwargs):
+            if self._lock is None:
+                return method(self, *args, **kwargs)
+            with self._lock.hold(exclusive):
+                return method(self, *args, **kwargs)
+        return locked
+    return decorate
+
+
+reading = _synchronized(False)
+writing = _synchronized(True)
@@ -1,67 +1,273 @@
-from collections import MutableMapping
+from collections import MutableMapping, OrderedDict as _ordered
+from contextlib import contextmanager
 from os.path import expanduser, join
-from glob import glob
 
 from drivelink import Link
-from drivelink.hash import hash
+from drivelink._diskdict import Dict
+from drivelink._locking import reading, writing
 
 
 class OrderedDict(Link, MutableMapping):
     """
-    A dictionary class that maintains O(1) look up and write while keeping RAM usage O(1) as well.
+    A dictionary class that remembers the order keys were inserted in, while keeping
+    RAM usage O(1).
 
-    This is accomplished through a rudimentary (for now) hashing scheme to page the
-    dictionary into parts.
+    Items are appended to a chain of pages in insertion order, so iterating (either
+    way) reads the pages one after another, each holding up to size_limit items. A
+    Dict stored next to it (under file_basename + "Keys") maps each key to the page
+    it's on, which keeps look ups, writes and deletes O(1). Pages left mostly empty
+    by deletes are merged into their neighbours.
+
+        >>> with OrderedDict("sampleordereddict") as d:
+        ...     for k in "bca":
+        ...         d[k] = k.upper()
+        ...     d.move_to_end("b")
+        ...     print(", ".join(d))
+        ...     print(d.popitem(last=False))
+        c, a, b
+        ('c', 'C')
+
+    As with collections.OrderedDict, setting an existing key keeps its place. The
+    key index keeps up to max_pages pages of its own in RAM.
     """
 
-    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0):
+    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, eviction_policy="lru", storage="files", write_back=0, read_ahead=0, concurrent=False, compression="zlib", serializer=None, max_memory_bytes=None, auto_tune=False, sync_interval=None):
+        if serializer == "marshal":
+            raise ValueError("marshal can't store the pages of a %s." % type(self).__name__)
         self.pages = {}
-        self._total = set()
-        super(OrderedDict, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio)
+        self._keys = None
+        self._options = dict(compression_ratio=compression_ratio, eviction_policy=eviction_policy, storage=storage,
+                             write_back=write_back, read_ahead=read_ahead, concurrent=concurrent, compression=compression,
+                             serializer=serializer, max_memory_bytes=max_memory_bytes, sync_interval=sync_interval)
+        super(OrderedDict, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio, eviction_policy, storage, write_back, read_ahead, concurrent, compression, serializer, max_memory_bytes, auto_tune, sync_interval)
 
     def copy_from(self, other):
-        for key in other:
-            self[key] = other[key]
+        # Filling an empty one only ever appends, so the keys needn't be looked up.
+        add = self.__setitem__ if self._length else self._append
+        for page in other._iterpages():
+            for key, value in page.items():
+                add(key, value)
 
     def load_index(self):
+        # Pages are chained through _links, which holds [previous, next] for each.
+        self._first = self._last = None
+        self._links = {}
+        self._next_page = 0
+        if self._keys is None:
+            self._keys = Dict(self._file_basename + "Keys", self.size_limit, self.max_pages, self._file_loc, **self._options)
         other_values = super(OrderedDict, self).load_index()
         if other_values is None:
             return
-        for f in glob(self._file_base + '*'):
-            try:
-                self._total.add(int(f[len(self._file_base):]))
-            except ValueError:
-                pass
+        if len(other_values) == 0:
+            self._convert_pages()
+        else:
+            self._first, self._last, self._links, self._next_page = other_values
+
+    def _convert_pages(self):
+        """
+        Brings in files written when pages were picked by hash. No order was kept
+        then, so the items are chained in the order of those old pages.
+        """
+        old = set(self._store.pages())
+        self._length = 0
+        for k in sorted(old):
+            items, _ = self._read_page(k)
+            self._store.remove(k)
+            self._files_changed = True
+            old.discard(k)
+            for key, value in items.items():
+                self._append(key, value, old)
+        self.store_index()
+
+    def store_index(self):
+        super(OrderedDict, self).store_index(self._first, self._last, self._links, self._next_page)
 
     def open_page(self, k):
-        if k in self._total:
-            self._load_page_from_disk(k)
-        if k not in self.pages:
-            self.pages[k] = {}
-            self._total.add(k)
-            self._queue.append(k)
+        if k not in self._links:
+            raise KeyError(k)
+        self._load_page_from_disk(k)
 
     def determine_index(self, key):
         """
         Figures out where the key in question should be.
         """
-        # TODO: Refactor into b-tree
-        k = hash(key) // self.size_limit
-        return k, key
+        return self._keys[key], key
 
     def page_indices(self):
-        for k in list(self._total):
+        k = self._first
+        while k is not None:
             yield k
+            k = self._links[k][1]
 
-    def __contains__(self, item):
-        try:
-            i, k = self._finditem(item)
-        except:
-            return False
-        return k in self.pages[i]
+    def _newpage(self, after, skip=()):
+        """
+        Starts an empty page, linked in after the given one (or first for None).
+        """
+        k = self._next_page
+        while k in skip:
+            k += 1
+        self._next_page = k + 1
+        before = self._first if after is None else self._links[after][1]
+        self._links[k] = [after, before]
+        if after is None:
+            self._first = k
+        else:
+            self._links[after][1] = k
+        if before is None:
+            self._last = k
+        else:
+            self._links[before][0] = k
+        self.pages[k] = _ordered()
+        self._dirty.add(k)
+        self._policy.add(k)
+        self._guarantee_page(k)
+        return k
+
+    def _append(self, key, value, skip=()):
+        k = self._last
+        if k is not None:
+            self._guarantee_page(k)
+        if k is None or len(self.pages[k]) >= self.size_limit:
+            k = self._newpage(k, skip)
+        self.pages[k][key] = value
+        self._dirty.add(k)
+        self._keys[key] = k
+        self._length += 1
+
+    def _prepend(self, key, value):
+        k = self._first
+        if k is not None:
+            self._guarantee_page(k)
+        if k is None or len(self.pages[k]) >= self.size_limit:
+            k = self._newpage(None)
+        items = [(key, value)]
+        items.extend(self.pages[k].items())
+        self.pages[k] = _ordered(items)
+        self._dirty.add(k)
+        self._keys[key] = k
+        self._length += 1
+
+    def _remove(self, key):
+        """
+        Takes a key out of its page, returning its value.
+        """
+        k = self._keys.pop(key)
+        self._guarantee_page(k)
+        value = self.pages[k].pop(key)
+        self._dirty.add(k)
+        self._length -= 1
+        if len(self.pages[k]) <= self.size_limit // 4:
+            self._merge(k)
+        return value
+
+    def _merge(self, k):
+        """
+        Moves what's left of a sparse page into a neighbour with room for it, and
+        drops the page once it's empty.
+        """
+        previous, following = self._links[k]
+        moved = list(self.pages[k].items())
+        for other in (previous, following):
+            if not moved or other is None:
+                continue
+            self._guarantee_page(other)
+            if len(self.pages[other]) + len(moved) > self.size_limit:
+                continue
+            if other == previous:
+                self.pages[other].update(moved)
+            else:
+                self.pages[other] = _ordered(moved + list(self.pages[other].items()))
+            self._dirty.add(other)
+            for key, _ in moved:
+                self._keys[key] = other
+            self._guarantee_page(k)
+            self.pages[k].clear()
+            moved = []
+        self._guarantee_page(k)
+        if not self.pages[k]:
+            self._save_page_to_disk(k)
 
     def page_removed(self, number):
-        self._total.remove(number)
+        previous, following = self._links.pop(number)
+        if previous is None:
+            self._first = following
+        else:
+            self._links[previous][1] = following
+        if following is None:
+            self._last = previous
+        else:
+            self._links[following][0] = previous
+
+    @writing
+    def __setitem__(self, key, value):
+        '''
+         Sets a value that a key maps to, adding new keys at the end.
+        '''
+        try:
+            k = self._keys[key]
+        except KeyError:
+            self._append(key, value)
+            return
+        self._guarantee_page(k)
+        self.pages[k][key] = value
+        self._dirty.add(k)
+
+    @writing
+    def __delitem__(self, key):
+        '''
+         Deletes the key value in question from the pages.
+        '''
+        self._remove(key)
+
+    @reading
+    def __contains__(self, item):
+        return item in self._keys
+
+    def __reversed__(self):
+        for page in self._iterpages(reverse=True):
+            for key in reversed(list(page)):
+                yield key
+
+    @writing
+    def move_to_end(self, key, last=True):
+        """
+        Moves an existing key to the end, or to the beginning if last is False.
+        """
+        value = self._remove(key)
+        if last:
+            self._append(key, value)
+        else:
+            self._prepend(key, value)
+
+    @writing
+    def popitem(self, last=True):
+        """
+        Removes and returns the last (key, value) pair, or the first if last is False.
+        """
+        k = self._last if last else self._first
+        if k is None:
+            raise KeyError("dictionary is empty")
+        self._guarantee_page(k)
+        key = next(reversed(self.pages[k]) if last else iter(self.pages[k]))
+        return key, self._remove(key)
+
+    @writing
+    def flush(self):
+        super(OrderedDict, self).flush()
+        self._keys.flush()
+
+    @contextmanager
+    def batch(self, rollback=True):
+        # The keys are in a Dict of their own, which has to go back along with the pages.
+        with self._keys.batch(rollback):
+            with super(OrderedDict, self).batch(rollback):
+                yield self
+
+    def _unload(self):
+        super(OrderedDict, self)._unload()
+        if getattr(self, "_keys", None) is not None:
+            keys, self._keys = self._keys, None
+            keys.close()
 
     def __str__(self):
         return "Dictionary with values stored to " + self._file_base
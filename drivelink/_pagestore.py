@@ -0,0 +1,507 @@
+"""
+The page stores decide where the bytes of each page end up on disk.
+
+A Link only ever asks its store to read, write or remove a numbered page, to list
+the page numbers it holds, and to read or write the index. How that maps onto
+files is up to the store.
+
+A page to write may be bytes or a list of buffers to be written one after another,
+and reading a page gives back a bytearray, so that serializers can hand large
+buffers to and from the file without copying them.
+
+Pages and the index are replaced by writing a temporary file and renaming it over
+the old one, so a crash part way through leaves either the old or the new copy,
+never a torn one. Nothing is fsynced until sync is called.
+"""
+try:
+    import cPickle as pickle
+except:
+    import pickle
+from os import remove, fstat
+from os.path import getsize, dirname
+import os
+from glob import glob
+import errno
+import struct
+import threading
+
+try:
+    from os import replace
+except ImportError:
+    from os import rename as replace
+
+
+def _chunks(data):
+    if isinstance(data, (bytes, bytearray)):
+        return [data]
+    return data
+
+
+def _fsync_path(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(path):
+    try:
+        _fsync_path(path or os.curdir)
+    except OSError:
+        # Not every platform can open or sync a directory.
+        pass
+
+
+def _read_exactly(f, length):
+    data = bytearray(length)
+    view = memoryview(data)
+    read = 0
+    while read < length:
+        got = f.readinto(view[read:])
+        if not got:
+            raise IOError(errno.EIO, "Page cut short", f.name)
+        read += got
+    return data
+
+
+class _Store(object):
+    """
+    Shared index handling. The index always lives in its own small file.
+    """
+    name = None
+
+    def __init__(self, file_base):
+        self._file_base = file_base
+        self._unsynced = set()
+
+    def _replace(self, path, data):
+        with open(path + 'Tmp', 'wb') as f:
+            f.writelines(_chunks(data))
+        replace(path + 'Tmp', path)
+        self._unsynced.add(path)
+
+    def read_index(self):
+        with open(self._file_base + 'Len', 'rb') as f:
+            return f.read()
+
+    def write_index(self, data):
+        self._replace(self._file_base + 'Len', data)
+
+    def pages(self):
+        raise NotImplementedError
+
+    def read(self, number):
+        raise NotImplementedError
+
+    def write(self, number, data):
+        raise NotImplementedError
+
+    def remove(self, number):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def reload(self):
+        """
+        Forgets anything cached about the files, as another process changed them.
+        """
+        pass
+
+    def sync(self):
+        """
+        Flushes the store and waits until everything written so far is on disk.
+        """
+        self.flush()
+        for path in list(self._unsynced):
+            _fsync_path(path)
+            self._unsynced.discard(path)
+        _fsync_directory(dirname(self._file_base))
+
+    def close(self):
+        self.flush()
+
+
+class FileStore(_Store):
+    """
+    Keeps each page in its own file, named by appending the page number to the
+    file base. This is the original DriveLink layout.
+    """
+    name = "files"
+
+    def pages(self):
+        for f in glob(self._file_base + '*'):
+            try:
+                yield int(f[len(self._file_base):])
+            except ValueError:
+                pass
+
+    def read(self, number):
+        with open(self._file_base + str(number), 'rb') as f:
+            return _read_exactly(f, fstat(f.fileno()).st_size)
+
+    def write(self, number, data):
+        self._replace(self._file_base + str(number), data)
+
+    def remove(self, number):
+        try:
+            remove(self._file_base + str(number))
+        except OSError as e:
+            if e.errno != 2:
+                raise
+            pass
+
+
+class SegmentStore(_Store):
+    """
+    Appends every page to a single segment file and keeps an offset table of where
+    the latest copy of each page starts.
+
+    Reading or writing a page is then one seek plus one read or write, and opening
+    a store only needs the offset table rather than a directory listing. Every
+    record carries its own page number and length, so records appended after the
+    table was last saved are replayed from the segment on open, and a torn record
+    at the end is dropped.
+
+    Overwritten and removed pages leave dead records behind. Once those make up
+    more than compact_ratio of a segment and over compact_min_bytes (if not None), a background
+    thread copies the live records into a fresh segment and swaps it in. Pages can
+    still be read and written while that happens; only the final swap holds the lock.
+    """
+    name = "segment"
+    _header = struct.Struct(">II")
+    _removed = 0xFFFFFFFF
+
+    def __init__(self, file_base, compact_ratio=0.5, compact_min_bytes=1 << 20):
+        super(SegmentStore, self).__init__(file_base)
+        self._path = file_base + 'Seg'
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._lock = threading.RLock()
+        self._file = None
+        self._table = {}
+        self._dead = 0
+        self._table_dirty = False
+        self._compactor = None
+        self._load_table()
+
+    def _handle(self):
+        if self._file is None:
+            self._file = open(self._path, 'ab+')
+        return self._file
+
+    def _size(self):
+        f = self._handle()
+        f.flush()
+        return fstat(f.fileno()).st_size
+
+    def _records(self, f, start, end):
+        """
+        Yields (number, data offset, length, next offset) for each whole record
+        between start and end. Removals have a length of None.
+        """
+        offset = start
+        f.seek(offset)
+        while offset + self._header.size <= end:
+            key_length, length = self._header.unpack(f.read(self._header.size))
+            data_start = offset + self._header.size + key_length
+            if length == self._removed:
+                length, next_offset = None, data_start
+            else:
+                next_offset = data_start + length
+            if next_offset > end:
+                return
+            number = int(f.read(key_length))
+            if length:
+                f.seek(length, 1)
+            yield number, data_start, length, next_offset
+            offset = next_offset
+
+    def _forget(self, number):
+        if number in self._table:
+            self._dead += self._header.size + len(str(number)) + self._table.pop(number)[1]
+
+    def _apply(self, number, data_start, length):
+        self._forget(number)
+        if length is None:
+            self._dead += self._header.size + len(str(number))
+        else:
+            self._table[number] = (data_start, length)
+
+    def _load_table(self):
+        try:
+            end = getsize(self._path)
+        except OSError:
+            return
+        start = 0
+        try:
+            with open(self._file_base + 'Off', 'rb') as f:
+                start, table, dead = pickle.load(f)
+            if start <= end:
+                self._table, self._dead = table, dead
+            else:
+                start = 0
+        except Exception:
+            start = 0
+        f = self._handle()
+        last = start
+        for number, data_start, length, last in self._records(f, start, end):
+            self._apply(number, data_start, length)
+            self._table_dirty = True
+        if last < end:
+            f.truncate(last)
+
+    def pages(self):
+        with self._lock:
+            return list(self._table)
+
+    def read(self, number):
+        with self._lock:
+            try:
+                offset, length = self._table[number]
+            except KeyError:
+                raise IOError(errno.ENOENT, "No such page", self._path + ":" + str(number))
+            f = self._handle()
+            f.seek(offset)
+            return _read_exactly(f, length)
+
+    def _append(self, number, data):
+        key = str(number).encode('ascii')
+        f = self._handle()
+        f.seek(0, 2)
+        start = f.tell()
+        if data is None:
+            f.write(self._header.pack(len(key), self._removed) + key)
+            self._apply(number, start + self._header.size + len(key), None)
+        else:
+            data = _chunks(data)
+            length = sum(len(chunk) for chunk in data)
+            f.write(self._header.pack(len(key), length) + key)
+            f.writelines(data)
+            self._apply(number, start + self._header.size + len(key), length)
+        self._table_dirty = True
+
+    def write(self, number, data):
+        with self._lock:
+            self._append(number, data)
+            self._maybe_compact()
+
+    def remove(self, number):
+        with self._lock:
+            if number in self._table:
+                self._append(number, None)
+                self._maybe_compact()
+
+    def _maybe_compact(self):
+        if (self._compactor is not None or self.compact_min_bytes is None
+                or self._dead < self.compact_min_bytes):
+            return
+        if self._dead > self.compact_ratio * self._handle().tell():
+            self._compactor = threading.Thread(target=self._compact)
+            self._compactor.daemon = True
+            self._compactor.start()
+
+    def compact(self):
+        """
+        Rewrites the segment with only its live records, waiting until it is done.
+        """
+        with self._lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(target=self._compact)
+                self._compactor.start()
+            compactor = self._compactor
+        compactor.join()
+
+    def _copy(self, src, dst, number, offset, length, table):
+        key = str(number).encode('ascii')
+        src.seek(offset)
+        data = src.read(length)
+        table[number] = (dst.tell() + self._header.size + len(key), length)
+        dst.write(self._header.pack(len(key), length) + key)
+        dst.write(data)
+
+    def _compact(self):
+        try:
+            with self._lock:
+                snapshot = sorted(self._table.items(), key=lambda item: item[1])
+                end = self._size()
+            table = {}
+            src = open(self._path, 'rb')
+            dst = open(self._path + 'Tmp', 'wb')
+            try:
+                for number, (offset, length) in snapshot:
+                    self._copy(src, dst, number, offset, length, table)
+                with self._lock:
+                    # Carry over whatever was written while the copy was running.
+                    tail = list(self._records(src, end, self._size()))
+                    for number, offset, length, _ in tail:
+                        if length is None:
+                            table.pop(number, None)
+                        else:
+                            self._copy(src, dst, number, offset, length, table)
+                    src.close()
+                    dst.close()
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                    replace(self._path + 'Tmp', self._path)
+                    self._unsynced.add(self._path)
+                    self._table, self._dead = table, 0
+                    self._table_dirty = True
+                    self.flush()
+            finally:
+                src.close()
+                dst.close()
+        finally:
+            self._compactor = None
+
+    def reload(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._table, self._dead = {}, 0
+            self._table_dirty = False
+            self._load_table()
+
+    def flush(self):
+        with self._lock:
+            if not self._table_dirty:
+                return
+            end = self._size()
+            self._replace(self._file_base + 'Off', pickle.dumps((end, self._table, self._dead), pickle.HIGHEST_PROTOCOL))
+            self._table_dirty = False
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            super(SegmentStore, self).sync()
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self.flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class BufferedStore(object):
+    """
+    Holds the changes meant for another store in RAM, where they are read back
+    from, until apply writes them to it with each page written only once, or
+    discard forgets them.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._pending_bytes = 0
+        self._index = None
+
+    @property
+    def name(self):
+        return self._store.name
+
+    def __getattr__(self, name):
+        # Anything else, like SegmentStore.compact, is the store's own business.
+        if name.startswith("__") or name == "_store":
+            raise AttributeError(name)
+        return getattr(self._store, name)
+
+    def pages(self):
+        with self._lock:
+            pages = set(self._store.pages())
+            for number, data in self._pending.items():
+                if data is None:
+                    pages.discard(number)
+                else:
+                    pages.add(number)
+            return list(pages)
+
+    def read(self, number):
+        with self._lock:
+            if number not in self._pending:
+                return self._store.read(number)
+            data = self._pending[number]
+        if data is None:
+            raise IOError(errno.ENOENT, "No such page", self._file_base + ":" + str(number))
+        return bytearray(data)
+
+    def _change(self, number, data):
+        old = self._pending.get(number)
+        self._pending_bytes += len(data or b"") - len(old or b"")
+        self._pending[number] = data
+
+    def write(self, number, data):
+        if not isinstance(data, bytes):
+            # The buffers may belong to a page that is changed after this returns.
+            data = b"".join(_chunks(data))
+        with self._lock:
+            self._change(number, data)
+
+    def remove(self, number):
+        with self._lock:
+            self._change(number, None)
+
+    def read_index(self):
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            return self._store.read_index()
+
+    def write_index(self, data):
+        with self._lock:
+            self._index = data
+
+    def apply(self):
+        """
+        Writes every change held so far to the store.
+        """
+        with self._lock:
+            for number, data in sorted(self._pending.items()):
+                if data is None:
+                    self._store.remove(number)
+                else:
+                    self._store.write(number, data)
+            if self._index is not None:
+                self._store.write_index(self._index)
+            self.discard()
+            self._store.flush()
+
+    def discard(self):
+        with self._lock:
+            self._pending.clear()
+            self._pending_bytes = 0
+            self._index = None
+
+    def flush(self):
+        # Held changes only reach the store through apply.
+        pass
+
+    def close(self):
+        self._store.close()
+
+
+stores = {"files": FileStore, "segment": SegmentStore}
+
+
+def make_store(storage, file_base):
+    """
+    Builds the page store a Link asked for by name.
+    """
+    try:
+        return stores[storage](file_base)
+    except KeyError:
+        raise ValueError("Unknown storage: " + repr(storage))
@@ -0,0 +1,88 @@
+"""
+Background loading of the pages a scan is about to reach.
+"""
+import threading
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+
+class ReadAhead(object):
+    """
+    Reads and decodes scheduled pages on a background thread.
+
+    Loaded pages wait outside of the Link's pages until they are taken, so they never
+    push a page that is in use out of RAM, and no more than depth of them are held
+    or being loaded at once. A page whose load fails is simply not handed over, and
+    the Link reads it the usual way, which raises the error where it belongs.
+    """
+
+    def __init__(self, load, depth):
+        self._load = load
+        self.depth = depth
+        self._queue = Queue()
+        self._ready = {}
+        self._loading = set()
+        self._done = threading.Condition()
+        self._worker = threading.Thread(target=self._run)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            number = self._queue.get()
+            if number is None:
+                return
+            with self._done:
+                if number not in self._loading:
+                    continue
+            try:
+                page = self._load(number)
+            except Exception:
+                page = None
+            with self._done:
+                if number in self._loading:
+                    self._loading.discard(number)
+                    if page is not None:
+                        self._ready[number] = page
+                self._done.notify_all()
+
+    def schedule(self, numbers):
+        with self._done:
+            for number in numbers:
+                if len(self._ready) + len(self._loading) >= self.depth:
+                    break
+                if number not in self._ready and number not in self._loading:
+                    self._loading.add(number)
+                    self._queue.put(number)
+
+    def take(self, number):
+        """
+        Returns the page if it was read ahead, waiting for it if it is on its way.
+        """
+        with self._done:
+            while number in self._loading:
+                self._done.wait()
+            return self._ready.pop(number, None)
+
+    def ready(self):
+        """
+        Returns what was loaded for the pages read so far and not yet taken.
+        """
+        with self._done:
+            return list(self._ready.values())
+
+    def cancel(self):
+        """
+        Forgets everything scheduled or read so far.
+        """
+        with self._done:
+            self._loading.clear()
+            self._ready.clear()
+
+    def close(self):
+        self.cancel()
+        self._queue.put(None)
+        self._worker.join()
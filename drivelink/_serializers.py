@@ -0,0 +1,116 @@
+"""
+The serializers turn a page into the bytes that get stored, and back.
+
+A serializer's dumps may hand back a single bytes object or a list of buffers to
+be written one after another, which lets large binary values go from the page to
+the file without being copied into one big string first. Its loads is given what
+the store read, which is a writable bytearray for the built in stores.
+"""
+try:
+    import cPickle as pickle
+except:
+    import pickle
+import marshal
+import struct
+import sys
+
+
+def _as_bytes(data):
+    # bytes() of a memoryview is only its repr on Python 2.
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    return bytes(data)
+
+
+class PickleSerializer(object):
+    """
+    Pickles pages at the highest protocol available. Pages pickled at any other
+    protocol, like the ones written by earlier versions, load just the same.
+    """
+    name = "pickle"
+
+    def dumps(self, page):
+        return pickle.dumps(page, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        if sys.version_info[0] < 3:
+            # cPickle only takes a str there, not a bytearray or a memoryview.
+            data = _as_bytes(data)
+        return pickle.loads(data)
+
+
+class MarshalSerializer(object):
+    """
+    Uses marshal, which is faster than pickle but only handles the builtin types
+    (dict, list, tuple, set, str, bytes, int, float, ...), and whose format may
+    change between Python versions.
+    """
+    name = "marshal"
+
+    def dumps(self, page):
+        return marshal.dumps(page)
+
+    def loads(self, data):
+        return marshal.loads(_as_bytes(data))
+
+
+class Pickle5Serializer(object):
+    """
+    Pickles pages with protocol 5, keeping the buffers of large binary values
+    (NumPy arrays, PickleBuffer wrapped objects) out of the pickle.
+
+    Those buffers are written to the file straight after the pickle, and when the
+    page is read back they are handed to pickle as slices of what was read, so
+    they are never copied on the way in or out. The page starts with the length
+    of the pickle and of each buffer.
+    """
+    name = "pickle5"
+    _frame = struct.Struct(">QI")
+
+    def dumps(self, page):
+        buffers = []
+
+        def keep(buffer):
+            try:
+                buffers.append(buffer.raw())
+            except BufferError:
+                # Not contiguous, so it has to go in the pickle after all.
+                return True
+            return False
+
+        body = pickle.dumps(page, 5, buffer_callback=keep)
+        head = self._frame.pack(len(body), len(buffers))
+        head += struct.pack(">%dQ" % len(buffers), *[len(b) for b in buffers])
+        return [head, body] + buffers
+
+    def loads(self, data):
+        view = memoryview(data)
+        if view.readonly:
+            # Values built on the buffers would be read only too.
+            view = memoryview(bytearray(view))
+        size, count = self._frame.unpack_from(view)
+        offset = self._frame.size
+        lengths = struct.unpack_from(">%dQ" % count, view, offset)
+        offset += 8 * count
+        body = view[offset:offset + size]
+        offset += size
+        buffers = []
+        for length in lengths:
+            buffers.append(view[offset:offset + length])
+            offset += length
+        return pickle.loads(body, buffers=buffers)
+
+
+serializers = {"pickle": PickleSerializer, "marshal": MarshalSerializer}
+if pickle.HIGHEST_PROTOCOL >= 5:
+    serializers["pickle5"] = Pickle5Serializer
+
+
+def make_serializer(serializer):
+    """
+    Builds the serializer a Link asked for by name.
+    """
+    try:
+        return serializers[serializer]()
+    except KeyError:
+        raise ValueError("Unknown serializer: " + repr(serializer))
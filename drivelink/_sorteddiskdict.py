@@ -0,0 +1,372 @@
+from bisect import bisect_left, bisect_right
+from collections import MutableMapping
+from os.path import expanduser, join
+
+from drivelink import Link
+from drivelink._locking import reading, writing
+
+
+class _leaf(list):
+    """
+    The sorted keys of one page, with their values alongside in the same order.
+    """
+
+    def __init__(self, keys=(), values=()):
+        super(_leaf, self).__init__(keys)
+        self.values = list(values)
+
+
+class SortedDict(Link, MutableMapping):
+    """
+    A dictionary class that keeps its keys sorted, with O(log(n)) look up and write
+    while keeping RAM usage O(1) as well.
+
+    The items are kept in order across the leaf pages of a B+tree. Its inner level
+    is small enough to stay in RAM with the index: the first key (the fence) and the
+    number of items of every page, in order. Finding a key only loads the one page
+    it could be on, and scanning a range of keys only loads the pages the range
+    covers.
+
+        >>> with SortedDict("samplesorteddict") as d:
+        ...     for k in [5, 1, 4, 2, 3]:
+        ...         d[k] = str(k)
+        ...     print(list(d))
+        ...     print(list(d.irange(2, 4)))
+        ...     print(d.peekitem(0))
+        ...     print(d.floor_key(3.5))
+        [1, 2, 3, 4, 5]
+        [2, 3, 4]
+        (1, '1')
+        3
+
+    Keys may be anything that can be ordered against each other. Pages that have
+    gotten too full are split in half, and ones left mostly empty by deletes are
+    merged into a neighbour.
+    """
+
+    def __init__(self, file_basename, size_limit=1024, max_pages=16, file_location=join(expanduser("~"), ".DriveLink"), compression_ratio=0, eviction_policy="lru", storage="files", write_back=0, read_ahead=0, concurrent=False, compression="zlib", serializer=None, max_memory_bytes=None, auto_tune=False, sync_interval=None):
+        if serializer == "marshal":
+            raise ValueError("marshal can't store the pages of a %s." % type(self).__name__)
+        self.pages = {}
+        super(SortedDict, self).__init__(file_basename, size_limit, max_pages, file_location, compression_ratio, eviction_policy, storage, write_back, read_ahead, concurrent, compression, serializer, max_memory_bytes, auto_tune, sync_interval)
+
+    def copy_from(self, other):
+        if self._length:
+            for page in other._iterpages():
+                for key, value in zip(page, page.values):
+                    self[key] = value
+            return
+        # The other's pages are already in order, so new pages are cut straight
+        # from them.
+        keys, values = [], []
+        for page in other._iterpages():
+            keys.extend(page)
+            values.extend(page.values)
+            while len(keys) >= self.size_limit:
+                self._newpage(len(self._order), _leaf(keys[:self.size_limit], values[:self.size_limit]))
+                self._length += self.size_limit
+                del keys[:self.size_limit]
+                del values[:self.size_limit]
+        if keys:
+            self._newpage(len(self._order), _leaf(keys, values))
+            self._length += len(keys)
+
+    def load_index(self):
+        # Page numbers in key order, with the first key and the length of each.
+        self._order = []
+        self._fences = []
+        self._counts = []
+        self._next_page = 0
+        other_values = super(SortedDict, self).load_index()
+        if other_values is None:
+            return
+        self._order, self._fences, self._counts, self._next_page = other_values
+
+    def store_index(self):
+        super(SortedDict, self).store_index(self._order, self._fences, self._counts, self._next_page)
+
+    def open_page(self, k):
+        self._load_page_from_disk(k)
+
+    def page_indices(self):
+        for k in list(self._order):
+            yield k
+
+    def _position(self, key):
+        """
+        Which page (by position in the order) the key belongs on.
+        """
+        return max(0, bisect_right(self._fences, key) - 1)
+
+    def _leaf_at(self, position):
+        k = self._order[position]
+        self._guarantee_page(k)
+        return self.pages[k]
+
+    def determine_index(self, key):
+        """
+        Figures out where the key in question should be.
+        """
+        if not self._order:
+            raise KeyError(key)
+        return self._order[self._position(key)], key
+
+    def _find(self, key):
+        """
+        Returns the position of the key's page, the page, and where the key is (or
+        would go) in it.
+        """
+        position = self._position(key)
+        page = self._leaf_at(position)
+        return position, page, bisect_left(page, key)
+
+    @reading
+    def __getitem__(self, key):
+        '''
+         Retrieves the value the key maps to.
+        '''
+        if self._order:
+            _, page, i = self._find(key)
+            if i < len(page) and page[i] == key:
+                return page.values[i]
+        raise KeyError(key)
+
+    @reading
+    def __contains__(self, key):
+        if not self._order:
+            return False
+        _, page, i = self._find(key)
+        return i < len(page) and page[i] == key
+
+    @writing
+    def __setitem__(self, key, value):
+        '''
+         Sets a value that a key maps to.
+        '''
+        if not self._order:
+            self._newpage(0, _leaf([key], [value]))
+            self._length += 1
+            return
+        position, page, i = self._find(key)
+        k = self._order[position]
+        self._dirty.add(k)
+        if i < len(page) and page[i] == key:
+            page.values[i] = value
+            return
+        page.insert(i, key)
+        page.values.insert(i, value)
+        self._counts[position] += 1
+        self._fences[position] = page[0]
+        self._length += 1
+        if len(page) > self.size_limit:
+            half = len(page) // 2
+            upper = _leaf(page[half:], page.values[half:])
+            del page[half:]
+            del page.values[half:]
+            self._counts[position] = len(page)
+            self._newpage(position + 1, upper)
+
+    def _newpage(self, position, page):
+        k = self._next_page
+        self._next_page += 1
+        self._order.insert(position, k)
+        self._fences.insert(position, page[0])
+        self._counts.insert(position, len(page))
+        self.pages[k] = page
+        self._dirty.add(k)
+        self._policy.add(k)
+        self._guarantee_page(k)
+
+    @writing
+    def __delitem__(self, key):
+        '''
+         Deletes the key value in question from the pages.
+        '''
+        self.pop(key)
+
+    def _remove(self, position, i):
+        """
+        Takes the i-th item out of the page at position, returning it.
+        """
+        page = self._leaf_at(position)
+        key, value = page.pop(i), page.values.pop(i)
+        self._dirty.add(self._order[position])
+        self._counts[position] -= 1
+        self._length -= 1
+        if page:
+            self._fences[position] = page[0]
+        if len(page) <= self.size_limit // 4:
+            self._merge(position)
+        return key, value
+
+    def _merge(self, position):
+        """
+        Moves what's left of a sparse page into a neighbour with room for it, and
+        drops the page once it's empty.
+        """
+        page = self._leaf_at(position)
+        for other in (position - 1, position + 1):
+            if not page or not 0 <= other < len(self._order):
+                continue
+            if self._counts[other] + len(page) > self.size_limit:
+                continue
+            keys, values = list(page), list(page.values)
+            target = self._leaf_at(other)
+            if other < position:
+                target.extend(keys)
+                target.values.extend(values)
+            else:
+                target[:0] = keys
+                target.values[:0] = values
+                self._fences[other] = keys[0]
+            self._counts[other] += len(keys)
+            self._dirty.add(self._order[other])
+            page = self._leaf_at(position)
+            del page[:]
+            del page.values[:]
+            self._counts[position] = 0
+        if not page:
+            self._save_page_to_disk(self._order[position])
+
+    def page_removed(self, number):
+        position = self._order.index(number)
+        del self._order[position]
+        del self._fences[position]
+        del self._counts[position]
+
+    @writing
+    def pop(self, key, *default):
+        """
+        Removes the key and returns its value, or default if it isn't there.
+        """
+        if self._order:
+            position, page, i = self._find(key)
+            if i < len(page) and page[i] == key:
+                return self._remove(position, i)[1]
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    @writing
+    def popitem(self, index=-1):
+        """
+        Removes and returns the (key, value) pair at index, the last one by default.
+        """
+        position, i = self._locate(index)
+        return self._remove(position, i)
+
+    def _locate(self, index):
+        """
+        Finds the page position and offset within it of the index-th item.
+        """
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("SortedDict index out of range")
+        for position, count in enumerate(self._counts):
+            if index < count:
+                return position, index
+            index -= count
+
+    @reading
+    def peekitem(self, index=-1):
+        """
+        Returns the (key, value) pair at index in sorted order, the last one by default.
+        """
+        position, i = self._locate(index)
+        page = self._leaf_at(position)
+        return page[i], page.values[i]
+
+    @reading
+    def bisect_left(self, key):
+        """
+        The index key would be inserted at, before any equal key.
+        """
+        return self._bisect(key, bisect_left)
+
+    @reading
+    def bisect_right(self, key):
+        """
+        The index key would be inserted at, after any equal key.
+        """
+        return self._bisect(key, bisect_right)
+
+    bisect = bisect_right
+
+    def _bisect(self, key, search):
+        if not self._order:
+            return 0
+        position = self._position(key)
+        return sum(self._counts[:position]) + search(self._leaf_at(position), key)
+
+    def irange(self, minimum=None, maximum=None, inclusive=(True, True), reverse=False):
+        """
+        Yields the keys from minimum to maximum in order, or backwards if reverse is
+        set. Either bound can be None to leave that end open, and inclusive says
+        whether keys equal to each bound are included.
+
+        Only the pages between the bounds are loaded. Keys are picked out a page at
+        a time, each time carrying on from the last key yielded, so with
+        concurrent=True the lock is only held for one page at a time.
+        """
+        while True:
+            keys = self._range_page(minimum, maximum, inclusive, reverse)
+            if not keys:
+                return
+            for key in keys:
+                yield key
+            if reverse:
+                maximum, inclusive = keys[-1], (inclusive[0], False)
+            else:
+                minimum, inclusive = keys[-1], (False, inclusive[1])
+
+    @reading
+    def _range_page(self, minimum, maximum, inclusive, reverse):
+        """
+        The keys between the bounds on the first page that has any, in the order
+        irange yields them.
+        """
+        if not self._order:
+            return []
+        first = 0 if minimum is None else self._position(minimum)
+        last = len(self._order) - 1 if maximum is None else self._position(maximum)
+        positions = range(first, last + 1)
+        for position in (reversed(positions) if reverse else positions):
+            page = self._leaf_at(position)
+            lo, hi = 0, len(page)
+            if minimum is not None:
+                lo = (bisect_left if inclusive[0] else bisect_right)(page, minimum)
+            if maximum is not None:
+                hi = (bisect_right if inclusive[1] else bisect_left)(page, maximum)
+            if lo < hi:
+                keys = list(page[lo:hi])
+                if reverse:
+                    keys.reverse()
+                return keys
+        return []
+
+    @reading
+    def floor_key(self, key):
+        """
+        The greatest key less than or equal to key. Raises KeyError if there isn't one.
+        """
+        for found in self.irange(maximum=key, reverse=True):
+            return found
+        raise KeyError(key)
+
+    @reading
+    def ceiling_key(self, key):
+        """
+        The least key greater than or equal to key. Raises KeyError if there isn't one.
+        """
+        for found in self.irange(minimum=key):
+            return found
+        raise KeyError(key)
+
+    def __reversed__(self):
+        for page in self._iterpages(reverse=True):
+            for key in reversed(page):
+                yield key
+
+    def __str__(self):
+        return "Sorted dictionary with values stored to " + self._file_base
@@ -0,0 +1,35 @@
+"""
+Counters for what a Link's pages cost, kept safe to update from the writer and
+read ahead threads as well as the Link itself.
+"""
+import threading
+
+
+class Counters(object):
+    """
+    A fixed set of named totals, updated together under a lock.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._values = dict.fromkeys(self.names, 0)
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self._values[name] += amount
+
+    def snapshot(self, reset=False):
+        """
+        Returns a dict of the totals, optionally starting them over from 0.
+        """
+        with self._lock:
+            values = dict(self._values)
+            if reset:
+                self._values = dict.fromkeys(self.names, 0)
+        return values
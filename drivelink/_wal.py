@@ -0,0 +1,163 @@
+"""
+A write-ahead log in front of a page store, so that a crash can't leave the pages
+and the index out of step with each other.
+
+Every page write, page removal and index write is appended to the log and held
+in RAM. When the link flushes, having written its changed pages and then its
+index, a commit record is appended and the log is fsynced once for the whole
+group of changes, after which they are applied to the store. The store itself is
+only fsynced when the log grows past checkpoint_bytes and is emptied, so
+durability costs one fsync per group rather than one per page.
+
+On open, every group in the log that was committed is applied again, and anything
+after the last commit is dropped, leaving the store as it was at that commit.
+"""
+from os import remove
+import errno
+import os
+import struct
+import zlib
+
+from drivelink._pagestore import BufferedStore
+
+_record = struct.Struct(">BQII")
+_PAGE, _REMOVE, _INDEX, _COMMIT = 1, 2, 3, 4
+
+
+def _crc(header, data):
+    return zlib.crc32(data, zlib.crc32(header)) & 0xFFFFFFFF
+
+
+def _records(f):
+    """
+    Yields (kind, number, data) for each record, stopping at the first one that
+    was cut short or doesn't match its checksum.
+    """
+    while True:
+        header = f.read(_record.size)
+        if len(header) < _record.size:
+            return
+        kind, number, length, crc = _record.unpack(header)
+        data = f.read(length)
+        if len(data) < length or _crc(header[:-4], data) != crc:
+            return
+        yield kind, number, data
+
+
+def _apply(store, kind, number, data):
+    if kind == _PAGE:
+        store.write(number, data)
+    elif kind == _REMOVE:
+        store.remove(number)
+    elif kind == _INDEX:
+        store.write_index(data)
+
+
+def recover(store, path):
+    """
+    Applies every committed group of changes in the log at path to the store,
+    makes sure they are on disk and removes the log. Returns how many groups
+    were applied.
+    """
+    try:
+        f = open(path, 'rb')
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return 0
+    groups = 0
+    with f:
+        group = []
+        for kind, number, data in _records(f):
+            if kind == _COMMIT:
+                for record in group:
+                    _apply(store, *record)
+                group = []
+                groups += 1
+            else:
+                group.append((kind, number, data))
+    if groups:
+        store.sync()
+    remove(path)
+    return groups
+
+
+class LoggedStore(BufferedStore):
+    """
+    Wraps a page store, logging every change before it reaches the store.
+
+    Changes are only committed by flush (or sync, reload and close), which the
+    link calls once its pages and index agree, and are read back from RAM until
+    then. full() says when more than max_pending bytes of pages are waiting.
+    """
+    max_pending = 1 << 24
+    checkpoint_bytes = 1 << 26
+
+    def __init__(self, store, path):
+        super(LoggedStore, self).__init__(store)
+        self._path = path
+        self._log = open(path, 'ab')
+
+    def _append(self, kind, number, data):
+        header = _record.pack(kind, number, len(data), 0)[:-4]
+        self._log.write(header + struct.pack(">I", _crc(header, data)))
+        self._log.write(data)
+
+    def _change(self, number, data):
+        if data is None:
+            self._append(_REMOVE, number, b"")
+        else:
+            self._append(_PAGE, number, data)
+        super(LoggedStore, self)._change(number, data)
+
+    def write_index(self, data):
+        with self._lock:
+            self._append(_INDEX, 0, data)
+            self._index = data
+
+    def full(self):
+        return self._pending_bytes >= self.max_pending
+
+    def commit(self):
+        """
+        Makes every change so far durable with a single fsync of the log, then
+        applies them to the store.
+        """
+        with self._lock:
+            if not self._pending and self._index is None:
+                return
+            self._append(_COMMIT, 0, b"")
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self.apply()
+            if self._log.tell() >= self.checkpoint_bytes:
+                self._checkpoint()
+
+    def _checkpoint(self):
+        self._store.sync()
+        self._log.seek(0)
+        self._log.truncate()
+        os.fsync(self._log.fileno())
+
+    def flush(self):
+        self.commit()
+
+    def sync(self):
+        with self._lock:
+            self.commit()
+            self._checkpoint()
+
+    def reload(self):
+        with self._lock:
+            self.commit()
+            self._store.reload()
+
+    def close(self):
+        with self._lock:
+            if self._log.closed:
+                return
+            self.commit()
+            self._checkpoint()
+            self._log.close()
+            remove(self._path)
+            self._store.close()
@@ -0,0 +1,108 @@
+"""
+Background writing of evicted pages, so that an eviction doesn't have to wait on
+pickling, compression and the disk.
+"""
+import threading
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+
+class WriteBack(object):
+    """
+    Hands evicted pages to a few writer threads through a bounded queue.
+
+    Each page waits in a pending buffer until a writer picks it up. If the page is
+    needed again before then, reclaim takes it back out and the write is skipped;
+    if a writer is already busy with it, reclaim waits for that write to finish and
+    hands the now clean page back. Either way a page is never written by two threads
+    at once, and never changed while it is being written.
+
+    Submitting blocks once queue_size pages are waiting, which keeps the memory held
+    by pending pages bounded. The first error a writer runs into is raised again from
+    the next submit or flush.
+    """
+
+    def __init__(self, write, workers=1, queue_size=16):
+        self._write = write
+        self._queue = Queue(queue_size)
+        self._pending = {}
+        self._writing = {}
+        self._done = threading.Condition()
+        self._error = None
+        self._workers = []
+        for _ in range(workers):
+            worker = threading.Thread(target=self._run)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            number = self._queue.get()
+            try:
+                if number is None:
+                    return
+                with self._done:
+                    page = self._pending.pop(number, None)
+                    if page is None:
+                        continue
+                    self._writing[number] = page
+                try:
+                    self._write(number, page)
+                except Exception as e:
+                    self._error = self._error or e
+                finally:
+                    with self._done:
+                        del self._writing[number]
+                        self._done.notify_all()
+            finally:
+                self._queue.task_done()
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, number, page):
+        self._raise()
+        with self._done:
+            self._pending[number] = page
+        self._queue.put(number)
+
+    def reclaim(self, number):
+        """
+        Returns (page, dirty) if the page is still waiting on or being written,
+        otherwise None.
+        """
+        with self._done:
+            if number in self._pending:
+                return self._pending.pop(number), True
+            page = self._writing.get(number)
+            while number in self._writing:
+                self._done.wait()
+        if page is None:
+            return None
+        self._raise()
+        return page, False
+
+    def __contains__(self, number):
+        with self._done:
+            return number in self._pending or number in self._writing
+
+    def flush(self):
+        """
+        Waits until every submitted page is on disk.
+        """
+        self._queue.join()
+        self._raise()
+
+    def close(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        self._raise()
@@ -0,0 +1,23 @@
+"""
+.. moduleauthor:: Chris Dusold <DriveLink@chrisdusold.com>
+
+A module containing the compression codecs pages can be stored with.
+
+Every compressed page starts with a short header naming its codec and its size
+before compression, so a page is always read back with the codec that wrote it,
+whichever one the Link is set to now. Pass one of the names in `codecs` as the
+compression of any DriveLink container, with compression_ratio as its level.
+lz4 and zstd are only available when the lz4 and zstandard packages are installed.
+
+"""
+from drivelink.compression._codecs import Codec
+from drivelink.compression._codecs import ZLib
+from drivelink.compression._codecs import BZ2
+from drivelink.compression._codecs import LZMA
+from drivelink.compression._codecs import LZ4
+from drivelink.compression._codecs import Zstd
+from drivelink.compression._codecs import codecs
+from drivelink.compression._codecs import make_codec
+from drivelink.compression._codecs import register
+from drivelink.compression._codecs import pack
+from drivelink.compression._codecs import unpack
@@ -0,0 +1,212 @@
+"""
+The codecs only ever see bytes. A Link packs each page it writes with its codec,
+which adds the header, and unpacks each page it reads, which finds the codec the
+page was written with from that header.
+
+The header is two magic bytes, the codec's id and the size of the page before
+compression. Pages written before there were headers are plain pickles, or zlib
+streams when they were compressed, and are still told apart the old way.
+"""
+
+from struct import Struct
+import sys
+import zlib
+
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_header = Struct(">2sBQ")
+_magic = b"\xd1\x4b"
+
+
+class Codec(object):
+    """
+    The interface every codec implements.
+
+    Each has a unique id between 1 and 255 that is written into every page it
+    compresses, so ids can never be reused. The level is whatever compression_ratio
+    the Link was given, and codecs should treat it as a rough hint.
+    """
+    id = None
+    name = None
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        raise NotImplementedError
+
+    def decompress(self, data, size):
+        raise NotImplementedError
+
+
+class ZLib(Codec):
+    """
+    Python's built in `ZLib library <https://docs.python.org/library/zlib.html>`_.
+    """
+    id = 1
+    name = "zlib"
+
+    def compress(self, data):
+        # -1 is zlib's own default level.
+        return zlib.compress(data, max(-1, min(self.level, 9)))
+
+    def decompress(self, data, size):
+        return zlib.decompress(data, 15, max(size, 1))
+
+
+class BZ2(Codec):
+    """
+    Python's built in bz2 module. Slow, but often the smallest.
+    """
+    id = 2
+    name = "bz2"
+
+    def compress(self, data):
+        return bz2.compress(data, max(1, min(self.level, 9)))
+
+    def decompress(self, data, size):
+        return bz2.decompress(data)
+
+
+class LZMA(Codec):
+    """
+    Python's built in lzma module.
+    """
+    id = 3
+    name = "lzma"
+
+    def compress(self, data):
+        return lzma.compress(data, preset=max(0, min(self.level, 9)))
+
+    def decompress(self, data, size):
+        return lzma.decompress(data)
+
+
+class LZ4(Codec):
+    """
+    LZ4 frames, through the lz4 package. Very fast, with a modest ratio.
+    """
+    id = 4
+    name = "lz4"
+
+    def compress(self, data):
+        return lz4.frame.compress(data, compression_level=self.level)
+
+    def decompress(self, data, size):
+        return lz4.frame.decompress(data)
+
+
+class Zstd(Codec):
+    """
+    Zstandard, through the zstandard package. Fast, with a ratio close to zlib's or better.
+    """
+    id = 5
+    name = "zstd"
+
+    def __init__(self, level):
+        super(Zstd, self).__init__(level)
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def decompress(self, data, size):
+        return self._decompressor.decompress(data, max_output_size=size)
+
+
+codecs = {}
+_by_id = {}
+
+
+def register(codec):
+    """
+    Makes a Codec subclass available by its name, and for reading by its id.
+    """
+    if _by_id.get(codec.id, codec) is not codec:
+        raise ValueError("Codec id " + str(codec.id) + " is already used by " + _by_id[codec.id].name)
+    codecs[codec.name] = codec
+    _by_id[codec.id] = codec
+    return codec
+
+
+register(ZLib)
+for _codec, _module in ((BZ2, bz2), (LZMA, lzma), (LZ4, lz4), (Zstd, zstandard)):
+    if _module is not None:
+        register(_codec)
+
+
+def make_codec(compression, level):
+    """
+    Builds the codec a Link asked for, or None when compression is off.
+    """
+    if not level:
+        return None
+    try:
+        return codecs[compression.lower()](level)
+    except (AttributeError, KeyError):
+        raise ValueError("Unknown compression: " + repr(compression))
+
+
+_decoders = {}
+
+
+def pack(data, codec):
+    """
+    Compresses data with codec (if any), adding the header. The data is kept as
+    it is if compressing wouldn't make it any smaller. Data given as a list of
+    buffers is joined first, unless there is nothing to compress it with.
+    """
+    if codec is None:
+        return data
+    if not isinstance(data, bytes):
+        data = b"".join(data)
+    compressed = codec.compress(data)
+    if len(compressed) + _header.size >= len(data):
+        return _header.pack(_magic, 0, len(data)) + data
+    return _header.pack(_magic, codec.id, len(data)) + compressed
+
+
+def unpack(data):
+    """
+    Undoes pack, whichever codec was used.
+    """
+    if sys.version_info[0] < 3 and isinstance(data, bytearray):
+        # The decompressors there only take a str.
+        data = bytes(data)
+    if data[:2] != _magic:
+        if data[:1] == b"\x78":
+            # A zlib stream from before pages had headers.
+            try:
+                return zlib.decompress(data)
+            except zlib.error:
+                pass
+        return data
+    _, codec_id, size = _header.unpack(data[:_header.size])
+    if codec_id == 0:
+        return memoryview(data)[_header.size:]
+    decoder = _decoders.get(codec_id)
+    if decoder is None:
+        try:
+            decoder = _decoders[codec_id] = _by_id[codec_id](1)
+        except KeyError:
+            raise IOError("Page compressed with unknown codec " + str(codec_id) + " (is it installed?)")
+    return decoder.decompress(data[_header.size:], size)
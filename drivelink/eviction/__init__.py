@@ -0,0 +1,18 @@
+"""
+.. moduleauthor:: Chris Dusold <DriveLink@chrisdusold.com>
+
+A module containing the page eviction policies used by every Link.
+
+Each policy only tracks which pages are in RAM and picks the next one to send
+back to disk, all in O(1) per page access. Pass one of the names in `policies`,
+a policy class or an instance as the eviction_policy of any DriveLink container.
+
+"""
+from drivelink.eviction._policies import Policy
+from drivelink.eviction._policies import FIFO
+from drivelink.eviction._policies import LRU
+from drivelink.eviction._policies import CLOCK
+from drivelink.eviction._policies import LFU
+from drivelink.eviction._policies import ARC
+from drivelink.eviction._policies import policies
+from drivelink.eviction._policies import make_policy
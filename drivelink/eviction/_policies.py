@@ -0,0 +1,299 @@
+"""
+The eviction policies only ever see page numbers. A Link tells its policy when a
+page comes into RAM (add), when a resident page is used again (touch) and when a
+page leaves RAM (remove), then asks for a victim whenever it holds too many pages.
+
+Everything is kept in ordered dictionaries, so each of those calls is O(1) no
+matter how large max_pages gets.
+"""
+
+from collections import OrderedDict
+
+
+class Policy(object):
+    """
+    The interface every eviction policy implements.
+
+    The pinned argument of victim is the page that is currently in use, which
+    must never be chosen. There is always at least one other page to choose from.
+    """
+
+    def __init__(self, max_pages):
+        self.max_pages = max_pages
+
+    def add(self, k):
+        raise NotImplementedError
+
+    def touch(self, k):
+        raise NotImplementedError
+
+    def remove(self, k):
+        raise NotImplementedError
+
+    def victim(self, pinned=None):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, k):
+        raise NotImplementedError
+
+
+def _first(order, pinned):
+    for k in order:
+        if k != pinned:
+            return k
+    return None
+
+
+class FIFO(Policy):
+    """
+    Evicts pages in the order they were loaded, ignoring any later hits.
+
+    This is how DriveLink behaved before policies were pluggable.
+    """
+
+    def __init__(self, max_pages):
+        super(FIFO, self).__init__(max_pages)
+        self._order = OrderedDict()
+
+    def add(self, k):
+        self._order[k] = None
+
+    def touch(self, k):
+        pass
+
+    def remove(self, k):
+        self._order.pop(k, None)
+
+    def victim(self, pinned=None):
+        return _first(self._order, pinned)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, k):
+        return k in self._order
+
+
+class LRU(FIFO):
+    """
+    Evicts the page that has gone the longest without being used.
+    """
+
+    def touch(self, k):
+        if k in self._order:
+            del self._order[k]
+            self._order[k] = None
+
+
+class CLOCK(Policy):
+    """
+    The second chance approximation of LRU.
+
+    A hit only sets a reference bit instead of reordering anything. The clock hand
+    clears set bits as it passes them and stops on the first page without one.
+    """
+
+    def __init__(self, max_pages):
+        super(CLOCK, self).__init__(max_pages)
+        self._ring = OrderedDict()
+
+    def add(self, k):
+        self._ring[k] = False
+
+    def touch(self, k):
+        if k in self._ring:
+            self._ring[k] = True
+
+    def remove(self, k):
+        self._ring.pop(k, None)
+
+    def victim(self, pinned=None):
+        for _ in range(2 * len(self._ring) + 1):
+            k = next(iter(self._ring))
+            referenced = self._ring.pop(k)
+            if k == pinned:
+                self._ring[k] = referenced
+            elif referenced:
+                self._ring[k] = False
+            else:
+                self._ring[k] = False
+                return k
+        return None
+
+    def __len__(self):
+        return len(self._ring)
+
+    def __contains__(self, k):
+        return k in self._ring
+
+
+class LFU(Policy):
+    """
+    Evicts the least frequently used page, oldest first among equal counts.
+
+    Pages are bucketed by their use count, and the buckets are chained together
+    in increasing order, so both a hit and finding the victim are O(1).
+    """
+
+    def __init__(self, max_pages):
+        super(LFU, self).__init__(max_pages)
+        self._counts = {}
+        self._buckets = {}
+        self._higher = {}
+        self._lower = {}
+        self._lowest = None
+
+    def _link(self, k, count, below):
+        if count not in self._buckets:
+            self._buckets[count] = OrderedDict()
+            above = self._lowest if below is None else self._higher[below]
+            self._lower[count] = below
+            self._higher[count] = above
+            if below is None:
+                self._lowest = count
+            else:
+                self._higher[below] = count
+            if above is not None:
+                self._lower[above] = count
+        self._buckets[count][k] = None
+        self._counts[k] = count
+
+    def _unlink(self, k):
+        count = self._counts.pop(k)
+        bucket = self._buckets[count]
+        del bucket[k]
+        if bucket:
+            return count
+        below, above = self._lower.pop(count), self._higher.pop(count)
+        del self._buckets[count]
+        if below is None:
+            self._lowest = above
+        else:
+            self._higher[below] = above
+        if above is not None:
+            self._lower[above] = below
+        return below
+
+    def add(self, k):
+        if k in self._counts:
+            self._unlink(k)
+        self._link(k, 1, None)
+
+    def touch(self, k):
+        if k in self._counts:
+            count = self._counts[k]
+            self._link(k, count + 1, self._unlink(k))
+
+    def remove(self, k):
+        if k in self._counts:
+            self._unlink(k)
+
+    def victim(self, pinned=None):
+        count = self._lowest
+        while count is not None:
+            k = _first(self._buckets[count], pinned)
+            if k is not None:
+                return k
+            count = self._higher[count]
+        return None
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, k):
+        return k in self._counts
+
+
+class ARC(Policy):
+    """
+    Adaptive Replacement Cache, as described by Megiddo and Modha.
+
+    Resident pages are split between those seen once recently (t1) and those seen
+    at least twice (t2). Ghost lists (b1, b2) remember the numbers of pages recently
+    evicted from each, and a hit on a ghost shifts the target size of t1, so the
+    policy leans towards recency or frequency as the workload demands. A single
+    scan over many pages only ever churns t1.
+    """
+
+    def __init__(self, max_pages):
+        super(ARC, self).__init__(max_pages)
+        self._t1 = OrderedDict()
+        self._t2 = OrderedDict()
+        self._b1 = OrderedDict()
+        self._b2 = OrderedDict()
+        self._target = 0
+        self._from_b2 = False
+
+    def add(self, k):
+        c = self.max_pages
+        self._from_b2 = False
+        if k in self._b1:
+            self._target = min(c, self._target + max(len(self._b2) // len(self._b1), 1))
+            del self._b1[k]
+            self._t2[k] = None
+        elif k in self._b2:
+            self._target = max(0, self._target - max(len(self._b1) // len(self._b2), 1))
+            del self._b2[k]
+            self._t2[k] = None
+            self._from_b2 = True
+        else:
+            self._t1[k] = None
+
+    def touch(self, k):
+        if k in self._t1:
+            del self._t1[k]
+            self._t2[k] = None
+        elif k in self._t2:
+            del self._t2[k]
+            self._t2[k] = None
+
+    def remove(self, k):
+        if k in self._t1:
+            del self._t1[k]
+            self._b1[k] = None
+        elif k in self._t2:
+            del self._t2[k]
+            self._b2[k] = None
+        c = self.max_pages
+        while self._b1 and len(self._t1) + len(self._b1) > c:
+            self._b1.popitem(last=False)
+        while self._b2 and len(self._t1) + len(self._t2) + len(self._b1) + len(self._b2) > 2 * c:
+            self._b2.popitem(last=False)
+
+    def victim(self, pinned=None):
+        t1_size = len(self._t1) - (pinned in self._t1)
+        if t1_size and (t1_size > self._target or (self._from_b2 and t1_size == self._target)):
+            order = (self._t1, self._t2)
+        else:
+            order = (self._t2, self._t1)
+        for pages in order:
+            k = _first(pages, pinned)
+            if k is not None:
+                return k
+        return None
+
+    def __len__(self):
+        return len(self._t1) + len(self._t2)
+
+    def __contains__(self, k):
+        return k in self._t1 or k in self._t2
+
+
+policies = {"fifo": FIFO, "lru": LRU, "clock": CLOCK, "lfu": LFU, "arc": ARC}
+
+
+def make_policy(eviction_policy, max_pages):
+    """
+    Builds the policy a Link asked for, by name, by class or as a ready instance.
+    """
+    if isinstance(eviction_policy, Policy):
+        return eviction_policy
+    if isinstance(eviction_policy, type) and issubclass(eviction_policy, Policy):
+        return eviction_policy(max_pages)
+    try:
+        return policies[eviction_policy.lower()](max_pages)
+    except (AttributeError, KeyError):
+        raise ValueError("Unknown eviction policy: " + repr(eviction_policy))
@@ -5,7 +5,13 @@ A module containing general purpose, cross instance hashing.
 
 This module intends to make storage and cache checking stable accross instances.
 
+fast_hash is a quicker 64 bit alternative to hash, used by new Dicts where blake2b is
+available, and otherwise the same as hash. The hashes dict maps the name each is
+recorded under to the function.
+
 """
 from drivelink.hash._hasher import hash
 from drivelink.hash._hasher import frozen_hash
 from drivelink.hash._hasher import Deterministic_Hashable
+from drivelink.hash._hasher import fast_hash
+from drivelink.hash._hasher import hashes, default_hash
@@ -8,6 +8,17 @@ In order to make it backwards compatible, I made it so the hash of an Integral i
 from hashlib import sha256
 from collections import Hashable, Set, Mapping, Iterable
 from numbers import Real
+from struct import Struct
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from hashlib import blake2b
+except ImportError:
+    blake2b = None
 
 class Deterministic_Hashable():
     def __fixed_hash__(self):
@@ -60,5 +71,136 @@ def frozen_hash(o):
         return to_hash(repr((type(o).__name__,) + tuple(sorted(((frozen_hash(k),frozen_hash(v)) for k,v in o.items())))))
     if isinstance(o, Iterable):
         return to_hash(repr((type(o).__name__,) + tuple(frozen_hash(e) for e in o)))
-    # This likely won't work. Probably due to python object default reprs.
-    return to_hash(repr((type(o).__name__, repr(o))))
+    if type(o).__module__ in ("builtins", "__builtin__"):
+        # Floats, None and the like, whose reprs tell their values apart.
+        return to_hash(repr((type(o).__name__, repr(o))))
+    return _state_hash(o)
+
+
+def _state_hash(o):
+    """
+    Hashes any other object by its type and pickle, or failing that its attributes,
+    as its repr can be alike for different values (the default one is only an address).
+    """
+    name = type(o).__module__ + "." + type(o).__name__
+    try:
+        return to_hash(repr((name, pickle.dumps(o, 2))))
+    except Exception:
+        pass
+    if hasattr(o, "__dict__"):
+        return to_hash(repr((name, frozen_hash(vars(o)))))
+    return to_hash(repr((name, repr(o))))
+
+
+_MASK = (1 << 64) - 1
+_u64 = Struct(">Q")
+_f64 = Struct(">d")
+
+
+def _digest(data, tag):
+    return _u64.unpack(blake2b(data, digest_size=8, person=tag).digest())[0]
+
+
+def _mix(o):
+    """
+    The splitmix64 finalizer. Ints that only differ in their high bits, like ids
+    or shifted timestamps, then still differ in the low bits a Dict's directory
+    goes by.
+    """
+    o &= _MASK
+    o = ((o ^ (o >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    o = ((o ^ (o >> 27)) * 0x94D049BB133111EB) & _MASK
+    return o ^ (o >> 31)
+
+
+def _fast_str(o):
+    return _digest(o.encode('utf-8'), b"str")
+
+
+def _fast_bytes(o):
+    return _digest(o, b"bytes")
+
+
+def _fast_items(hashes, tag):
+    return _digest(b"".join(_u64.pack(h) for h in hashes), tag)
+
+
+def _fast_none(o):
+    return _digest(b"", b"None")
+
+
+def _fast_float(o):
+    if o % 1 == 0:
+        return _mix(int(o))
+    return _digest(_f64.pack(o), b"float")
+
+
+def _fast_tuple(o):
+    return _fast_items((fast_hash(e) for e in o), b"tuple")
+
+
+def _fast_frozenset(o):
+    return _fast_items(sorted(fast_hash(e) for e in o), b"frozenset")
+
+
+def _fast_native(o):
+    """
+    A Python 2 str equals the unicode it decodes to as ASCII, so it hashes the same.
+    """
+    try:
+        return _fast_str(o.decode('ascii'))
+    except UnicodeDecodeError:
+        return _fast_bytes(o)
+
+
+_by_type = {
+    bool: _mix,
+    int: _mix,
+    float: _fast_float,
+    bytes: _fast_bytes,
+    str: _fast_str,
+    tuple: _fast_tuple,
+    frozenset: _fast_frozenset,
+    type(None): _fast_none,
+}
+try:
+    _by_type[long] = _mix
+    _by_type[unicode] = _fast_str
+    _by_type[str] = _fast_native
+except NameError:
+    pass
+
+
+def fast_hash(o):
+    """
+    A stable 64 bit hash, much quicker than hash for the common key types.
+
+    The type of the key picks how it's hashed, so none of them go through an
+    exception first. Equal keys of different number or string types hash the same,
+    but unlike hash, integral numbers are mixed rather than being their own hash,
+    so that keys differing only in their high bits are spread out too.
+    """
+    hasher = _by_type.get(type(o))
+    if hasher is not None:
+        return hasher(o)
+    if isinstance(o, Deterministic_Hashable):
+        return o.__fixed_hash__() & _MASK
+    if isinstance(o, Real):
+        return _fast_float(float(o)) if o % 1 else _mix(int(o))
+    if not isinstance(o, Hashable):
+        raise TypeError("unhashable type: '" + type(o).__name__ + "'")
+    if isinstance(o, Set):
+        return _fast_items(sorted(fast_hash(e) for e in o), type(o).__name__.encode('utf-8')[:16])
+    if isinstance(o, Iterable):
+        return _fast_items((fast_hash(e) for e in o), type(o).__name__.encode('utf-8')[:16])
+    return _fast_str(repr((type(o).__name__, repr(o))))
+
+
+hashes = {"sha256": hash}
+default_hash = "sha256"
+if blake2b is not None:
+    hashes["blake2b"] = fast_hash
+    default_hash = "blake2b"
+else:
+    # Without blake2b (as on Python 2) there is nothing quicker, so stay with hash.
+    fast_hash = hash
@@ -20,8 +20,9 @@ setup(
     license=read("LICENSE"),
     keywords="memory",
     url="http://drivelink.rtfd.org/",
-    packages=['drivelink', 'drivelink.hash', 'tests'],
+    packages=['drivelink', 'drivelink.compression', 'drivelink.eviction', 'drivelink.hash', 'tests'],
     long_description=read('README.rst'),
+    extras_require={"numpy": ["numpy"], "lz4": ["lz4"], "zstd": ["zstandard"]},
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
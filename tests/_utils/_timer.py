@@ -1,12 +1,13 @@
-import time as time
+from timeit import default_timer
 
 #Borrowed from the URL:
 #http://preshing.com/20110924/timing-your-code-using-pythons-with-statement/
 #Since I couldn't find exactly what I wanted elsewhere.
+#time.clock is gone as of Python 3.8, so this uses the best wall clock timer there is.
 class Timer:    
     def __enter__(self):
-        self.start = time.clock()
+        self.start = default_timer()
         return self
     def __exit__(self, *args):
-        self.end = time.clock()
-        self.interval = self.end - self.start
\ No newline at end of file
+        self.end = default_timer()
+        self.interval = self.end - self.start
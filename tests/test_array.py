@@ -0,0 +1,113 @@
+from drivelink import Array
+import drivelink._diskarray
+import pytest
+
+needs_cast = pytest.mark.skipif(not drivelink._diskarray._can_cast and drivelink._diskarray.numpy is None,
+                                reason="Array needs NumPy on Python 2")
+
+
+@pytest.fixture(params=["numpy", "array"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    elif not drivelink._diskarray._can_cast:
+        pytest.skip("Array needs NumPy on Python 2")
+    else:
+        monkeypatch.setattr(drivelink._diskarray, "numpy", None)
+    return request.param
+
+
+def test_array(backend):
+    with Array("testArray" + backend, 4, 2, typecode="d") as a:
+        for i in range(10):
+            a.append(i / 2.0)
+        for i in range(10):
+            assert a[i] == i / 2.0
+        assert a[-1] == 4.5
+        assert len(a) == 10
+        with pytest.raises(IndexError):
+            a[10]
+
+
+def test_save(backend):
+    with Array("testArraySave" + backend, 3, 1, typecode="i") as a:
+        a.extend(range(10))
+    with Array("testArraySave" + backend, 3, 1, typecode="i") as a:
+        assert list(a) == list(range(10))
+        assert list(reversed(a)) == list(reversed(range(10)))
+        assert 7 in a
+        assert 11 not in a
+
+
+def test_slices(backend):
+    with Array("testArraySlices" + backend, 4, 2, typecode="q") as a:
+        a.extend(range(20))
+        assert list(a[1:3]) == [1, 2]
+        assert list(a[2:11]) == list(range(2, 11))
+        assert list(a[1:18:3]) == list(range(1, 18, 3))
+        assert list(a[15:2:-4]) == list(range(15, 2, -4))
+        assert list(a[5:5]) == []
+
+
+def test_insert_delete(backend):
+    with Array("testArrayInsertDelete" + backend, 3, 1, typecode="h") as a:
+        a.extend([0, 1, 3, 4, 5, 6, 8])
+        a.insert(2, 2)
+        a.insert(7, 7)
+        a.insert(0, -1)
+        assert list(a) == list(range(-1, 9))
+        del a[0]
+        del a[4]
+        del a[-1]
+        assert list(a) == [0, 1, 2, 3, 5, 6, 7]
+        assert a.pop() == 7
+        assert len(a) == 6
+
+
+def test_change_settings(backend):
+    with Array("testArrayChangeSettings" + backend, 2, 1, typecode="d") as a:
+        a.extend([1, 2, 3])
+    with Array("testArrayChangeSettings" + backend, 3, 2, typecode="d") as a:
+        assert list(a) == [1, 2, 3]
+    with Array("testArrayChangeSettings" + backend, 3, 2, typecode="f") as a:
+        assert list(a) == [1, 2, 3]
+
+
+def test_numpy_views():
+    numpy = pytest.importorskip("numpy")
+    with Array("testArrayNumpy", 8, 2, typecode=numpy.float32) as a:
+        a.extend(numpy.arange(20))
+        view = a[2:6]
+        assert isinstance(view, numpy.ndarray)
+        view[0] = 100
+        assert a[2] == 100
+        assert a[6:10].tolist() == [6, 7, 8, 9]
+        assert a.typecode == numpy.dtype(numpy.float32).str
+
+
+@needs_cast
+def test_string_funcs():
+    a = Array("testArrayStringFuncs")
+    assert str(a).startswith("Array ")
+    assert str(a).endswith("testArrayStringFuncs")
+    assert repr(a).startswith("Array(")
+    assert repr(a).endswith(".DriveLink', typecode='d')")
+    with eval(repr(a)) as b:
+        assert b.typecode == "d"
+
+
+@needs_cast
+def test_positional_arguments(tmpdir):
+    # Like the other containers, size_limit, max_pages and file_location come first.
+    with Array("testArrayPositional", 2, 1, str(tmpdir)) as a:
+        a.extend([1.0, 2.0, 3.0])
+        assert a.size_limit == 2
+        assert a.max_pages == 1
+        assert a.typecode == "d"
+
+
+@pytest.mark.skipif(drivelink._diskarray._can_cast, reason="only Python 2 can't view pages without NumPy")
+def test_needs_numpy(monkeypatch):
+    monkeypatch.setattr(drivelink._diskarray, "numpy", None)
+    with pytest.raises(ValueError):
+        Array("testArrayNeedsNumpy")
@@ -0,0 +1,40 @@
+from drivelink import Dict, List, OrderedDict
+
+
+def test_max_pages_follows_budget():
+    with Dict("testAutoTune", 16, 2, max_memory_bytes=1 << 20, auto_tune=True) as d:
+        for i in range(5000):
+            d[i] = "x" * 100
+        # Pages of 16 items of ~100 bytes leave room for hundreds of them.
+        assert d.max_pages > 100
+        assert d.memory_usage() <= 1 << 20
+
+
+def test_recommend_and_retune():
+    with List("testAutoTuneList", 16, 4, max_memory_bytes=1 << 22, auto_tune=True) as l:
+        assert l.recommend_size_limit() is None
+        l.extend(range(20000))
+        for _ in range(2):
+            for v in l:
+                pass
+            for i in range(0, 20000, 7):
+                l[i]
+        recommended = l.recommend_size_limit()
+        assert recommended > 16
+        assert l.retune() == recommended
+        assert l.size_limit == recommended
+        assert len(l) == 20000
+        assert l[12345] == 12345
+    with List("testAutoTuneList", recommended, 4) as l:
+        assert list(l) == list(range(20000))
+
+
+def test_retune_ordereddict():
+    with OrderedDict("testAutoTuneOrdered", 4, 2, auto_tune=True) as d:
+        for i in range(100):
+            d[i] = i
+        assert d.retune(32) == 32
+        assert list(d) == list(range(100))
+        d[100] = 100
+    with OrderedDict("testAutoTuneOrdered", 32, 2) as d:
+        assert list(d.items()) == [(i, i) for i in range(101)]
@@ -0,0 +1,89 @@
+from drivelink import Dict, List, OrderedDict
+import pytest
+
+
+def count_calls(obj, name):
+    calls = []
+    method = getattr(obj, name)
+
+    def counted(*args):
+        calls.append(args[0])
+        return method(*args)
+    setattr(obj, name, counted)
+    return calls
+
+
+def test_batch_writes_once():
+    with Dict("testBatchWritesOnce", 1, 2) as d:
+        index_writes = count_calls(d._store, "write_index")
+        page_writes = count_calls(d._store, "write")
+        with d.batch():
+            # Whatever was written before the batch is saved first.
+            del index_writes[:], page_writes[:]
+            for _ in range(3):
+                for i in range(10):
+                    d[i] = i
+            assert index_writes == []
+            assert page_writes == []
+        assert len(index_writes) == 1
+        assert sorted(page_writes) == sorted(set(page_writes))
+        assert len(d) == 10
+    with Dict("testBatchWritesOnce", 1, 2) as d:
+        assert [d[i] for i in range(10)] == list(range(10))
+
+
+def test_batch_rollback():
+    with Dict("testBatchRollback", 1, 2) as d:
+        for i in range(5):
+            d[i] = i
+        with pytest.raises(KeyError):
+            with d.batch():
+                for i in range(20):
+                    d[i] = -i
+                del d[0]
+                raise KeyError("Oops")
+        assert len(d) == 5
+        assert [d[i] for i in range(5)] == list(range(5))
+        assert 10 not in d
+    with Dict("testBatchRollback", 1, 2) as d:
+        assert len(d) == 5
+        assert [d[i] for i in range(5)] == list(range(5))
+
+
+def test_batch_without_rollback():
+    with List("testBatchNoRollback", 2, 1) as l:
+        with pytest.raises(ValueError):
+            with l.batch(rollback=False):
+                l.extend(range(10))
+                raise ValueError()
+        assert list(l) == list(range(10))
+    with List("testBatchNoRollback", 2, 1) as l:
+        assert list(l) == list(range(10))
+
+
+def test_nested_batch_rollback():
+    with List("testNestedBatch", 2, 1) as l:
+        l.extend(range(4))
+        with pytest.raises(ValueError):
+            with l.batch():
+                l.append(4)
+                with l.batch():
+                    l.insert(0, -1)
+                raise ValueError()
+        assert list(l) == list(range(4))
+
+
+def test_ordereddict_batch_rollback():
+    with OrderedDict("testOrderedBatch", 1, 1) as d:
+        d["a"] = 1
+        d["b"] = 2
+        with pytest.raises(RuntimeError):
+            with d.batch():
+                del d["a"]
+                d["c"] = 3
+                raise RuntimeError()
+        assert list(d.items()) == [("a", 1), ("b", 2)]
+        with d.batch():
+            d["c"] = 3
+    with OrderedDict("testOrderedBatch", 1, 1) as d:
+        assert list(d.items()) == [("a", 1), ("b", 2), ("c", 3)]
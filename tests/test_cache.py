@@ -1,4 +1,6 @@
 import unittest as ut
+import threading
+import time
 
 from tests._utils._timer import Timer
 from drivelink import cached
@@ -72,6 +74,124 @@ class cachedTest(ut.TestCase):
                         "There isn't a speed up... This is useless then, I suppose.")
 
 
+def test_bound_arguments(tmpdir):
+    calls = []
+
+    @cached("testCachedBound", 2, 1, str(tmpdir))
+    def add(a, b=1):
+        calls.append((a, b))
+        return a + b
+    assert add(1) == 2
+    assert add(a=1) == 2
+    assert add(1, 1) == 2
+    assert add(2, b=3) == 5
+    assert calls == [(1, 1), (2, 3)]
+    assert len(add.c) == 2
+
+
+class Opaque(object):
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return "Opaque"
+
+
+def test_repr_collision(tmpdir):
+    class Local(Opaque):
+        pass
+
+    @cached("testCachedRepr", 2, 1, str(tmpdir))
+    def unwrap(s):
+        return s.value
+    assert unwrap(Opaque(1)) == 1
+    assert unwrap(Opaque(2)) == 2
+    assert unwrap(Opaque(1)) == 1
+    # Can't be pickled, so told apart by its attributes.
+    assert unwrap(Local(3)) == 3
+    assert unwrap(Local(4)) == 4
+    assert unwrap.stats()["misses"] == 4
+
+
+def test_old_keys(tmpdir):
+    from drivelink import Dict
+    with Dict("old", file_location=str(tmpdir)) as d:
+        d[str((2,)) + str({})] = 4
+    calls = []
+
+    @cached("old", file_location=str(tmpdir))
+    def square(n):
+        calls.append(n)
+        return n * n
+    assert square(2) == 4
+    assert square(3) == 9
+    assert calls == [3]
+    assert len(square.c) == 2
+    assert str((2,)) + str({}) not in square.c
+
+
+def test_copy():
+    @cached("testCachedCopy", 2, 1)
+    def make(n):
+        return [n]
+    make(1).append(2)
+    assert make(1) == [1]
+
+    @cached("testCachedNoCopy", 2, 1, copy=False)
+    def share(n):
+        return [n]
+    assert share(1) is share(1)
+
+
+def test_maxsize(tmpdir):
+    calls = []
+
+    @cached("testCachedMaxsize", 2, 2, str(tmpdir), maxsize=3, hot_size=0)
+    def square(n):
+        calls.append(n)
+        return n * n
+    for n in [1, 2, 3, 1, 4]:
+        assert square(n) == n * n
+    assert len(square.c) == 3
+    assert square(1) == 1
+    assert square(2) == 4
+    assert calls == [1, 2, 3, 4, 2]
+
+
+def test_compression_ratio():
+    @cached("testCachedCompression", 2, 1, compression_ratio=6)
+    def text(n):
+        return "x" * 1000 * n
+    assert text(1) == "x" * 1000
+    assert text.c._codec is not None
+
+
+def test_single_flight_threads(tmpdir):
+    calls = []
+    started = threading.Event()
+
+    @cached("testCachedThreads", 2, 1, str(tmpdir))
+    def slow(n):
+        calls.append(n)
+        started.set()
+        time.sleep(0.1)
+        return n * 2
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow(4))) for _ in range(8)]
+    for t in threads:
+        t.daemon = True
+    threads[0].start()
+    started.wait(10)
+    assert started.is_set()
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join(10)
+        assert not t.is_alive()
+    assert results == [8] * 8
+    assert calls == [4]
+
+
 if __name__ == '__main__':
     freeze_support()
     ut.main()
@@ -0,0 +1,27 @@
+import asyncio
+
+from drivelink import cached
+
+
+def test_async(tmpdir):
+    calls = []
+
+    @cached("testCachedAsync", 2, 1, str(tmpdir), hot_size=0)
+    async def slow(n):
+        calls.append(n)
+        await asyncio.sleep(0.05)
+        if n < 0:
+            raise ValueError(n)
+        return n * 2
+
+    async def run():
+        assert await asyncio.gather(*[slow(3) for _ in range(5)]) == [6] * 5
+        assert await slow(3) == 6
+        errors = await asyncio.gather(*[slow(-1) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in errors)
+    asyncio.run(asyncio.wait_for(run(), 10))
+    assert calls == [3, -1]
+    stats = slow.stats(reset=True)
+    assert stats["waits"] == 6
+    assert stats["disk_hits"] == 1
+    assert slow.stats()["waits"] == 0
@@ -0,0 +1,65 @@
+from drivelink import Dict, List
+from drivelink.compression import codecs, make_codec, pack, unpack
+import pickle
+import zlib
+import pytest
+
+
+@pytest.mark.parametrize("name", sorted(codecs))
+def test_round_trip(name):
+    data = pickle.dumps(dict((i, "value" * 10) for i in range(200)))
+    packed = pack(data, make_codec(name, 5))
+    assert len(packed) < len(data)
+    assert unpack(packed) == data
+    # What the stores read.
+    assert unpack(bytearray(packed)) == data
+
+
+@pytest.mark.parametrize("name", sorted(codecs))
+def test_store(name):
+    with Dict("testCompression" + name, 4, 2, compression_ratio=5, compression=name) as d:
+        for i in range(50):
+            d[i] = "value" * i
+    with Dict("testCompression" + name, 4, 2) as d:
+        assert [d[i] for i in range(50)] == ["value" * i for i in range(50)]
+
+
+def test_incompressible():
+    data = b"\x80\x02"
+    packed = pack(data, make_codec("zlib", 9))
+    assert len(packed) > len(data)
+    assert unpack(packed) == data
+
+
+def test_no_compression():
+    assert make_codec("zlib", 0) is None
+    data = pickle.dumps([1, 2, 3])
+    assert pack(data, None) == data
+    assert unpack(data) == data
+
+
+def test_headerless_pages():
+    data = pickle.dumps({1: "a" * 100}, 2)
+    assert unpack(zlib.compress(data, 6)) == data
+
+
+@pytest.mark.skipif("lzma" not in codecs, reason="lzma is not available")
+def test_old_pages():
+    with List("testCompressionOld", 4, 1) as l:
+        l.extend(range(8))
+    for number in l._store.pages():
+        page = pickle.loads(bytes(l._store.read(number)))
+        l._store.write(number, zlib.compress(pickle.dumps(page, 2), 3))
+    with List("testCompressionOld", 4, 1, compression_ratio=3, compression="lzma") as l:
+        assert list(l) == list(range(8))
+
+
+def test_zlib_default_level():
+    data = pickle.dumps(dict((i, "value" * 10) for i in range(200)))
+    assert make_codec("zlib", -1).compress(data) == zlib.compress(data)
+
+
+def test_unknown_compression():
+    with pytest.raises(ValueError) as excinfo:
+        Dict("testUnknownCompression", compression_ratio=1, compression="rar")
+    excinfo.match(".*compression.*")
@@ -0,0 +1,107 @@
+from drivelink import Dict, List, SortedDict
+from drivelink._locking import StoreLock
+import os
+import multiprocessing
+import threading
+import pytest
+
+
+def _count(name, storage, times):
+    with Dict(name, 2, 2, storage=storage, concurrent=True) as d:
+        for _ in range(times):
+            with d.locked():
+                d["count"] = d["count"] + 1
+            d[("seen", multiprocessing.current_process().name, _)] = True
+
+
+@pytest.mark.parametrize("storage", ["files", "segment"])
+def test_processes(storage):
+    name = "testConcurrentProcesses" + storage
+    with Dict(name, 2, 2, storage=storage, concurrent=True) as d:
+        d["count"] = 0
+    workers = [multiprocessing.Process(target=_count, args=(name, storage, 25)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+        assert w.exitcode == 0
+    with Dict(name, 2, 2, storage=storage, concurrent=True) as d:
+        assert d["count"] == 100
+        assert len(d) == 101
+
+
+def test_threads():
+    with List("testConcurrentThreads", 4, 2, concurrent=True) as l:
+        def work(n):
+            for i in range(50):
+                l.append((n, i))
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(l) == 200
+        assert sorted(l) == sorted((n, i) for n in range(4) for i in range(50))
+
+
+def test_sees_other_instance():
+    with Dict("testConcurrentSees", 2, 2, concurrent=True) as a:
+        with Dict("testConcurrentSees", 2, 2, concurrent=True) as b:
+            for i in range(10):
+                a[i] = i
+            assert b[9] == 9
+            del b[3]
+            assert 3 not in a
+            assert len(a) == 9
+
+
+def test_locked_without_concurrent():
+    with Dict("testLockedPlain", 2, 2) as d:
+        with d.locked() as same:
+            same[1] = 1
+        assert d[1] == 1
+
+
+def test_read_only_hold_keeps_others_cached(tmpdir):
+    location = str(tmpdir)
+    with Dict("kept", 2, 2, location, concurrent=True) as a:
+        with Dict("kept", 2, 2, location, concurrent=True) as b:
+            a[0] = 0
+            assert b[0] == 0
+            loads = b.stats()["loads"]
+            with a.locked():
+                a[0]
+            assert b[0] == 0
+            assert b.stats()["loads"] == loads
+            a[0] = 1
+            assert b[0] == 1
+
+
+def test_upgrade_rechecks_generation(tmpdir):
+    path = str(tmpdir.join("lock"))
+    changes = []
+    lock = StoreLock(path, lambda: changes.append(True), lambda: False)
+    with lock.hold():
+        assert changes == []
+        # Another writer getting in while the shared lock is upgraded.
+        fd = os.open(path, os.O_WRONLY)
+        os.write(fd, StoreLock._generation.pack(12345))
+        os.close(fd)
+        with lock.hold(True):
+            assert changes == [True]
+
+
+def test_sorted_range_between_pages(tmpdir):
+    location = str(tmpdir)
+    with SortedDict("range", 2, 2, location, concurrent=True) as a:
+        with SortedDict("range", 2, 2, location, concurrent=True) as b:
+            for i in range(0, 20, 2):
+                a[i] = i
+            keys = a.irange(2, 12)
+            assert [next(keys), next(keys)] == [2, 4]
+            b[5] = 5
+            b[3] = 3
+            del b[8]
+            assert list(keys) == [5, 6, 10, 12]
+            assert a.floor_key(9) == 6
+            assert b.ceiling_key(7) == 10
@@ -1,8 +1,12 @@
 from drivelink import Dict
+from drivelink.hash._hasher import blake2b
 import pytest
 import os
+import random
 #from Process import freeze_support
 
+needs_blake2b = pytest.mark.skipif(blake2b is None, reason="fast_hash needs blake2b")
+
 
 def test_dict():
     dct = Dict("testDict")
@@ -99,6 +103,158 @@ def test_contains():
         assert 5 not in d
 
 
+def test_mark_dirty():
+    with Dict("testDictMarkDirty", 1, 1) as d:
+        d[0] = [1]
+        d[1] = "c"
+        d[0].append(2)
+        d.mark_dirty(0)
+        assert d[1] == "c"
+        assert d[0] == [1, 2]
+    with Dict("testDictMarkDirty", 1, 1) as d:
+        assert d[0] == [1, 2]
+
+
+def test_clean_page_not_written():
+    with Dict("testDictCleanPage", 1, 1) as d:
+        d[0] = 1
+        d[1] = "c"
+        assert d[0] == 1
+        os.remove(d._file_base + '0')
+        assert d[1] == "c"
+        assert not os.path.exists(d._file_base + '0')
+
+
+def test_bulk():
+    with Dict("testDictBulk", 4, 2) as d:
+        d.setmany((i, str(i)) for i in range(200))
+        d.update({200: "200"}, extra="x")
+        assert len(d) == 202
+        assert d.getmany([5, 150, "extra", 200]) == ["5", "150", "x", "200"]
+        assert d.getmany([1, -1], default=None) == ["1", None]
+        with pytest.raises(KeyError):
+            d.getmany([-1])
+        d.delmany(range(0, 200, 2))
+        assert len(d) == 102
+        assert 2 not in d and 3 in d
+        with pytest.raises(KeyError):
+            d.delmany([1, 2])
+        assert 1 not in d
+
+
+def test_bulk_loads_each_page_once():
+    keys = list(range(2000))
+    random.Random(0).shuffle(keys)
+    with Dict("testDictBulkLoads", 8, 2) as d:
+        d.setmany((k, k) for k in keys)
+        pages = len(list(d.page_indices()))
+        loads = []
+        load = d._load_page_from_disk
+
+        def counting(number):
+            loads.append(number)
+            return load(number)
+        d._load_page_from_disk = counting
+        assert d.getmany(keys) == keys
+        assert len(loads) <= pages
+
+
+def test_directory_from_old_index():
+    import pickle
+    from os.path import expanduser, join
+    from drivelink._diskdict import _page
+    from drivelink.hash import hash
+    base = join(expanduser("~"), ".DriveLink", "testDictOldIndex")
+    if not os.path.exists(os.path.dirname(base)):
+        os.makedirs(os.path.dirname(base))
+    # Written the old way: pages 1 and 3 were branched off, but some of their
+    # keys are still waiting in page 0.
+    pages = {0: _page(), 1: _page(), 3: _page()}
+    for i in range(12):
+        k = hash(i) & 3
+        pages[0 if i % 2 else (k if k in pages else k & 1)][i] = str(i)
+    for k, page in pages.items():
+        page.currentDepth = 3
+        with open(base + str(k), 'wb') as f:
+            pickle.dump(page, f)
+    with open(base + 'Set', 'wb') as f:
+        pickle.dump(2, f)
+    with open(base + 'Len', 'wb') as f:
+        pickle.dump((3, 12), f)
+    with Dict("testDictOldIndex", 2, 2) as d:
+        assert len(d) == 12
+        for i in range(12):
+            assert d[i] == str(i)
+        for i in range(12, 40):
+            d[i] = str(i)
+    with Dict("testDictOldIndex", 2, 2) as d:
+        assert sorted(d.items()) == sorted((i, str(i)) for i in range(40))
+
+
+def test_directory():
+    with Dict("testDictDirectory", 4, 2) as d:
+        for i in range(500):
+            d[i] = i
+        assert len(d._directory) & (len(d._directory) - 1) == 0
+        for page in d.page_indices():
+            d._guarantee_page(page)
+            assert len(d.pages[page]) <= 4
+    with Dict("testDictDirectory", 4, 2) as d:
+        assert dict(d.items()) == dict((i, i) for i in range(500))
+
+
+def test_directory_colliding_keys(tmpdir):
+    location = str(tmpdir)
+    with Dict("same", 1, 2, location, hash_algorithm="sha256") as d:
+        # Both hash to 0, so no number of doublings would tell them apart.
+        for _ in range(20):
+            d[0] = d[2 ** 64] = "x"
+        assert len(d._directory) == 1
+    with Dict("shifted", 4, 2, location, hash_algorithm="sha256") as d:
+        for i in range(30):
+            d[i << 40] = i
+        assert len(d._directory) == 1
+        assert len(d.pages[0]) == 30
+    with Dict("shifted", 4, 2, location, hash_algorithm="sha256") as d:
+        assert dict(d.items()) == dict((i << 40, i) for i in range(30))
+
+
+@needs_blake2b
+def test_directory_shifted_ints(tmpdir):
+    with Dict("shiftedFast", 4, 2, str(tmpdir)) as d:
+        assert d._hash_algorithm == "blake2b"
+        for i in range(30):
+            d[i << 40] = i
+        for page in d.page_indices():
+            d._guarantee_page(page)
+            assert len(d.pages[page]) <= 4
+
+
+def test_directory_depth_cap(tmpdir):
+    d = Dict("capped", 1, 4, str(tmpdir))
+    d._max_depth = 3
+    for i in range(100):
+        d[i] = i
+    assert len(d._directory) == 8
+    assert dict(d.items()) == dict((i, i) for i in range(100))
+    d.close()
+
+
+@needs_blake2b
+def test_hash_algorithm():
+    with pytest.raises(ValueError):
+        Dict("testDictHashAlgorithm", hash_algorithm="md4")
+    with Dict("testDictHashAlgorithm", 2, 2, hash_algorithm="sha256") as d:
+        for i in range(20):
+            d[str(i)] = i
+    with Dict("testDictHashAlgorithm", 2, 2) as d:
+        assert d._hash_algorithm == "sha256"
+        assert d["7"] == 7
+    with Dict("testDictHashAlgorithm", 2, 2, hash_algorithm="blake2b") as d:
+        assert d._hash_algorithm == "blake2b"
+        assert dict(d.items()) == dict((str(i), i) for i in range(20))
+
+
 if __name__ == '__main__':
     freeze_support()
     ut.main()
@@ -0,0 +1,100 @@
+from drivelink.eviction import make_policy, policies, LRU, FIFO, CLOCK, LFU, ARC
+from drivelink import Dict, List
+import pytest
+
+
+def fill(policy, pages):
+    for k in pages:
+        policy.add(k)
+    return policy
+
+
+def test_make_policy():
+    assert isinstance(make_policy("lru", 4), LRU)
+    assert isinstance(make_policy("ARC", 4), ARC)
+    assert isinstance(make_policy(LFU, 4), LFU)
+    clock = CLOCK(4)
+    assert make_policy(clock, 4) is clock
+    with pytest.raises(ValueError) as excinfo:
+        make_policy("random", 4)
+    excinfo.match(".*eviction policy.*")
+
+
+def test_fifo():
+    p = fill(FIFO(3), [0, 1, 2])
+    p.touch(0)
+    assert p.victim() == 0
+    assert p.victim(0) == 1
+
+
+def test_lru():
+    p = fill(LRU(3), [0, 1, 2])
+    p.touch(0)
+    assert p.victim() == 1
+    p.remove(1)
+    assert p.victim() == 2
+    assert 1 not in p
+    assert len(p) == 2
+
+
+def test_clock():
+    p = fill(CLOCK(3), [0, 1, 2])
+    p.touch(0)
+    p.touch(1)
+    assert p.victim() == 2
+    assert p.victim(2) in (0, 1)
+
+
+def test_lfu():
+    p = fill(LFU(3), [0, 1, 2])
+    for _ in range(3):
+        p.touch(0)
+    p.touch(1)
+    assert p.victim() == 2
+    p.remove(2)
+    assert p.victim() == 1
+    p.add(3)
+    assert p.victim(3) == 1
+    p.remove(1)
+    p.remove(3)
+    assert p.victim() == 0
+
+
+def scan(policy, hot, cold):
+    fill(policy, hot)
+    for k in hot:
+        policy.touch(k)
+    for k in cold:
+        policy.add(k)
+        while len(policy) > policy.max_pages:
+            policy.remove(policy.victim(k))
+    return policy
+
+
+def test_scan_resistance():
+    hot, cold = [0, 1], range(2, 20)
+    for p in (scan(ARC(3), hot, cold), scan(LFU(3), hot, cold)):
+        assert 0 in p and 1 in p
+        assert len(p) == 3
+    p = scan(LRU(3), hot, cold)
+    assert 0 not in p and 1 not in p
+
+
+@pytest.mark.parametrize("name", sorted(policies))
+def test_dict_policies(name):
+    with Dict("testDictPolicy" + name, 1, 2, eviction_policy=name) as d:
+        for i in range(20):
+            d[i] = i
+        for i in range(20):
+            assert d[0] == 0
+            assert d[i] == i
+        assert len(d._policy) <= 2
+
+
+@pytest.mark.parametrize("name", sorted(policies))
+def test_list_policies(name):
+    with List("testListPolicy" + name, 1, 2, eviction_policy=name) as l:
+        l.extend(range(20))
+        del l[3]
+        l.insert(0, -1)
+        assert list(l) == [-1, 0, 1, 2] + list(range(4, 20))
@@ -1,6 +1,8 @@
 from drivelink.hash import hash
 from drivelink.hash import frozen_hash
-from pytest import raises
+from drivelink.hash import fast_hash, hashes
+from drivelink.hash._hasher import blake2b
+from pytest import mark, raises
 from sys import version_info
 
 test_items = {0:0,
@@ -29,3 +31,39 @@ def test_frozen_hash():
         assert frozen_hash(item) == hash(item)
     print(frozen_hash(test_items))
     assert frozen_hash(test_items) == test_items_hash
+
+fast_items = {0: 0,
+              12: 4016745674725997500,
+              -1: 13029008266876403067,
+              1.7: 5978651970535179369,
+              "a": 12289102083368600261,
+              "123": 12985985648886125624,
+              (0, 1, 2): 5986034228597700808,
+              frozenset([0, 1, 2]): 13675226744023518584,
+              None: 1490630715158469874}
+
+needs_blake2b = mark.skipif(blake2b is None, reason="fast_hash needs blake2b")
+
+
+@needs_blake2b
+def test_fast_hash():
+    for item, soln in fast_items.items():
+        assert fast_hash(item) == soln
+    assert fast_hash(1) == fast_hash(1.0) == fast_hash(True)
+    assert fast_hash((1, "a")) == fast_hash((1.0, "a"))
+    assert fast_hash(frozenset([3, 1])) == fast_hash(frozenset([1, 3]))
+    with raises(TypeError):
+        fast_hash([1, 2])
+
+
+@needs_blake2b
+def test_fast_hash_text():
+    assert fast_hash(u"a") == fast_hash(str("a"))
+    assert fast_hash((1, u"123")) == fast_hash((1, str("123")))
+    assert hashes["blake2b"] is fast_hash
+
+
+@needs_blake2b
+def test_fast_hash_spreads_high_bits():
+    # A Dict's directory goes by the low bits, so these mustn't all share them.
+    assert len(set(fast_hash(i << 40) & 15 for i in range(64))) == 16
@@ -1,6 +1,7 @@
 from drivelink import List
 import pytest
 import os
+import random
 #from Process import freeze_support
 
 
@@ -113,6 +114,142 @@ def test_contains():
         assert 3.3 not in l
 
 
+def test_extend():
+    with List("testListExtend", 3, 1) as l:
+        l.append(-1)
+        l.extend(range(10))
+        l.extend(iter(range(10, 12)))
+        l.extend(l)
+        expected = [-1] + list(range(12))
+        assert list(l) == expected * 2
+        assert len(l) == 26
+    with List("testListExtend", 3, 1) as l:
+        assert list(l) == expected * 2
+
+
+@pytest.mark.parametrize("key", [slice(None), slice(3, 17), slice(-5, None), slice(2, 20, 3),
+                                 slice(None, None, -1), slice(15, 2, -4), slice(30, 40), slice(5, 2)])
+def test_slices(key):
+    expected = list(range(23))
+    with List("testListSlices", 4, 2) as l:
+        l.extend(expected)
+        assert l[key] == expected[key]
+        del l[key]
+        del expected[key]
+        assert list(l) == expected
+        assert len(l) == len(expected)
+    with List("testListSlices", 4, 2) as l:
+        assert list(l) == expected
+        del l[:]
+
+
+@pytest.mark.parametrize("key, values", [(slice(3, 7), "abcd"), (slice(3, 7), "ab"), (slice(3, 7), "abcdefghijkl"),
+                                         (slice(0, 0), "xyz"), (slice(23, None), "end"), (slice(None), []),
+                                         (slice(1, 20, 4), "abcde"), (slice(None, None, -6), "wxyz")])
+def test_slice_assignment(key, values):
+    expected = list(range(23))
+    with List("testListSliceAssignment", 4, 2) as l:
+        l.extend(expected)
+        l[key] = values
+        expected[key] = values
+        assert list(l) == expected
+        assert len(l) == len(expected)
+        with pytest.raises(ValueError):
+            l[::2] = [1]
+    with List("testListSliceAssignment", 4, 2) as l:
+        assert list(l) == expected
+        del l[:]
+
+
+def test_random_edits():
+    rand = random.Random(2)
+    expected = []
+    with List("testListRandomEdits", 4, 2) as l:
+        for _ in range(1500):
+            op = rand.random()
+            n = len(expected)
+            if op < 0.3:
+                i = rand.randint(-n - 2, n + 2)
+                l.insert(i, _)
+                expected.insert(i, _)
+            elif op < 0.5:
+                l.append(_)
+                expected.append(_)
+            elif op < 0.75 and n:
+                i = rand.randrange(-n, n)
+                del l[i]
+                del expected[i]
+            elif op < 0.85 and n:
+                i = rand.randrange(n)
+                l[i] = -_
+                expected[i] = -_
+            elif op < 0.93:
+                key = slice(rand.randint(0, n), rand.randint(0, n), rand.choice([None, 1, 2, -3]))
+                del l[key]
+                del expected[key]
+            else:
+                a = rand.randint(0, n)
+                key = slice(a, a + rand.randint(0, 5))
+                values = list(range(rand.randint(0, 9)))
+                l[key] = values
+                expected[key] = values
+            assert len(l) == len(expected)
+        assert list(l) == expected
+        assert all(0 < c <= 4 for c in l._counts)
+    with List("testListRandomEdits", 4, 2) as l:
+        assert list(l) == expected
+        assert l[:] == expected
+
+
+def test_insert_touches_few_pages():
+    with List("testListInsertPages", 8, 4) as l:
+        l.extend(range(1000))
+        loads = []
+        load = l._load_page_from_disk
+
+        def counting(number):
+            loads.append(number)
+            return load(number)
+        l._load_page_from_disk = counting
+        l.insert(3, "x")
+        del l[5]
+        del l[0]
+        assert len(loads) <= 3
+        assert l[:5] == [1, 2, "x", 3, 5]
+
+
+def test_slice_delete_recounts_once(monkeypatch):
+    from drivelink import _disklist
+    with List("testListSliceRecount", 4, 4) as l:
+        l.extend(range(400))
+        assert l[0] == 0
+        builds = []
+        build = _disklist._prefix_counts
+
+        def counting(counts):
+            builds.append(len(counts))
+            return build(counts)
+        monkeypatch.setattr(_disklist, "_prefix_counts", counting)
+        del l[10:390]
+        assert l[:] == list(range(10)) + list(range(390, 400))
+        assert builds == [5]
+        del l[::2]
+        assert l[:] == [1, 3, 5, 7, 9, 391, 393, 395, 397, 399]
+
+
+def test_old_index():
+    with List("testListOldIndex", 3, 2) as l:
+        l.extend(range(10))
+    # Rewrite the index the way it used to be: only the page count.
+    import pickle
+    with open(l._file_base + 'Len', 'wb') as f:
+        pickle.dump((4, 10), f)
+    with List("testListOldIndex", 3, 2) as l:
+        assert list(l) == list(range(10))
+        l.insert(1, "a")
+        assert l[:3] == [0, "a", 1]
+
+
 if __name__ == '__main__':
     freeze_support()
     ut.main()
@@ -0,0 +1,62 @@
+from drivelink import Dict, List
+
+
+def test_budget():
+    budget = 100000
+    with Dict("testMemoryBudget", 4, 1000, max_memory_bytes=budget) as d:
+        for i in range(200):
+            d[i] = b"x" * (10000 if i % 10 == 0 else 10)
+            assert d.memory_usage() <= budget + 4 * 10100
+        assert len(d.pages) < len(d._total)
+    with Dict("testMemoryBudget", 4, 1000, max_memory_bytes=budget) as d:
+        for i in range(200):
+            assert d[i] == b"x" * (10000 if i % 10 == 0 else 10)
+
+
+def test_small_values_fill_the_budget():
+    with List("testMemorySmall", 8, 1000, max_memory_bytes=1 << 20) as l:
+        l.extend(range(4000))
+        assert len(l.pages) == len(l._order)
+        assert l.memory_usage() < 1 << 20
+
+
+def test_max_pages_still_caps():
+    with List("testMemoryCap", 8, 3, max_memory_bytes=1 << 30) as l:
+        l.extend(range(100))
+        assert len(l.pages) <= 3
+        assert list(l) == list(range(100))
+
+
+def test_page_size_without_budget():
+    with Dict("testMemoryNoBudget", 4, 2) as d:
+        for i in range(4):
+            d[i] = "x" * 100
+        assert d.memory_usage() > 100
+
+
+def test_read_ahead_measures_on_use(tmpdir):
+    with List("testMemoryReadAhead", 4, 8, str(tmpdir), read_ahead=4, max_memory_bytes=1 << 20) as l:
+        l.extend(range(100))
+        l.flush()
+        for number in list(l.pages):
+            l._evict(number)
+        for i, value in enumerate(l):
+            if i == 10:
+                break
+        # Only pages actually taken into RAM are measured, even though more were read.
+        assert set(l._measured) <= set(l.pages)
+        assert l.memory_usage() >= sum(l.page_size(number) for number in l.pages)
+
+
+def test_running_total(tmpdir):
+    expected = {}
+    with Dict("testMemoryTotal", 4, 1000, str(tmpdir), max_memory_bytes=2000) as d:
+        for i in range(300):
+            expected[i * 7 % 300] = d[i * 7 % 300] = "x" * (i % 50)
+            misses = d._misses
+            d.get(i * 11 % 300)
+            if d._misses > misses:
+                # Each miss brings the total up to date with what memory_usage sums.
+                assert d._resident_bytes == sum(d.page_size(number) for number in d.pages)
+        d.flush()
+        assert dict(d.items()) == expected
@@ -0,0 +1,97 @@
+from drivelink import Dict, List, OrderedDict, SortedDict
+import os
+import pytest
+
+
+@pytest.mark.parametrize("cls", [Dict, OrderedDict, SortedDict])
+def test_streaming(cls):
+    name = "testMigrate" + cls.__name__
+    with cls(name, 4, 2) as d:
+        for i in range(100):
+            d[i] = str(i)
+        del d[50]
+    with cls(name, 16, 2) as d:
+        assert len(d) == 99
+        assert sorted(d.items()) == sorted((i, str(i)) for i in range(100) if i != 50)
+        if cls is not Dict:
+            assert list(d) == [i for i in range(100) if i != 50]
+        d[100] = "100"
+    with cls(name, 16, 2) as d:
+        assert d[100] == "100"
+
+
+def test_list():
+    with List("testMigrateList", 4, 2) as l:
+        l.extend(range(50))
+    with List("testMigrateList", 16, 2) as l:
+        assert list(l) == list(range(50))
+
+
+def test_lazy():
+    with Dict("testMigrateLazy", 4, 2) as d:
+        for i in range(100):
+            d[i] = i
+    with Dict("testMigrateLazy", 16, 2, lazy_migration=True) as d:
+        assert d._old is not None
+        assert len(d) == 100
+        assert d[7] == 7
+        assert 8 in d
+        assert 1000 not in d
+        del d[9]
+        d[10] = "ten"
+        d[200] = 200
+        assert len(d) == 100
+        left = len(d._old._total)
+        assert left > 0
+    # Unfinished, so it carries on when opened again.
+    assert os.path.exists(d._file_loc + "/~testMigrateLazySet")
+    with Dict("testMigrateLazy", 16, 2, lazy_migration=True) as d:
+        assert d._old is not None
+        assert len(d) == 100
+        assert d[10] == "ten"
+        assert 9 not in d
+        d.migrate()
+        assert d._old is None
+    assert not os.path.exists(d._file_loc + "/~testMigrateLazySet")
+    with Dict("testMigrateLazy", 16, 2) as d:
+        expected = dict((i, i) for i in range(100))
+        del expected[9]
+        expected[10] = "ten"
+        expected[200] = 200
+        assert dict(d.items()) == expected
+
+
+def test_lazy_then_eager():
+    with Dict("testMigrateLazyEager", 4, 2) as d:
+        d.update((i, i) for i in range(40))
+    with Dict("testMigrateLazyEager", 8, 2, lazy_migration=True) as d:
+        d[3]
+    with Dict("testMigrateLazyEager", 8, 2) as d:
+        assert d._old is None
+        assert sorted(d.items()) == [(i, i) for i in range(40)]
+    with Dict("testMigrateLazyEager", 4, 2, lazy_migration=True) as d:
+        d[3]
+    with Dict("testMigrateLazyEager", 16, 2) as d:
+        assert sorted(d.items()) == [(i, i) for i in range(40)]
+
+
+def test_lazy_empty(tmpdir):
+    location = str(tmpdir)
+    Dict("empty", 2, 2, location).close()
+    with Dict("empty", 4, 2, location, lazy_migration=True) as d:
+        assert d._old is None
+        assert list(d) == []
+        d[1] = 1
+    assert not [name for name in os.listdir(location) if name.startswith("~")]
+    with Dict("empty", 4, 2, location, lazy_migration=True) as d:
+        assert list(d) == [1]
+
+
+def test_lazy_emptied(tmpdir):
+    location = str(tmpdir)
+    with Dict("emptied", 2, 2, location) as d:
+        d[1] = 1
+    with Dict("emptied", 4, 2, location, lazy_migration=True) as d:
+        del d[1]
+        assert list(d) == []
+        assert d._old is None
@@ -99,6 +99,65 @@ def test_save_page():
             assert d[0] != 1
 
 
+def test_order():
+    with OrderedDict("testOrderedDictOrder", 3, 2) as d:
+        keys = ["k" + str(i) for i in range(20)]
+        for k in reversed(keys):
+            d[k] = k
+        assert list(d) == list(reversed(keys))
+        assert list(reversed(d)) == keys
+        d["k10"] = "again"
+        assert list(d)[9] == "k10"
+        d.move_to_end("k19")
+        d.move_to_end("k0", last=False)
+        assert list(d)[0] == "k0" and list(d)[-1] == "k19"
+        assert d.popitem() == ("k19", "k19")
+        assert d.popitem(last=False) == ("k0", "k0")
+        assert len(d) == 18
+        expected = list(d.items())
+    with OrderedDict("testOrderedDictOrder", 3, 2) as d:
+        assert list(d.items()) == expected
+        while d:
+            d.popitem()
+        with pytest.raises(KeyError):
+            d.popitem()
+
+
+def test_dense_pages():
+    with OrderedDict("testOrderedDictDense", 8, 2) as d:
+        for i in range(400):
+            d[str(i)] = i
+        for i in range(400):
+            if i % 5:
+                del d[str(i)]
+        assert list(d) == [str(i) for i in range(0, 400, 5)]
+        assert len(list(d.page_indices())) <= 2 * 80 // 8 + 1
+
+
+def test_old_pages():
+    import pickle
+    from os.path import expanduser, join
+    from drivelink.hash import hash
+    base = join(expanduser("~"), ".DriveLink", "testOrderedDictOldPages")
+    if not os.path.exists(os.path.dirname(base)):
+        os.makedirs(os.path.dirname(base))
+    pages = {}
+    for i in range(10):
+        pages.setdefault(hash(i) // 4, {})[i] = str(i)
+    for k, page in pages.items():
+        with open(base + str(k), 'wb') as f:
+            pickle.dump(page, f)
+    with open(base + 'Set', 'wb') as f:
+        pickle.dump(4, f)
+    with open(base + 'Len', 'wb') as f:
+        pickle.dump((10,), f)
+    with OrderedDict("testOrderedDictOldPages", 4, 2) as d:
+        assert len(d) == 10
+        assert sorted(d.items()) == [(i, str(i)) for i in range(10)]
+        d[10] = "10"
+        assert list(d)[-1] == 10
+
+
 if __name__ == '__main__':
     freeze_support()
     ut.main()
@@ -0,0 +1,55 @@
+from drivelink import Dict, List
+from drivelink._readahead import ReadAhead
+import threading
+
+
+def test_list_read_ahead():
+    with List("testListReadAhead", 2, 2) as l:
+        l.extend(range(40))
+    with List("testListReadAhead", 2, 2, read_ahead=4) as l:
+        assert list(l) == list(range(40))
+        assert list(reversed(l)) == list(reversed(range(40)))
+        for i in l:
+            if i == 10:
+                break
+        assert sum(l) == sum(range(40))
+        assert len(l._reader._ready) == 0
+
+
+def test_dict_read_ahead():
+    with Dict("testDictReadAhead", 1, 1) as d:
+        for i in range(30):
+            d[i] = str(i)
+    with Dict("testDictReadAhead", 1, 1, read_ahead=3) as d:
+        assert sorted(d) == list(range(30))
+        assert sorted(d.values(), key=int) == [str(i) for i in range(30)]
+
+
+def test_read_ahead_used():
+    with List("testListReadAheadUsed", 1, 1) as l:
+        l.extend(range(20))
+    taken = []
+    with List("testListReadAheadUsed", 1, 1, read_ahead=2) as l:
+        take = l._read_page
+        main = threading.current_thread()
+        l._read_page = lambda number: taken.append(threading.current_thread() is main) or take(number)
+        assert list(l) == list(range(20))
+    assert len(taken) == 20
+    assert taken.count(False) > 0
+
+
+def test_read_ahead_depth():
+    release = threading.Event()
+
+    def load(number):
+        release.wait()
+        return [number]
+
+    reader = ReadAhead(load, 2)
+    reader.schedule([0, 1, 2, 3])
+    assert reader._loading == set([0, 1])
+    release.set()
+    assert reader.take(1) == [1]
+    assert reader.take(0) == [0]
+    assert reader.take(2) is None
+    reader.close()
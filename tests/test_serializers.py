@@ -0,0 +1,69 @@
+from drivelink import Dict, List, OrderedDict, SortedDict
+from drivelink._serializers import serializers
+import pytest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@pytest.mark.parametrize("serializer", sorted(serializers))
+@pytest.mark.parametrize("storage", ["files", "segment"])
+def test_round_trip(serializer, storage):
+    name = "testSerializer" + serializer + storage
+    with Dict(name, 2, 1, storage=storage, serializer=serializer) as d:
+        for i in range(10):
+            d[i] = (str(i), [i] * i, b"x" * i)
+    with Dict(name, 2, 1, storage=storage) as d:
+        assert d._serializer_name == serializer
+        assert [d[i] for i in range(10)] == [(str(i), [i] * i, b"x" * i) for i in range(10)]
+
+
+@pytest.mark.parametrize("serializer", sorted(serializers))
+@pytest.mark.parametrize("wrap", [bytes, bytearray, lambda data: memoryview(b"head" + data)[4:]])
+def test_loads_buffers(serializer, wrap):
+    # The stores hand over a bytearray, or a memoryview past the compression header.
+    serializer = serializers[serializer]()
+    page = {1: "one", 2: [2.0, b"two"]}
+    data = serializer.dumps(page)
+    if isinstance(data, list):
+        data = b"".join(bytes(b) for b in data)
+    assert serializer.loads(wrap(data)) == page
+
+
+def test_change_serializer():
+    with List("testChangeSerializer", 2, 1) as l:
+        l.extend(range(10))
+    with List("testChangeSerializer", 2, 1, serializer="marshal") as l:
+        assert list(l) == list(range(10))
+    with List("testChangeSerializer", 2, 1) as l:
+        assert l._serializer_name == "marshal"
+
+
+def test_marshal_needs_plain_pages():
+    for cls in (OrderedDict, SortedDict):
+        with pytest.raises(ValueError):
+            cls("testMarshalPages", serializer="marshal")
+
+
+def test_unknown_serializer():
+    with pytest.raises(ValueError) as excinfo:
+        Dict("testUnknownSerializer", serializer="json")
+    excinfo.match(".*serializer.*")
+
+
+@pytest.mark.skipif(numpy is None or "pickle5" not in serializers, reason="needs numpy and pickle protocol 5")
+@pytest.mark.parametrize("compression_ratio", [0, 1])
+def test_out_of_band(compression_ratio):
+    name = "testPickle5" + str(compression_ratio)
+    with Dict(name, 1, 1, compression_ratio=compression_ratio, serializer="pickle5") as d:
+        for i in range(4):
+            d[i] = numpy.arange(1000) * i
+    with Dict(name, 1, 1) as d:
+        for i in range(4):
+            assert (d[i] == numpy.arange(1000) * i).all()
+        d[2][0] = 7
+        d.mark_dirty(2)
+        d[3]
+        assert d[2][0] == 7
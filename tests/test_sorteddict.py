@@ -0,0 +1,85 @@
+from drivelink import SortedDict
+import random
+import pytest
+
+
+def test_sorted_dict():
+    keys = list(range(300))
+    random.Random(1).shuffle(keys)
+    with SortedDict("testSortedDict", 8, 2) as d:
+        for k in keys:
+            d[k] = str(k)
+        assert len(d) == 300
+        assert list(d) == list(range(300))
+        assert list(reversed(d)) == list(range(299, -1, -1))
+        assert d[17] == "17"
+        assert 17 in d and 300 not in d and -1 not in d
+        d[17] = "x"
+        assert d[17] == "x" and len(d) == 300
+    with SortedDict("testSortedDict", 8, 2) as d:
+        assert d[17] == "x"
+        assert list(d) == list(range(300))
+
+
+def test_delete():
+    with SortedDict("testSortedDictDelete", 8, 2) as d:
+        for k in range(200):
+            d[k] = k
+        for k in range(200):
+            if k % 10:
+                del d[k]
+        assert list(d) == list(range(0, 200, 10))
+        assert len(list(d.page_indices())) <= 2 * 20 // 8 + 1
+        assert d.pop(10) == 10
+        assert d.pop(10, None) is None
+        with pytest.raises(KeyError):
+            del d[10]
+        assert d.popitem() == (190, 190)
+        assert d.popitem(0) == (0, 0)
+        while d:
+            d.popitem()
+        assert list(d) == []
+        with pytest.raises(KeyError):
+            d[3]
+
+
+def test_ranges():
+    with SortedDict("testSortedDictRanges", 4, 2) as d:
+        for k in range(0, 100, 2):
+            d[k] = k
+        assert list(d.irange(10, 20)) == [10, 12, 14, 16, 18, 20]
+        assert list(d.irange(9, 21)) == [10, 12, 14, 16, 18, 20]
+        assert list(d.irange(10, 20, (False, False))) == [12, 14, 16, 18]
+        assert list(d.irange(maximum=5)) == [0, 2, 4]
+        assert list(d.irange(95)) == [96, 98]
+        assert list(d.irange(10, 16, reverse=True)) == [16, 14, 12, 10]
+        assert d.bisect_left(10) == 5
+        assert d.bisect_right(10) == 6
+        assert d.bisect(11) == 6
+        assert d.peekitem(0) == (0, 0)
+        assert d.peekitem() == (98, 98)
+        assert d.peekitem(7) == (14, 14)
+        with pytest.raises(IndexError):
+            d.peekitem(50)
+        assert d.floor_key(11) == 10
+        assert d.floor_key(10) == 10
+        assert d.ceiling_key(11) == 12
+        with pytest.raises(KeyError):
+            d.floor_key(-1)
+        with pytest.raises(KeyError):
+            d.ceiling_key(99)
+
+
+def test_range_loads_only_covered_pages():
+    with SortedDict("testSortedDictRangeLoads", 10, 2) as d:
+        for k in range(1000):
+            d[k] = k
+        loads = []
+        load = d._load_page_from_disk
+
+        def counting(number):
+            loads.append(number)
+            return load(number)
+        d._load_page_from_disk = counting
+        assert list(d.irange(500, 520)) == list(range(500, 521))
+        assert len(loads) <= 5
@@ -0,0 +1,47 @@
+from drivelink import Dict, List, cached
+
+
+def test_counts():
+    with List("testStats", 2, 2) as l:
+        l.extend(range(10))
+        l.flush()
+        l.stats(reset=True)
+        assert list(l) == list(range(10))
+        stats = l.stats()
+        assert stats["misses"] == stats["loads"] > 0
+        assert stats["evictions"] >= stats["loads"] - 2
+        assert stats["writes"] == 0
+        assert stats["bytes_read"] > 0
+        assert stats["resident_pages"] == 2
+        l[9]
+        assert l.stats(reset=True)["hits"] > 0
+        assert l.stats()["hits"] == 0
+
+
+def test_hooks():
+    events = []
+    with Dict("testStatsHooks", 1, 1) as d:
+        d.on_load = lambda number: events.append(("load", number))
+        d.on_evict = lambda number, dirty: events.append(("evict", number, dirty))
+        d.on_write = lambda number, size: events.append(("write", number))
+        for i in range(4):
+            d[i] = i
+        for i in range(4):
+            d[i]
+    assert any(e[0] == "evict" and e[2] for e in events)
+    assert any(e[0] == "write" for e in events)
+    assert any(e[0] == "load" for e in events)
+    assert d.stats()["bytes_written"] > 0
+
+
+def test_cached_stats():
+    @cached("testStatsCached", 2, 1, hot_size=1)
+    def square(n):
+        return n * n
+    for n in [1, 1, 2, 1]:
+        square(n)
+    stats = square.stats()
+    assert stats["misses"] == 2
+    assert stats["hot_hits"] == 1
+    assert stats["disk_hits"] == 1
+    assert "hits" in stats["store"]
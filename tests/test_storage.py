@@ -0,0 +1,81 @@
+from drivelink import Dict, List
+from drivelink._pagestore import SegmentStore
+import pytest
+import os
+
+
+def test_segment_dict():
+    with Dict("testSegmentDict", 1, 1, storage="segment") as d:
+        for i in range(10):
+            d[i] = str(i)
+        del d[3]
+        assert not os.path.exists(d._file_base + '0')
+    with Dict("testSegmentDict", 1, 1, storage="segment") as d:
+        assert len(d) == 9
+        assert 3 not in d
+        for i in range(10):
+            if i != 3:
+                assert d[i] == str(i)
+
+
+def test_segment_list():
+    with List("testSegmentList", 2, 1, storage="segment") as l:
+        l.extend(range(10))
+    with List("testSegmentList", 2, 1, storage="segment") as l:
+        assert list(l) == list(range(10))
+
+
+def test_unknown_storage():
+    with pytest.raises(ValueError) as excinfo:
+        Dict("testUnknownStorage", storage="tape")
+    excinfo.match(".*storage.*")
+
+
+def test_change_storage():
+    with Dict("testChangeStorage", 1, 1) as d:
+        for i in range(5):
+            d[i] = i
+    with Dict("testChangeStorage", 1, 1, storage="segment") as d:
+        assert not os.path.exists(d._file_base + '0')
+        assert [d[i] for i in range(5)] == list(range(5))
+    with Dict("testChangeStorage", 2, 1, storage="segment") as d:
+        assert [d[i] for i in range(5)] == list(range(5))
+
+
+def test_segment_replay(tmpdir):
+    base = str(tmpdir.join("seg"))
+    store = SegmentStore(base)
+    store.write(0, b"zero")
+    store.write(1, b"one")
+    store.close()
+    store.write(1, b"uno")
+    store.remove(0)
+    store.write(2, b"two")
+    store._file.write(b"\0\0\0\1\0\0\0\xff3")  # A torn record.
+    store._file.flush()
+    store = SegmentStore(base)
+    assert sorted(store.pages()) == [1, 2]
+    assert store.read(1) == b"uno"
+    assert store.read(2) == b"two"
+    with pytest.raises(IOError):
+        store.read(0)
+    os.remove(base + 'Off')
+    store = SegmentStore(base)
+    assert sorted(store.pages()) == [1, 2]
+
+
+def test_segment_compaction(tmpdir):
+    base = str(tmpdir.join("seg"))
+    store = SegmentStore(base, compact_min_bytes=0)
+    for _ in range(5):
+        for i in range(20):
+            store.write(i, b"x" * 100 * i)
+        store.remove(0)
+    store.compact()
+    size = os.path.getsize(base + 'Seg')
+    assert size < sum(100 * i + 10 for i in range(20))
+    store.close()
+    store = SegmentStore(base)
+    assert sorted(store.pages()) == list(range(1, 20))
+    for i in range(1, 20):
+        assert store.read(i) == b"x" * 100 * i
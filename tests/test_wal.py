@@ -0,0 +1,144 @@
+from drivelink import Dict, List
+from drivelink._pagestore import FileStore, SegmentStore
+from drivelink._wal import LoggedStore, recover
+import os
+import pytest
+import time
+
+
+def crash(link):
+    """
+    Drops a link without writing anything else, as if the process had died.
+    """
+    if link._stop_syncing is not None:
+        link._stop_syncing.set()
+    link._store._log.close()
+    link._file_base = None
+
+
+def test_dict_wal():
+    with Dict("testDictWal", 2, 2, sync_interval=0.01) as d:
+        for i in range(50):
+            d[i] = str(i)
+        del d[7]
+    assert not os.path.exists(d._store._path)
+    with Dict("testDictWal", 2, 2) as d:
+        assert len(d) == 49
+        assert 7 not in d
+        assert d[8] == "8"
+
+
+def test_list_wal_segment():
+    with List("testListWal", 3, 1, storage="segment", sync_interval=0) as l:
+        l.extend(range(20))
+    with List("testListWal", 3, 1, storage="segment", sync_interval=0) as l:
+        assert list(l) == list(range(20))
+
+
+def test_recover_after_crash(tmpdir):
+    location = str(tmpdir)
+    d = Dict("crashed", 1, 1, location, sync_interval=60)
+    for i in range(10):
+        d[i] = i
+    d.flush()
+    for i in range(10):
+        d[i] = -i
+    crash(d)
+    # Pages that were written but never synced may come back empty.
+    for name in os.listdir(location):
+        if name[len("crashed"):].isdigit():
+            open(os.path.join(location, name), 'wb').close()
+    with Dict("crashed", 1, 1, location) as d:
+        assert len(d) == 10
+        assert [d[i] for i in range(10)] == list(range(10))
+    assert not os.path.exists(os.path.join(location, "crashedWal"))
+
+
+def test_recover_committed_only(tmpdir):
+    base = str(tmpdir.join("log"))
+    store = LoggedStore(FileStore(base), base + 'Wal')
+    store.write(0, b"zero")
+    store.write_index(b"index")
+
+    def fail(number, data):
+        raise IOError("Crashed")
+    store._store.write = fail
+    with pytest.raises(IOError):
+        store.commit()
+    store.write(1, [b"o", b"ne"])
+    store._log.write(b"\1\0\0")  # A torn record.
+    store._log.close()
+    assert list(FileStore(base).pages()) == []
+    assert recover(FileStore(base), base + 'Wal') == 1
+    store = FileStore(base)
+    assert list(store.pages()) == [0]
+    assert store.read(0) == b"zero"
+    assert store.read_index() == b"index"
+    assert recover(store, base + 'Wal') == 0
+
+
+def test_uncommitted_reads(tmpdir):
+    base = str(tmpdir.join("log"))
+    store = LoggedStore(SegmentStore(base), base + 'Wal')
+    store.write(0, b"zero")
+    store.write(1, b"one")
+    store.remove(0)
+    assert store.pages() == [1]
+    assert store.read(1) == b"one"
+    with pytest.raises(IOError):
+        store.read(0)
+    store.commit()
+    assert store._store.read(1) == b"one"
+    store.close()
+    assert not os.path.exists(base + 'Wal')
+
+
+def test_recover_after_timed_sync(tmpdir):
+    location = str(tmpdir)
+    # Every page stays in RAM, so only a flush of the link gets them into the log.
+    d = Dict("timed", 2, 64, location, sync_interval=0.05)
+    for i in range(20):
+        d[i] = i
+    deadline = time.time() + 10
+    while d._dirty and time.time() < deadline:
+        time.sleep(0.01)
+    assert not d._dirty
+    with d.locked():
+        for i in range(20):
+            d[i] = -i
+        d[20] = 20
+        crash(d)
+    with Dict("timed", 2, 64, location) as d:
+        assert len(d) == 20
+        assert [d[i] for i in range(20)] == list(range(20))
+        assert 20 not in d
+
+
+def test_sync_every_change(tmpdir):
+    location = str(tmpdir)
+    d = Dict("eager", 2, 64, location, sync_interval=0)
+    for i in range(10):
+        d[i] = i
+    assert not d._dirty
+    d[10] = 10
+    crash(d)
+    with Dict("eager", 2, 64, location) as d:
+        assert sorted(d.items()) == [(i, i) for i in range(11)]
+
+
+def test_atomic_replace(tmpdir):
+    base = str(tmpdir.join("files"))
+    store = FileStore(base)
+    store.write(0, b"zero")
+    store.write(0, [b"ze", b"ro!"])
+    store.write_index(b"index")
+    store.sync()
+    assert sorted(os.listdir(str(tmpdir))) == ["files0", "filesLen"]
+    assert store.read(0) == b"zero!"
+
+
+def test_wal_options():
+    with pytest.raises(ValueError):
+        Dict("testWalOptions", sync_interval=-1)
+    with pytest.raises(ValueError):
+        Dict("testWalOptions", concurrent=True, sync_interval=1)
@@ -0,0 +1,87 @@
+from drivelink import Dict, List
+from drivelink._writeback import WriteBack
+import threading
+import pytest
+
+
+def test_dict_write_back():
+    with Dict("testDictWriteBack", 2, 2, write_back=2) as d:
+        for i in range(100):
+            d[i] = str(i)
+        for i in range(0, 100, 7):
+            d[i] = i
+        for i in range(100):
+            assert d[i] == (i if i % 7 == 0 else str(i))
+    with Dict("testDictWriteBack", 2, 2) as d:
+        for i in range(100):
+            assert d[i] == (i if i % 7 == 0 else str(i))
+
+
+def test_list_write_back():
+    with List("testListWriteBack", 3, 1, write_back=1) as l:
+        l.extend(range(50))
+        l.insert(3, -1)
+        del l[10]
+        expected = list(range(50))
+        expected.insert(3, -1)
+        del expected[10]
+        assert list(l) == expected
+    with List("testListWriteBack", 3, 1) as l:
+        assert list(l) == expected
+
+
+def test_flush():
+    d = Dict("testDictFlush", 1, 4, write_back=1)
+    for i in range(10):
+        d[i] = i
+    d.flush()
+    with Dict("testDictFlush", 1, 4) as other:
+        for i in range(10):
+            assert other[i] == i
+    d.close()
+
+
+def test_reclaim_pending():
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def write(number, page):
+        started.set()
+        release.wait()
+        written.append(number)
+
+    writer = WriteBack(write, 1, 4)
+    writer.submit(0, "busy")
+    started.wait()
+    writer.submit(1, "waiting")
+    assert writer.reclaim(1) == ("waiting", True)
+    assert 0 in writer
+    # Reclaim the busy page from another thread, and only let the write finish
+    # once that thread is waiting on it.
+    waiting, reclaimed = threading.Event(), []
+    wait = writer._done.wait
+
+    def blocked(*args):
+        waiting.set()
+        return wait(*args)
+    writer._done.wait = blocked
+    reclaimer = threading.Thread(target=lambda: reclaimed.append(writer.reclaim(0)))
+    reclaimer.start()
+    waiting.wait()
+    release.set()
+    reclaimer.join()
+    assert reclaimed == [("busy", False)]
+    assert writer.reclaim(2) is None
+    writer.close()
+    assert written == [0]
+
+
+def test_write_error():
+    def write(number, page):
+        raise IOError("disk full")
+
+    writer = WriteBack(write, 1, 4)
+    writer.submit(0, "page")
+    with pytest.raises(IOError):
+        writer.flush()
+    writer.close()